@@ -1,11 +1,25 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.services.analytics_service import AnalyticsService
+from fastapi import APIRouter
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.services.analytics_service import AsyncAnalyticsService, server_timing
+from app.services.response_cache import cached_response, response_cache
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
+def dashboard_dependencies(now: datetime) -> tuple:
+    """Tables the dashboard reads, over the days its windows cover (the last hour up to today)."""
+    first, today = (now - timedelta(hours=1)).date(), now.date()
+    return (
+        ("devices", None, None),
+        ("device_events", first, today),
+        ("network_metrics", first, today),
+    )
+
 @router.get("/dashboard")
-def get_dashboard_analytics(db: Session = Depends(get_db)):
-    service = AnalyticsService(db)
-    return service.get_complete_analytics()
\ No newline at end of file
+async def get_dashboard_analytics():
+    body, headers = await response_cache.get(
+        "dashboard", (), settings.CACHE_TTL_DASHBOARD_S, dashboard_dependencies(datetime.utcnow()),
+        lambda db: AsyncAnalyticsService(db).get_complete_analytics(),
+        headers=server_timing
+    )
+    return cached_response(body, headers)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.services.device_event_service import EVENT_FIELDS, DeviceEventService, InvalidCursor, parse_fields
+from app.utils.serializer import FastJSONResponse
+
+router = APIRouter(tags=["device-events"])
+
+@router.get("/device-events")
+async def get_device_events(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(settings.DEVICE_EVENTS_PAGE_SIZE, ge=1, le=settings.DEVICE_EVENTS_MAX_PAGE_SIZE),
+    device_id: Optional[str] = Query(None),
+    event_type: Optional[str] = Query(None, description="DEVICE_JOINED, DEVICE_IDLE or DEVICE_LEFT"),
+    start: Optional[datetime] = Query(None, description="Events at or after this time"),
+    end: Optional[datetime] = Query(None, description="Events before this time"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(EVENT_FIELDS)}"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        selected = parse_fields(fields)
+        page = await DeviceEventService(db).list_events(
+            limit,
+            cursor=cursor,
+            device_id=device_id,
+            event_type=event_type,
+            start=start,
+            end=end,
+            fields=selected
+        )
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse(page)
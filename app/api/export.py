@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.services.device_event_service import EVENT_FIELDS, parse_fields
+from app.services.export_service import FORMATS, export_device_events, export_network_metrics
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+
+def streaming_export(body, name: str, fmt: str, compress: bool) -> StreamingResponse:
+    filename = f"{name}.{fmt}" + (".gz" if compress else "")
+    return StreamingResponse(
+        body,
+        media_type="application/gzip" if compress else FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/device-events")
+async def export_events(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="gzip the stream (.gz download)"),
+    device_id: Optional[str] = Query(None),
+    event_type: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None, description="Events at or after this time"),
+    end: Optional[datetime] = Query(None, description="Events before this time"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(EVENT_FIELDS)}")
+):
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    body = export_device_events(format, selected, gzip, device_id, event_type, start, end)
+    return streaming_export(body, "device_events", format, gzip)
+
+
+@router.get("/network-metrics")
+async def export_metrics(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="gzip the stream (.gz download)"),
+    start: Optional[datetime] = Query(None, description="Samples at or after this time"),
+    end: Optional[datetime] = Query(None, description="Samples before this time")
+):
+    body = export_network_metrics(format, gzip, start, end)
+    return streaming_export(body, "network_metrics", format, gzip)
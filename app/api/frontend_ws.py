@@ -1,10 +1,17 @@
 from fastapi import WebSocketDisconnect
+from app.services.frontend_state import frontend_state
 from app.services.network_state import network_state
 from app.services.websocket_manager import manager
 import json
 
 async def frontend_ws(websocket):
-    await manager.connect(websocket)
+    # ?protocol=delta opts into snapshot + patch frames instead of full state per message
+    protocol = "delta" if websocket.query_params.get("protocol") == "delta" else "full"
+
+    await manager.connect(websocket, protocol)
+
+    if protocol == "delta":
+        await manager.send(websocket, frontend_state.snapshot())
 
     try:
         while True:
@@ -15,6 +22,11 @@ async def frontend_ws(websocket):
             except json.JSONDecodeError:
                 data = {}
 
+            # Client detected a sequence gap (or wants a fresh start)
+            if data.get("action") == "resync":
+                await manager.send(websocket, frontend_state.snapshot())
+                continue
+
             # Handle subnet update
             device_ip = data.get("newDeviceIP")
             subnet_mask = data.get("subnetMask")
@@ -27,7 +39,7 @@ async def frontend_ws(websocket):
                         network_state.update_subnet(device_ip, subnet_mask)
 
                 except ValueError:
-                    await websocket.send_json({
+                    await manager.send(websocket, {
                         "error": "Invalid subnet mask"
                     })
                     continue
@@ -9,32 +9,23 @@ import statistics
 
 from app.core.database import get_db
 from app.models.device import Device
+from app.services.anomaly_detector import LABELS, anomaly_detector, describe
+from app.services.websocket_manager import WebSocketManager
 
 router = APIRouter(prefix="/api/network", tags=["Network Activity"])
 
-class NetworkActivityManager:
+class NetworkActivityManager(WebSocketManager):
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        super().__init__()
         self.metric_history: deque = deque(maxlen=60)  # Store last 60 metrics
         self.packet_rate_history: deque = deque(maxlen=60)  # Packets per second history
         self.arp_history: deque = deque(maxlen=30)  # ARP activity history
         self.last_metrics = None
         self.last_update_time = None
-        
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        
+
     async def broadcast_activity_data(self, data: dict):
         """Broadcast network activity data to all connected clients"""
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(data)
-            except:
-                pass
+        await self.broadcast(data)
 
     def calculate_packet_rate(self, current_metrics, time_diff_seconds):
         """Calculate packets per second"""
@@ -109,7 +100,7 @@ class NetworkActivityManager:
             self.last_update_time = current_time
             
             # Generate network insights
-            insights = self.generate_insights(metrics, packets_per_second, arp_rate)
+            insights = self.generate_insights(metrics)
             
             return {
                 'timestamp': current_time.isoformat(),
@@ -140,32 +131,17 @@ class NetworkActivityManager:
             print(f"Error processing metrics: {e}")
             return {}
 
-    def generate_insights(self, metrics: dict, packet_rate: float, arp_rate: float) -> List[dict]:
-        """Generate automated insights from network activity"""
+    def generate_insights(self, metrics: dict) -> List[dict]:
+        """Generate automated insights from network activity and the anomaly detector"""
         insights = []
         
-        # Check for high packet rate
-        if packet_rate > 100:
-            insights.append({
-                'type': 'warning',
-                'title': 'High Packet Rate Detected',
-                'description': f'Network is experiencing high packet rate of {packet_rate} packets/sec',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif packet_rate > 50:
-            insights.append({
-                'type': 'info',
-                'title': 'Moderate Network Activity',
-                'description': f'Current packet rate is {packet_rate} packets/sec',
-                'timestamp': datetime.now().isoformat()
-            })
-            
-        # Check ARP activity
-        if arp_rate > 10:
+        # Spikes and unusual levels, relative to this network's own history
+        for anomaly in anomaly_detector.anomalies():
             insights.append({
-                'type': 'warning',
-                'title': 'High ARP Activity',
-                'description': f'Unusual ARP activity detected: {arp_rate} ARP packets/sec',
+                'type': 'warning' if anomaly['direction'] == 'high' else 'info',
+                'title': f"{LABELS.get(anomaly['metric'], anomaly['metric'])} Anomaly",
+                'description': describe(anomaly),
+                'anomaly': anomaly,
                 'timestamp': datetime.now().isoformat()
             })
             
@@ -326,7 +302,7 @@ async def send_activity_update(websocket: WebSocket = None):
     }
     
     if websocket:
-        await websocket.send_json(response)
+        await network_manager.send(websocket, response)
     else:
         await network_manager.broadcast_activity_data(response)
 
@@ -1,39 +1,150 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from datetime import date
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime, timedelta
 from typing import Optional
 
-from app.core.database import get_db
-from app.services.report_service import ReportService
+from app.core.config import settings
+from app.services.metric_rollups import utc_naive
+from app.schemas.device_report import DeviceReportBatchRequest
+from app.services.report_service import AsyncReportService, stream_device_reports
+from app.services.response_cache import cached_response, response_cache
 
 router = APIRouter(prefix="/api/reports", tags=["reports"])
 
+# Longest date range a report accepts, in days
+MAX_REPORT_RANGE_DAYS = 366
+
 @router.get("/summary")
-def get_daily_summary(
-    target_date: Optional[date] = Query(None, description="Date for the report (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+async def get_daily_summary(
+    target_date: Optional[date] = Query(None, description="Date for the report (YYYY-MM-DD)")
 ):
     if not target_date:
-        from datetime import datetime
         target_date = datetime.utcnow().date()
-        
-    service = ReportService(db)
-    return service.get_summary_by_date(target_date)
+
+    body, headers = await response_cache.get(
+        "summary", (target_date,), settings.CACHE_TTL_REPORTS_S,
+        (
+            ("device_events", target_date, target_date),
+            ("network_metrics", target_date, target_date),
+            ("device_first_seen", None, target_date),
+        ),
+        lambda db: AsyncReportService(db).get_summary_by_date(target_date)
+    )
+    return cached_response(body, headers)
+
+@router.get("/summary/range")
+async def get_summary_range(
+    start_date: Optional[date] = Query(None, description="First day of the range (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Last day of the range, inclusive (YYYY-MM-DD)"),
+    include_device_ids: bool = Query(True, description="Include each day's device_ids list")
+):
+    if not end_date:
+        end_date = datetime.utcnow().date()
+    if not start_date:
+        start_date = end_date
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if (end_date - start_date).days >= MAX_REPORT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_REPORT_RANGE_DAYS} days")
+
+    body, headers = await response_cache.get(
+        "summary-range", (start_date, end_date, include_device_ids), settings.CACHE_TTL_REPORTS_S,
+        (
+            ("device_events", start_date, end_date),
+            ("network_metrics", start_date, end_date),
+            ("device_first_seen", None, end_date),
+        ),
+        lambda db: AsyncReportService(db).get_summary_range(start_date, end_date, include_device_ids)
+    )
+    return cached_response(body, headers)
 
 @router.get("/device/{device_id}")
-def get_device_report(
+async def get_device_report(
     device_id: str,
     target_date: Optional[date] = Query(None, description="Date for the report (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    include_details: bool = Query(True, description="Decode and include each event's payload")
 ):
     if not target_date:
-        from datetime import datetime
         target_date = datetime.utcnow().date()
-        
-    service = ReportService(db)
-    report = service.get_device_detail_report(device_id, target_date)
-    
-    if not report:
+
+    body, headers = await response_cache.get(
+        "device", (device_id, target_date, include_details), settings.CACHE_TTL_REPORTS_S,
+        (
+            ("device_info", None, None),
+            ("device_events", target_date, target_date),
+            ("device_traffic_daily", target_date, target_date),
+            ("device_sessions", None, target_date),
+        ),
+        lambda db: AsyncReportService(db).get_device_detail_report(device_id, target_date, include_details)
+    )
+
+    if body is None:
         raise HTTPException(status_code=404, detail="Device not found")
-        
-    return report
+
+    return cached_response(body, headers)
+
+@router.post("/devices")
+async def get_device_reports(request: DeviceReportBatchRequest, gzip: bool = Query(False, description="gzip the stream")):
+    end_date = request.end_date or datetime.utcnow().date()
+    start_date = request.start_date or end_date
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if (end_date - start_date).days >= MAX_REPORT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_REPORT_RANGE_DAYS} days")
+
+    body = stream_device_reports(request.device_ids, start_date, end_date, request.include_details, gzip)
+    return StreamingResponse(body, media_type="application/gzip" if gzip else "application/x-ndjson")
+
+@router.get("/device/{device_id}/online-time")
+async def get_online_time(
+    device_id: str,
+    start: Optional[datetime] = Query(None, description="Start of the range (ISO 8601, default: 24 hours before end)"),
+    end: Optional[datetime] = Query(None, description="End of the range, exclusive (ISO 8601, default: now)")
+):
+    # A defaulted "now" is a new key on every call: computed, but not stored
+    ttl = settings.CACHE_TTL_REPORTS_S if end else 0
+    end = utc_naive(end) if end else datetime.utcnow()
+    start = utc_naive(start) if start else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    body, headers = await response_cache.get(
+        "online-time", (device_id, start, end), ttl,
+        (("device_sessions", None, end.date()),),
+        lambda db: AsyncReportService(db).get_online_time(device_id, start, end)
+    )
+    return cached_response(body, headers)
+
+@router.get("/presence")
+async def get_presence(
+    at: Optional[datetime] = Query(None, description="Point in time (ISO 8601, default: now)")
+):
+    ttl = settings.CACHE_TTL_REPORTS_S if at else 0
+    at = utc_naive(at) if at else datetime.utcnow()
+
+    body, headers = await response_cache.get(
+        "presence", (at,), ttl,
+        (("device_sessions", None, at.date()), ("device_info", None, None)),
+        lambda db: AsyncReportService(db).get_presence(at)
+    )
+    return cached_response(body, headers)
+
+@router.get("/top-talkers")
+async def get_top_talkers(
+    start_date: Optional[date] = Query(None, description="First day of the range (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Last day of the range, inclusive (YYYY-MM-DD)"),
+    limit: int = Query(10, ge=1, le=100)
+):
+    if not end_date:
+        end_date = datetime.utcnow().date()
+    if not start_date:
+        start_date = end_date
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+
+    body, headers = await response_cache.get(
+        "top-talkers", (start_date, end_date, limit), settings.CACHE_TTL_REPORTS_S,
+        (("device_traffic_daily", start_date, end_date), ("device_info", None, None)),
+        lambda db: AsyncReportService(db).get_top_talkers(start_date, end_date, limit)
+    )
+    return cached_response(body, headers)
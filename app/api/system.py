@@ -0,0 +1,73 @@
+from fastapi import APIRouter
+
+from app.services.activity_counters import activity_counters
+from app.services.anomaly_detector import anomaly_detector
+from app.services.broadcast_scheduler import broadcaster
+from app.services.daily_summary_job import daily_summary_job
+from app.services.device_fingerprints import device_fingerprints
+from app.services.ingest_writer import ingest_writer
+from app.services.response_cache import response_cache
+from app.services.retention import retention
+from app.services.websocket_manager import manager
+
+router = APIRouter(prefix="/api/system", tags=["system"])
+
+
+@router.get("/ingest")
+def get_ingest_stats():
+    return ingest_writer.get_stats()
+
+
+@router.get("/topology-writes")
+def get_topology_write_stats():
+    return device_fingerprints.get_stats()
+
+
+@router.get("/activity-counters")
+def get_activity_counter_stats():
+    return activity_counters.get_stats()
+
+
+@router.get("/response-cache")
+def get_response_cache_stats():
+    return response_cache.get_stats()
+
+
+@router.get("/anomaly-detector")
+def get_anomaly_detector_state():
+    return {
+        "ready": anomaly_detector.ready,
+        "last_sample": anomaly_detector.last_sample,
+        "threshold": anomaly_detector.threshold,
+        "metrics": anomaly_detector.snapshot(),
+    }
+
+
+@router.get("/websockets")
+def get_websocket_stats():
+    return manager.get_stats()
+
+
+@router.get("/broadcast")
+def get_broadcast_stats():
+    return broadcaster.get_stats()
+
+
+@router.get("/retention")
+def get_retention_stats():
+    return retention.get_stats()
+
+
+@router.post("/retention/run")
+async def run_retention():
+    return await retention.run_once()
+
+
+@router.get("/daily-summaries")
+def get_daily_summary_stats():
+    return daily_summary_job.get_stats()
+
+
+@router.post("/daily-summaries/run")
+async def run_daily_summaries():
+    return await daily_summary_job.run_once()
@@ -0,0 +1,93 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Settings:
+    def __init__(self):
+        # Storage; any SQLAlchemy URL (e.g. postgresql+psycopg2://...) works here
+        self.DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./device_events.db")
+        self.DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+        self.DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "8"))
+
+        # SQLite storage profile, applied as pragmas on every new connection
+        self.DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+        self.DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+        self.DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+        self.DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "-65536"))  # negative = KiB
+        self.DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+        self.DB_TEMP_STORE = os.getenv("DB_TEMP_STORE", "MEMORY")
+        # Only takes effect on a new database file (or after a full VACUUM)
+        self.DB_AUTO_VACUUM = os.getenv("DB_AUTO_VACUUM", "INCREMENTAL")
+
+        # Ingest writer (/ws/device)
+        self.INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "10000"))
+        self.INGEST_MAX_BATCH_SIZE = int(os.getenv("INGEST_MAX_BATCH_SIZE", "500"))
+        self.INGEST_MAX_DELAY_MS = int(os.getenv("INGEST_MAX_DELAY_MS", "50"))
+
+        # PERIODIC_TOPOLOGY_STATE write path: "orm" or "upsert"
+        self.TOPOLOGY_WRITE_MODE = os.getenv("TOPOLOGY_WRITE_MODE", "orm")
+
+        # Outbound WebSocket queues: per-client size and what to do when one is full
+        # ("drop_oldest", "latest_only" or "disconnect")
+        self.WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+        self.WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+
+        # Frontend broadcasts are coalesced to at most one frame per tick (0 = every message)
+        self.BROADCAST_TICK_MS = int(os.getenv("BROADCAST_TICK_MS", "250"))
+
+        # DeviceEvent payload storage: "compressed" (payload column) or "json" (raw_json text)
+        self.EVENT_PAYLOAD_STORAGE = os.getenv("EVENT_PAYLOAD_STORAGE", "compressed")
+        # "auto" uses zstd when the zstandard package is installed, zlib otherwise
+        self.EVENT_PAYLOAD_CODEC = os.getenv("EVENT_PAYLOAD_CODEC", "auto")
+
+        # GET /device-events page size (default and hard cap)
+        self.DEVICE_EVENTS_PAGE_SIZE = int(os.getenv("DEVICE_EVENTS_PAGE_SIZE", "100"))
+        self.DEVICE_EVENTS_MAX_PAGE_SIZE = int(os.getenv("DEVICE_EVENTS_MAX_PAGE_SIZE", "1000"))
+
+        # Per-device events in the last hour: "memory" (ring counters fed by ingest) or "sql"
+        # (one grouped query per request); bucket width sets the window edge precision
+        self.ACTIVITY_COUNT_MODE = os.getenv("ACTIVITY_COUNT_MODE", "memory")
+        self.ACTIVITY_BUCKET_S = int(os.getenv("ACTIVITY_BUCKET_S", "60"))
+
+        # Metric anomaly detector: EWMA weight per sample, per-day weight of the hour-of-day
+        # baselines, |z| that counts as an anomaly, and how many days of rollups restore them
+        self.ANOMALY_ALPHA = float(os.getenv("ANOMALY_ALPHA", "0.05"))
+        self.ANOMALY_SEASONAL_ALPHA = float(os.getenv("ANOMALY_SEASONAL_ALPHA", "0.3"))
+        self.ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3"))
+        self.ANOMALY_SEASON_DAYS = int(os.getenv("ANOMALY_SEASON_DAYS", "14"))
+
+        # /api/analytics/dashboard sections: "serial" (one session) or "parallel" (a read session
+        # each, gathered); in parallel mode a section slower than the timeout is returned as null
+        self.ANALYTICS_SECTION_MODE = os.getenv("ANALYTICS_SECTION_MODE", "parallel")
+        self.ANALYTICS_SECTION_TIMEOUT_S = float(os.getenv("ANALYTICS_SECTION_TIMEOUT_S", "5"))
+
+        # Analytics/report response cache: entries (LRU beyond that) and per-endpoint TTLs (0 = don't
+        # cache, only collapse concurrent requests); ingest commits also invalidate affected entries
+        self.RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+        self.CACHE_TTL_DASHBOARD_S = float(os.getenv("CACHE_TTL_DASHBOARD_S", "5"))
+        self.CACHE_TTL_REPORTS_S = float(os.getenv("CACHE_TTL_REPORTS_S", "60"))
+
+        # Stored /api/reports/summary days: finalized this long after each UTC midnight, and up to
+        # this many missing past days backfilled (0 = job off, every day is computed live)
+        self.DAILY_SUMMARY_DELAY_S = int(os.getenv("DAILY_SUMMARY_DELAY_S", "600"))
+        self.DAILY_SUMMARY_BACKFILL_DAYS = int(os.getenv("DAILY_SUMMARY_BACKFILL_DAYS", "365"))
+
+        # Rows fetched per batch by the streaming exports
+        self.EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+        # Retention, in whole UTC days (0 = keep forever); a pass runs every interval (0 = never)
+        self.RETENTION_INTERVAL_S = int(os.getenv("RETENTION_INTERVAL_S", "3600"))
+        self.RETENTION_EVENTS_DAYS = int(os.getenv("RETENTION_EVENTS_DAYS", "90"))
+        self.RETENTION_METRICS_DAYS = int(os.getenv("RETENTION_METRICS_DAYS", "7"))
+        self.RETENTION_METRICS_1M_DAYS = int(os.getenv("RETENTION_METRICS_1M_DAYS", "30"))
+        self.RETENTION_METRICS_1H_DAYS = int(os.getenv("RETENTION_METRICS_1H_DAYS", "365"))
+        self.RETENTION_METRICS_1D_DAYS = int(os.getenv("RETENTION_METRICS_1D_DAYS", "0"))
+        # Rows per delete transaction and pages per incremental_vacuum step
+        self.RETENTION_CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", "2000"))
+        self.RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "1000"))
+
+
+settings = Settings()
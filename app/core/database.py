@@ -1,12 +1,97 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-DATABASE_URL = "sqlite:///./device_events.db"
+from app.core.config import settings
+
+DATABASE_URL = settings.DATABASE_URL
+
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+
+def sqlite_pragmas(read_only: bool = False):
+    """Connect-event listener applying the configured SQLite storage profile."""
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # auto_vacuum has to be set before the first table is created
+            cursor.execute(f"PRAGMA auto_vacuum={settings.DB_AUTO_VACUUM}")
+            # journal_mode is persistent, so readers pick WAL up from the file
+            cursor.execute(f"PRAGMA journal_mode={settings.DB_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={settings.DB_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.DB_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size={settings.DB_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={settings.DB_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA temp_store={settings.DB_TEMP_STORE}")
+        cursor.close()
+
+    return on_connect
+
+
+def read_only_url(url: str) -> str:
+    """Same SQLite file opened read-only; other backends are returned unchanged."""
+    parsed = make_url(url)
+    if not IS_SQLITE or parsed.database in (None, "", ":memory:"):
+        return url
+
+    database = parsed.database if parsed.database.startswith("file:") else f"file:{parsed.database}"
+    return parsed.set(database=database, query={**parsed.query, "mode": "ro", "uri": "true"}) \
+        .render_as_string(hide_password=False)
+
+
+def async_url(url: str) -> str:
+    """Same database through its asyncio driver (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    driver = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+
+if IS_SQLITE:
+    # One dedicated writer connection for ingest (and schema changes)
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0
+    )
+    event.listen(engine, "connect", sqlite_pragmas())
+
+    # Read-only pool for REST, so reports never queue behind the writer
+    read_engine = create_engine(
+        read_only_url(DATABASE_URL),
+        connect_args={"check_same_thread": False},
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW
+    )
+    event.listen(read_engine, "connect", sqlite_pragmas(read_only=True))
+
+    # Read-only asyncio pool for async endpoints, which never park a worker thread on I/O
+    async_read_engine = create_async_engine(
+        async_url(read_only_url(DATABASE_URL)),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW
+    )
+    event.listen(async_read_engine.sync_engine, "connect", sqlite_pragmas(read_only=True))
+else:
+    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    read_engine = create_engine(
+        DATABASE_URL,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW,
+        pool_pre_ping=True
+    )
+    async_read_engine = create_async_engine(
+        async_url(DATABASE_URL),
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW,
+        pool_pre_ping=True
+    )
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -14,13 +99,29 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    bind=async_read_engine
+)
+
 Base = declarative_base()
 
 
 def get_db():
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
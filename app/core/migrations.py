@@ -0,0 +1,120 @@
+"""Versioned schema migrations.
+
+``Base.metadata.create_all`` creates missing tables (with their indexes)
+but never alters an existing one, so every column or index added to an
+existing table also gets a migration here. Migrations run in order at
+startup, each in its own transaction, and the applied versions are
+recorded in ``schema_migrations``. Each step is written to be a no-op on
+a database that create_all has just built with the current models.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+
+from app.core.database import engine
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def add_column(conn, table: str, column: str, column_type: str):
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+
+def create_index(conn, name: str, table: str, columns: str):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def m001_event_payload_columns(conn):
+    blob = "BYTEA" if conn.dialect.name == "postgresql" else "BLOB"
+    add_column(conn, "device_events", "payload", blob)
+    for column in ("hostname", "ip_address", "vendor", "device_type"):
+        add_column(conn, "device_events", column, "VARCHAR")
+
+
+def m002_query_indexes(conn):
+    create_index(conn, "ix_device_events_device_id_timestamp", "device_events", "device_id, timestamp")
+    create_index(conn, "ix_device_events_event_type_timestamp", "device_events", "event_type, timestamp")
+    create_index(conn, "ix_device_events_timestamp", "device_events", "timestamp")
+    create_index(conn, "ix_network_metrics_measure_time", "network_metrics", "measure_time")
+    create_index(conn, "ix_devices_status", "devices", "status")
+
+
+def m003_devices_first_seen_day(conn):
+    add_column(conn, "devices", "first_seen_day", "DATE")
+
+    if conn.dialect.name == "sqlite":
+        day = "date(first_seen)"
+    else:
+        day = "CAST(first_seen AS DATE)"
+    conn.execute(text(
+        f"UPDATE devices SET first_seen_day = {day} "
+        "WHERE first_seen IS NOT NULL AND first_seen_day IS NULL"
+    ))
+
+    create_index(conn, "ix_devices_first_seen_day", "devices", "first_seen_day")
+
+
+def m004_device_sessions(conn):
+    """Replay existing device_events into device_sessions."""
+    from app.models.device_event import DeviceEvent
+    from app.models.device_session import DeviceSession
+    from app.services.device_sessions import replay
+
+    # Scripts may run this before the server's create_all has seen the model
+    DeviceSession.__table__.create(conn, checkfirst=True)
+    if conn.execute(select(DeviceSession.id).limit(1)).first() is not None:
+        return
+
+    events = conn.execution_options(yield_per=5000).execute(
+        select(DeviceEvent.device_id, DeviceEvent.event_type, DeviceEvent.timestamp)
+        .where(DeviceEvent.device_id.is_not(None))
+        .order_by(DeviceEvent.device_id, DeviceEvent.timestamp, DeviceEvent.id)
+    )
+    rows = []
+    for session in replay(events):
+        rows.append({"device_id": session.device_id, "started_at": session.started_at, "ended_at": session.ended_at})
+        if len(rows) >= 5000:
+            conn.execute(DeviceSession.__table__.insert(), rows)
+            rows = []
+    if rows:
+        conn.execute(DeviceSession.__table__.insert(), rows)
+
+
+MIGRATIONS = [
+    (1, "device_events payload columns", m001_event_payload_columns),
+    (2, "indexes for hot service queries", m002_query_indexes),
+    (3, "devices.first_seen_day", m003_devices_first_seen_day),
+    (4, "device_sessions from device_events", m004_device_sessions),
+]
+
+
+def run_migrations(bind=engine):
+    """Apply pending migrations; tables themselves must already exist (create_all)."""
+    schema_migrations.create(bind, checkfirst=True)
+
+    with bind.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+
+        with bind.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                name=name,
+                applied_at=datetime.now(timezone.utc)
+            ))
+        logger.info("Applied migration %03d: %s", version, name)
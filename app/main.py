@@ -1,12 +1,20 @@
-from fastapi import FastAPI, WebSocket, Depends, WebSocketDisconnect
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
 
-from app.core.database import SessionLocal, engine, get_db
-from app.models.device_event import Base, DeviceEvent
+from app.core.database import async_read_engine, engine
+from app.core.migrations import run_migrations
+from app.models.device_event import Base
 
 from app.services.websocket_manager import manager
-from app.services.event_processor import EventProcessor
+from app.services.broadcast_scheduler import broadcaster
+from app.services.dashboard_stats import dashboard_stats
+from app.services.ingest_writer import ingest_writer
+from app.services.retention import retention
+from app.services.daily_summary_job import daily_summary_job
+from app.services.analytics_service import close_abandoned_sections
+from app.utils.serializer import FastJSONResponse
 from app.services.network_transformer import (
     build_network_stats,
     build_ip_devices,
@@ -15,11 +23,37 @@ from app.services.network_transformer import (
 )
 
 from app.api.frontend_ws import frontend_ws
-from app.api import analytics, topology_router, reports, ip_address_management
+from app.api import analytics, topology_router, reports, ip_address_management, system, device_events, export
 from app.api.topology_router import build_topology_response
 
 
-app = FastAPI(title="Network Device Monitoring")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    broadcaster.builders = {
+        "ip_address_management": build_ip_address_management,
+        "dashboard_stats": dashboard_stats.snapshot,
+        "topology": build_topology_view,
+    }
+    ingest_writer.on_commit = publish_committed
+
+    await ingest_writer.start()
+    await broadcaster.start()
+    await retention.start()
+    await daily_summary_job.start()
+    yield
+    await daily_summary_job.stop()
+    await retention.stop()
+    await ingest_writer.stop()
+    await broadcaster.stop()
+    await close_abandoned_sections()
+    await async_read_engine.dispose()
+
+
+app = FastAPI(
+    title="Network Device Monitoring",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
 
 # Global state
 latest_topology = {}
@@ -36,19 +70,16 @@ app.add_middleware(
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 # Routers
 app.include_router(analytics.router)
 app.include_router(topology_router.router)
 app.include_router(reports.router)
 app.include_router(ip_address_management.router)
-
-
-# REST API
-@app.get("/device-events")
-def get_device_events(db: Session = Depends(get_db)):
-    return db.query(DeviceEvent).all()
-
+app.include_router(system.router)
+app.include_router(device_events.router)
+app.include_router(export.router)
 
 
 # WebSocket for Collector
@@ -60,9 +91,6 @@ async def device_ws(websocket: WebSocket):
 
     await manager.connect(websocket)
 
-    db = SessionLocal()
-    processor = EventProcessor(db)
-
     try:
         while True:
 
@@ -70,9 +98,6 @@ async def device_ws(websocket: WebSocket):
 
             # print("Data Received:", data)
 
-            # Save event to DB
-            processor.process_event(data)
-
             data_type = data.get("type")
             payload = data.get("payload", {})
 
@@ -83,32 +108,35 @@ async def device_ws(websocket: WebSocket):
             # Update metrics
             if data_type == "METRIC" and "metrics" in payload:
                 latest_metrics = payload["metrics"]
-                
-            # topology_data = None
-                
-            if data["type"] == "TOPOLOGY" and "topology" in data["payload"]:
-                topology_data = build_topology_response(data["payload"]["topology"])
-                
-
-            # Build responses
-            ip_address_management = build_dashboard_response(latest_metrics,latest_topology)
-            
-
-            ws_message = {
-                "event": data,
-                "ip_address_management": ip_address_management,
-                "dashboard_stats": processor.get_dashboard_stats(),
-                "topology": topology_data
-            }
-
-            # Broadcast to all clients
-            await manager.broadcast(ws_message)
+
+            # Save event to DB (frontends are updated on the next broadcast tick after commit)
+            await ingest_writer.submit(data)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
-    finally:
-        db.close()
+
+def dirty_views(data):
+    # Which frontend views a committed collector message can change
+    data_type = data.get("type")
+    if data_type == "TOPOLOGY":
+        return ("ip_address_management", "dashboard_stats", "topology")
+    if data_type == "METRIC":
+        return ("ip_address_management",)
+    return ("dashboard_stats",)
+
+
+async def publish_committed(messages):
+    for data in messages:
+        await broadcaster.publish(data, dirty_views(data))
+
+
+def build_ip_address_management():
+    return build_dashboard_response(latest_metrics, latest_topology)
+
+
+def build_topology_view():
+    return build_topology_response(latest_topology) if latest_topology else None
 
 
 # WebSocket for Frontend
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Date, DateTime, Integer, BigInteger, Text
+from app.core.database import Base
+
+class DailySummary(Base):
+    """Finalized /api/reports/summary figures for one past UTC day."""
+    __tablename__ = "daily_summaries"
+
+    day = Column(Date, primary_key=True)
+
+    connected_devices = Column(Integer, nullable=False, default=0)
+    peak_active = Column(Integer, nullable=False, default=0)
+    inactive_devices = Column(Integer, nullable=False, default=0)
+
+    data_sent = Column(BigInteger, nullable=False, default=0)
+    data_received = Column(BigInteger, nullable=False, default=0)
+    total_packets = Column(BigInteger, nullable=False, default=0)
+
+    device_ids = Column(Text, nullable=False, default="[]")  # JSON list of MACs seen that day
+
+    finalized_at = Column(DateTime, nullable=False)
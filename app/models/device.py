@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, Boolean, BigInteger
+from sqlalchemy import Column, String, DateTime, Date, Integer, Boolean, BigInteger
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -14,9 +14,10 @@ class Device(Base):
     vendor = Column(String, nullable=True)
 
     first_seen = Column(DateTime, nullable=True)
+    first_seen_day = Column(Date, nullable=True, index=True)  # date(first_seen), for "new today" lookups
     last_seen = Column(DateTime, nullable=True)
 
-    status = Column(String, default="active")  # active / idle / left
+    status = Column(String, default="active", index=True)  # active / idle / left
     online = Column(Boolean, default=True)
     active = Column(Boolean, default=True)
 
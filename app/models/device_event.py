@@ -1,6 +1,17 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey
+import json
+
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.utils.payload_codec import decode_payload
+
+def event_details(payload: bytes, raw_json: str) -> dict:
+    """Decoded event payload, whichever way it was stored."""
+    if payload is not None:
+        return decode_payload(payload)
+    if raw_json:
+        return json.loads(raw_json)
+    return {}
 
 class DeviceEvent(Base):
     __tablename__ = "device_events"
@@ -9,6 +20,25 @@ class DeviceEvent(Base):
     device_id = Column(String, ForeignKey("devices.device_id"))
     event_type = Column(String)
     timestamp = Column(DateTime)
-    raw_json = Column(Text)
+    raw_json = Column(Text)  # legacy / EVENT_PAYLOAD_STORAGE=json
+
+    # Compressed payload (format-tagged, see app/utils/payload_codec.py)
+    payload = Column(LargeBinary, nullable=True)
+
+    # Common device fields, readable without decoding the payload
+    hostname = Column(String, nullable=True)
+    ip_address = Column(String, nullable=True)
+    vendor = Column(String, nullable=True)
+    device_type = Column(String, nullable=True)
 
     device = relationship("Device")
+
+    __table_args__ = (
+        Index("ix_device_events_device_id_timestamp", "device_id", "timestamp"),
+        Index("ix_device_events_event_type_timestamp", "event_type", "timestamp"),
+        Index("ix_device_events_timestamp", "timestamp"),
+    )
+
+    @property
+    def details(self) -> dict:
+        return event_details(self.payload, self.raw_json)
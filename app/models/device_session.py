@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.core.database import Base
+
+class DeviceSession(Base):
+    """One online interval of a device, from DEVICE_JOINED/IDLE to DEVICE_LEFT (naive UTC)."""
+    __tablename__ = "device_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(String, nullable=False)  # MAC address
+
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=True)  # NULL while the device is still online
+
+    __table_args__ = (
+        # The open session of a device, and a device's sessions overlapping a range
+        Index("ix_device_sessions_device_id_ended_at", "device_id", "ended_at"),
+        # Sessions open at a point in time, across all devices
+        Index("ix_device_sessions_ended_at_started_at", "ended_at", "started_at"),
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Date, BigInteger, Index
+from app.core.database import Base
+
+class DeviceTrafficDaily(Base):
+    """Traffic per device per UTC day, from deltas between topology snapshots."""
+    __tablename__ = "device_traffic_daily"
+
+    device_id = Column(String, primary_key=True)  # MAC address
+    day = Column(Date, primary_key=True)
+
+    bytes_sent = Column(BigInteger, nullable=False, default=0)
+    bytes_received = Column(BigInteger, nullable=False, default=0)
+    packets = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        # Top talkers over a date range
+        Index("ix_device_traffic_daily_day", "day"),
+    )
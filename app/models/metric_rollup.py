@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime
+from app.core.database import Base
+
+
+class MetricRollupColumns:
+    """network_metrics aggregated per time bucket (bucket = UTC start of the interval)."""
+
+    bucket = Column(DateTime, primary_key=True)
+    samples = Column(Integer, nullable=False, default=0)
+
+    data_sent = Column(BigInteger, nullable=False, default=0)
+    data_received = Column(BigInteger, nullable=False, default=0)
+
+    total_packets = Column(BigInteger, nullable=False, default=0)
+    tcp_packets = Column(BigInteger, nullable=False, default=0)
+    udp_packets = Column(BigInteger, nullable=False, default=0)
+    icmp_packets = Column(BigInteger, nullable=False, default=0)
+    arp_requests = Column(BigInteger, nullable=False, default=0)
+
+    max_active_devices = Column(Integer, nullable=False, default=0)
+    max_total_devices = Column(Integer, nullable=False, default=0)
+
+
+class MetricRollup1m(MetricRollupColumns, Base):
+    __tablename__ = "network_metrics_1m"
+
+
+class MetricRollup1h(MetricRollupColumns, Base):
+    __tablename__ = "network_metrics_1h"
+
+
+class MetricRollup1d(MetricRollupColumns, Base):
+    __tablename__ = "network_metrics_1d"
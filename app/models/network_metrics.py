@@ -5,7 +5,7 @@ class NetworkMetric(Base):
     __tablename__ = "network_metrics"
 
     id = Column(Integer, primary_key=True, index=True)
-    measure_time = Column(DateTime)
+    measure_time = Column(DateTime, index=True)
 
     total_devices = Column(Integer)
     active_devices = Column(Integer)
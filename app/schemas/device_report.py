@@ -0,0 +1,9 @@
+from datetime import date
+from pydantic import BaseModel
+from typing import List, Literal, Optional, Union
+
+class DeviceReportBatchRequest(BaseModel):
+    device_ids: Union[Literal["all"], List[str]] = "all"
+    start_date: Optional[date] = None  # default: end_date
+    end_date: Optional[date] = None  # default: today (UTC)
+    include_details: bool = False
@@ -0,0 +1,129 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.device_event import DeviceEvent
+
+WINDOW_S = 3600
+
+
+def _epoch(value: datetime) -> float:
+    # Naive datetimes are UTC, as they come back from SQLite
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class _Ring:
+    __slots__ = ("counts", "head", "total")
+
+    def __init__(self, size: int, head: int):
+        self.counts = [0] * size
+        self.head = head
+        self.total = 0
+
+    def advance(self, bucket: int):
+        size = len(self.counts)
+        if bucket <= self.head:
+            return
+        if bucket - self.head >= size:
+            self.counts = [0] * size
+            self.total = 0
+        else:
+            for expired in range(self.head + 1, bucket + 1):
+                slot = expired % size
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+        self.head = bucket
+
+
+class ActivityCounters:
+    """Device events per MAC over the last hour, as time-bucketed ring counters.
+
+    Each device has one slot per ``bucket_s`` seconds of the window. A
+    slot is cleared when the ring advances past it, and a running total
+    is kept alongside, so reading a device's count is O(1) no matter
+    how many events it has. The window edge is accurate to one bucket.
+
+    Hydrated from the last hour of device_events at startup, then fed
+    by EventProcessor after each commit.
+    """
+
+    def __init__(self, window_s: int = WINDOW_S, bucket_s: int = settings.ACTIVITY_BUCKET_S):
+        self.window_s = window_s
+        self.bucket_s = bucket_s
+        self.size = max(1, window_s // bucket_s)
+        self.ready = False
+        self._lock = threading.Lock()
+        self._rings: Dict[str, _Ring] = {}
+
+    def hydrate(self, db: Session):
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=self.window_s)
+        rows = db.query(DeviceEvent.device_id, DeviceEvent.timestamp) \
+            .filter(DeviceEvent.timestamp >= since) \
+            .execution_options(yield_per=5000)
+
+        with self._lock:
+            self._rings.clear()
+            for mac, timestamp in rows:
+                self._record(mac, timestamp)
+            self.ready = True
+
+    def record(self, events: List[tuple]):
+        """Count committed (mac, timestamp) events."""
+        with self._lock:
+            for mac, timestamp in events:
+                self._record(mac, timestamp)
+
+    def count(self, mac: str, now: Optional[datetime] = None) -> int:
+        bucket = self._bucket(now or datetime.now(timezone.utc))
+        with self._lock:
+            ring = self._rings.get(mac)
+            if ring is None:
+                return 0
+            ring.advance(bucket)
+            if not ring.total:
+                # Quiet for a whole window; drop it rather than keep an empty ring per device
+                del self._rings[mac]
+            return ring.total
+
+    def get_stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "window_s": self.window_s,
+            "bucket_s": self.bucket_s,
+            "tracked_devices": len(self._rings),
+        }
+
+    def _bucket(self, timestamp: datetime) -> int:
+        return int(_epoch(timestamp) // self.bucket_s)
+
+    def _record(self, mac: Optional[str], timestamp: datetime):
+        if mac is None:
+            return
+        bucket = self._bucket(timestamp)
+        ring = self._rings.get(mac)
+        if ring is None:
+            ring = self._rings[mac] = _Ring(self.size, bucket)
+        elif bucket > ring.head:
+            ring.advance(bucket)
+        elif bucket <= ring.head - self.size:
+            return  # already outside the window
+        ring.counts[bucket % self.size] += 1
+        ring.total += 1
+
+
+def activity_counts_sql(db: Session, since: datetime) -> Dict[str, int]:
+    """Events per device since ``since`` in one grouped query (no in-memory store)."""
+    rows = db.query(DeviceEvent.device_id, func.count()) \
+        .filter(DeviceEvent.timestamp >= since) \
+        .group_by(DeviceEvent.device_id) \
+        .all()
+    return dict(rows)
+
+
+activity_counters = ActivityCounters()
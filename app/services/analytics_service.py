@@ -1,10 +1,37 @@
+import asyncio
+import time
+
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from sqlalchemy import func
 
 from app.models.device import Device
 from app.models.device_event import DeviceEvent
-from app.models.network_metrics import NetworkMetric
+from app.core.config import settings
+from app.core.database import AsyncReadSessionLocal
+from app.services.activity_counters import activity_counters, activity_counts_sql
+from app.services.anomaly_detector import anomaly_detector, describe
+from app.services.metric_rollups import MetricRollupService
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Health score deducted per anomalous metric (anything else: 5)
+HEALTH_PENALTIES = {
+    "arp_ratio": 20,
+    "total_packets": 15,
+    "udp_ratio": 10,
+}
+
+# Independent parts of get_complete_analytics: response key -> AnalyticsService method
+SECTIONS = {
+    "dashboard_stats": "get_dashboard_stats",
+    "traffic_summary": "get_traffic_summary",
+    "device_connections": "get_device_connections_today",
+    "protocol_distribution": "get_protocol_distribution",
+    "devices": "get_all_devices",
+    "network_health": "get_network_health",
+}
 
 class AnalyticsService:
     
@@ -14,7 +41,7 @@ class AnalyticsService:
     def get_dashboard_stats(self):
         today = datetime.utcnow().date()
 
-        new_devices_today = self.db.query(Device).filter(func.date(Device.first_seen) == today).count()
+        new_devices_today = self.db.query(Device).filter(Device.first_seen_day == today).count()
         inactive_devices = self.db.query(Device).filter(Device.status == "INACTIVE").count()
         total_devices = self.db.query(Device).count()
         active_devices = self.db.query(Device).filter(Device.status == "ACTIVE").count()
@@ -30,27 +57,17 @@ class AnalyticsService:
 
         last_hour = datetime.utcnow() - timedelta(hours=1)
 
-        result = self.db.query(
-            func.sum(NetworkMetric.total_packets),
-            func.sum(NetworkMetric.tcp_packets),
-            func.sum(NetworkMetric.udp_packets),
-            func.sum(NetworkMetric.icmp_packets),
-            func.sum(NetworkMetric.arp_requests),
-            func.sum(NetworkMetric.data_sent),
-            func.sum(NetworkMetric.data_received),
-        ).filter(
-            NetworkMetric.measure_time >= last_hour
-        ).first()
-
-        if result and result[0]:
+        result = MetricRollupService(self.db).aggregate(last_hour)
+
+        if result["total_packets"]:
             return {
-                "total_packets": result[0],
-                "tcp_packets": result[1],
-                "udp_packets": result[2],
-                "icmp_packets": result[3],
-                "arp_requests": result[4],
-                "data_sent_mb": round(result[5] / (1024 * 1024), 2),
-                "data_received_mb": round(result[6] / (1024 * 1024), 2)
+                "total_packets": result["total_packets"],
+                "tcp_packets": result["tcp_packets"],
+                "udp_packets": result["udp_packets"],
+                "icmp_packets": result["icmp_packets"],
+                "arp_requests": result["arp_requests"],
+                "data_sent_mb": round(result["data_sent"] / (1024 * 1024), 2),
+                "data_received_mb": round(result["data_received"] / (1024 * 1024), 2)
             }
 
         return {
@@ -64,11 +81,12 @@ class AnalyticsService:
         }
     
     def get_device_connections_today(self):
-        today = datetime.utcnow().date()
+        start_of_day = datetime.combine(datetime.utcnow().date(), datetime.min.time())
         
         connections = self.db.query(DeviceEvent).filter(
             DeviceEvent.event_type == "DEVICE_JOINED",
-            func.date(DeviceEvent.timestamp) == today
+            DeviceEvent.timestamp >= start_of_day,
+            DeviceEvent.timestamp < start_of_day + timedelta(days=1)
         ).count()
         
         return {
@@ -78,17 +96,15 @@ class AnalyticsService:
     def get_protocol_distribution(self):
         last_5_min = datetime.utcnow() - timedelta(minutes=5)
 
-        result = self.db.query(
-            func.coalesce(func.sum(NetworkMetric.tcp_packets), 0),
-            func.coalesce(func.sum(NetworkMetric.udp_packets), 0),
-            func.coalesce(func.sum(NetworkMetric.icmp_packets), 0),
-            func.coalesce(func.sum(NetworkMetric.arp_requests), 0),
-            func.coalesce(func.sum(NetworkMetric.total_packets), 0)
-        ).filter(
-            NetworkMetric.measure_time >= last_5_min
-        ).first()
+        result = MetricRollupService(self.db).aggregate(last_5_min)
 
-        tcp, udp, icmp, arp, total = result
+        tcp, udp, icmp, arp, total = (
+            result["tcp_packets"],
+            result["udp_packets"],
+            result["icmp_packets"],
+            result["arp_requests"],
+            result["total_packets"]
+        )
 
         if total > 0:
             return {
@@ -108,14 +124,14 @@ class AnalyticsService:
     def get_all_devices(self):
         devices = self.db.query(Device).all()
         device_list = []
+
+        if settings.ACTIVITY_COUNT_MODE == "memory" and activity_counters.ready:
+            activity_count = activity_counters.count
+        else:
+            counts = activity_counts_sql(self.db, datetime.utcnow() - timedelta(hours=1))
+            activity_count = lambda mac: counts.get(mac, 0)
         
         for device in devices:
-            last_hour = datetime.utcnow() - timedelta(hours=1)
-            device_events = self.db.query(DeviceEvent).filter(
-                DeviceEvent.device_id == device.device_id,
-                DeviceEvent.timestamp >= last_hour
-            ).count()
-            
             device_list.append({
                 "device_id": device.device_id,
                 "ip": device.ip_address,
@@ -123,7 +139,7 @@ class AnalyticsService:
                 "status": device.status,
                 "first_seen": device.first_seen.isoformat() if device.first_seen else None,
                 "last_seen": device.last_seen.isoformat() if device.last_seen else None,
-                "activity_count_last_hour": device_events,
+                "activity_count_last_hour": activity_count(device.device_id),
                 "hostname": device.hostname or "Unknown"
             })
         
@@ -131,32 +147,19 @@ class AnalyticsService:
     
     def get_network_health(self):
         last_10_min = datetime.utcnow() - timedelta(minutes=10)
-        
-        metrics = self.db.query(NetworkMetric).filter(
-            NetworkMetric.measure_time >= last_10_min
-        ).order_by(NetworkMetric.measure_time.desc()).first()
-        
-        if not metrics:
+
+        if not anomaly_detector.last_sample or anomaly_detector.last_sample < last_10_min:
             return {
                 "health_score": 100, 
                 "issues": [], 
+                "anomalies": [],
                 "status": "HEALTHY"
             }
-        
-        issues = []
-        score = 100
-        
-        if metrics.arp_requests > (metrics.total_packets * 0.3):
-            score -= 20
-            issues.append("ARP traffic unusually high")
-        
-        if metrics.total_packets > 10000:
-            score -= 15
-            issues.append("High network traffic")
-        
-        if metrics.udp_packets > metrics.tcp_packets * 2:
-            score -= 10
-            issues.append("Unusual UDP/TCP ratio")
+
+        # Each anomalous metric counts once, however many of its scores are past the threshold
+        anomalies = anomaly_detector.anomalies()
+        penalties = {a["metric"]: HEALTH_PENALTIES.get(a["metric"], 5) for a in anomalies}
+        score = 100 - sum(penalties.values())
         
         if score > 80:
             status = "HEALTHY"
@@ -167,7 +170,8 @@ class AnalyticsService:
         
         return {
             "health_score": max(0, score),
-            "issues": issues,
+            "issues": [describe(a) for a in anomalies],
+            "anomalies": anomalies,
             "status": status
         }
     
@@ -180,4 +184,138 @@ class AnalyticsService:
             "protocol_distribution": self.get_protocol_distribution(),
             "devices": self.get_all_devices(),
             "network_health": self.get_network_health()
-        }
\ No newline at end of file
+        }
+
+
+class AsyncAnalyticsService:
+    """AnalyticsService on an AsyncSession.
+
+    Runs the same queries through ``AsyncSession.run_sync``, so the database
+    I/O is awaited on the event loop instead of blocking a threadpool worker.
+
+    With ``section_mode="parallel"``, get_complete_analytics runs each
+    section concurrently on its own read session, so its latency is the
+    slowest section rather than the sum of all of them. A section that
+    fails or exceeds ``section_timeout`` comes back as null and the rest
+    of the dashboard is still served. Either way the response lists each
+    section's status and duration under "sections".
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        section_mode: str = settings.ANALYTICS_SECTION_MODE,
+        section_timeout: float = settings.ANALYTICS_SECTION_TIMEOUT_S,
+        session_factory=AsyncReadSessionLocal,
+    ):
+        self.db = db
+        self.section_mode = section_mode
+        self.section_timeout = section_timeout
+        self.session_factory = session_factory
+
+    async def _run(self, method: str, *args, db: AsyncSession = None):
+        return await (db or self.db).run_sync(lambda session: getattr(AnalyticsService(session), method)(*args))
+
+    async def get_dashboard_stats(self):
+        return await self._run("get_dashboard_stats")
+
+    async def get_traffic_summary(self):
+        return await self._run("get_traffic_summary")
+
+    async def get_device_connections_today(self):
+        return await self._run("get_device_connections_today")
+
+    async def get_protocol_distribution(self):
+        return await self._run("get_protocol_distribution")
+
+    async def get_all_devices(self):
+        return await self._run("get_all_devices")
+
+    async def get_network_health(self):
+        return await self._run("get_network_health")
+
+    async def get_complete_analytics(self):
+        timestamp = datetime.utcnow().isoformat()
+
+        if self.section_mode == "parallel":
+            results = await asyncio.gather(*(self._parallel_section(method) for method in SECTIONS.values()))
+        else:
+            results = [await self._serial_section(method) for method in SECTIONS.values()]
+
+        analytics = {"timestamp": timestamp}
+        sections = {}
+        for name, (value, status, duration) in zip(SECTIONS, results):
+            analytics[name] = value
+            sections[name] = {"status": status, "duration_ms": round(duration * 1000, 3)}
+        analytics["sections"] = sections
+        return analytics
+
+    async def _serial_section(self, method: str):
+        # One shared session: a section can't be abandoned halfway, so no timeout here
+        started = time.perf_counter()
+        value = await self._run(method)
+        return value, "ok", time.perf_counter() - started
+
+    async def _parallel_section(self, method: str):
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            # Checked out up front so a timeout can interrupt the statement it is running
+            raw = await (await db.connection()).get_raw_connection()
+            run = asyncio.ensure_future(self._run(method, db=db))
+            done, _ = await asyncio.wait({run}, timeout=self.section_timeout)
+            if not done:
+                logger.warning("Analytics section %s timed out after %ss", method, self.section_timeout)
+                _abandon(db, run, raw.driver_connection)
+                return None, "timeout", time.perf_counter() - started
+            value = run.result()
+        except Exception as e:
+            logger.exception("Analytics section %s failed: %s", method, e)
+            await db.close()
+            return None, "error", time.perf_counter() - started
+        await db.close()
+        return value, "ok", time.perf_counter() - started
+
+
+# Cleanups of timed-out sections still running (keeps their tasks referenced)
+_abandoned = set()
+
+
+def _abandon(db: AsyncSession, run: asyncio.Future, driver_connection):
+    """Stop a timed-out section and close its session without the request waiting on either.
+
+    Cancelling alone isn't enough on aiosqlite: the rollback it triggers
+    queues behind the running statement, so that is interrupted first.
+    """
+    async def close():
+        try:
+            interrupt = getattr(driver_connection, "interrupt", None)
+            if interrupt is not None:
+                await interrupt()
+            else:
+                run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+            await db.close()
+        except Exception as e:
+            logger.warning("Closing timed-out analytics section failed: %s", e)
+
+    task = asyncio.create_task(close())
+    _abandoned.add(task)
+    task.add_done_callback(_abandoned.discard)
+
+
+async def close_abandoned_sections():
+    """Wait for timed-out sections' sessions to close (before disposing the read engine)."""
+    if _abandoned:
+        await asyncio.gather(*_abandoned, return_exceptions=True)
+
+
+def server_timing(analytics: dict) -> dict:
+    """Server-Timing header with each section's duration (and status, when it isn't ok)."""
+    metrics = []
+    for name, section in analytics["sections"].items():
+        metric = f"{name};dur={section['duration_ms']}"
+        if section["status"] != "ok":
+            metric += f';desc="{section["status"]}"'
+        metrics.append(metric)
+    return {"Server-Timing": ", ".join(metrics)}
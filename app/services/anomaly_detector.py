@@ -0,0 +1,245 @@
+"""Online anomaly detection over PERIODIC_METRIC_STATE samples.
+
+Every tracked metric keeps a fixed amount of state, however long it runs:
+
+* an EWMA mean and variance of the raw samples. A sample's z-score
+  against them flags spikes and drops.
+* one EWMA mean and variance per UTC hour of day, over hourly means.
+  The current hour's running mean is scored against its slot, which
+  flags a level that is unusual for that time of day (a busy segment at
+  10:00 is normal, the same traffic at 03:00 is not).
+
+Updating with one sample is O(1). On restart the state is rebuilt from
+the rollup tables. The hourly baselines come back exactly from
+network_metrics_1h. The sample EWMA is seeded from the last hour of
+network_metrics_1m, and its variance is estimated from the spread of the
+minute means.
+"""
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.metric_rollup import MetricRollup1h, MetricRollup1m
+from app.services.metric_rollups import SUM_COLUMNS, floor_time, utc_naive
+
+# Sample columns tracked directly, plus derived ratios
+METRICS = ("total_packets", "tcp_packets", "udp_packets", "icmp_packets", "arp_requests", "data_sent", "data_received")
+RATIOS = {
+    "arp_ratio": ("arp_requests", "total_packets"),
+    "udp_ratio": ("udp_packets", "tcp_packets"),
+}
+
+LABELS = {
+    "total_packets": "Packet volume",
+    "tcp_packets": "TCP traffic",
+    "udp_packets": "UDP traffic",
+    "icmp_packets": "ICMP traffic",
+    "arp_requests": "ARP requests",
+    "data_sent": "Data sent",
+    "data_received": "Data received",
+    "arp_ratio": "ARP share of traffic",
+    "udp_ratio": "UDP/TCP ratio",
+}
+
+HOUR = timedelta(hours=1)
+# Minimum observations before a z-score is reported
+WARMUP_SAMPLES = 30
+SEASONAL_WARMUP_DAYS = 3
+SEASONAL_MIN_SAMPLES = 12
+# Keeps z finite on a flat series: std is at least this fraction of the mean. Hourly
+# baselines get a wider floor: a partial hour's mean also carries the trend within the hour
+SAMPLE_STD_FLOOR = 0.01
+HOURLY_STD_FLOOR = 0.1
+
+
+def sample_values(sample: dict) -> Dict[str, float]:
+    values = {metric: float(sample.get(metric) or 0) for metric in METRICS}
+    for ratio, (numerator, denominator) in RATIOS.items():
+        values[ratio] = values[numerator] / (values[numerator] + values[denominator]) \
+            if values[numerator] + values[denominator] else 0.0
+    return values
+
+
+def describe(anomaly: dict) -> str:
+    when = " for this time of day" if anomaly["kind"] == "seasonal" else ""
+    return f"{LABELS.get(anomaly['metric'], anomaly['metric'])} unusually {anomaly['direction']}{when} (z={anomaly['z']})"
+
+
+def _rollup_means(db: Session, model, since: datetime) -> list:
+    """(bucket, samples, per-sample values) for each rollup bucket since ``since``."""
+    columns = [getattr(model, column) for column in SUM_COLUMNS]
+    rows = db.query(model.bucket, model.samples, *columns) \
+        .filter(model.bucket >= since, model.samples > 0) \
+        .order_by(model.bucket) \
+        .all()
+    return [
+        (row.bucket, row.samples, sample_values({column: getattr(row, column) / row.samples for column in SUM_COLUMNS}))
+        for row in rows
+    ]
+
+
+class Ewma:
+    __slots__ = ("alpha", "floor", "mean", "var", "n")
+
+    def __init__(self, alpha: float, floor: float):
+        self.alpha = alpha
+        self.floor = floor
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+
+    def update(self, value: float):
+        if self.n == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.n += 1
+
+    def z(self, value: float) -> float:
+        std = max(math.sqrt(self.var), self.floor * abs(self.mean), 1e-9)
+        return (value - self.mean) / std
+
+
+class MetricState:
+    __slots__ = ("samples", "hourly", "hour", "hour_sum", "hour_count", "value", "z", "seasonal_z")
+
+    def __init__(self, alpha: float, seasonal_alpha: float):
+        self.samples = Ewma(alpha, SAMPLE_STD_FLOOR)
+        self.hourly = [Ewma(seasonal_alpha, HOURLY_STD_FLOOR) for _ in range(24)]
+        self.hour: Optional[datetime] = None
+        self.hour_sum = 0.0
+        self.hour_count = 0
+        self.value = None
+        self.z = None
+        self.seasonal_z = None
+
+    def roll_hour(self, hour: datetime):
+        if self.hour is not None and hour > self.hour and self.hour_count:
+            self.hourly[self.hour.hour].update(self.hour_sum / self.hour_count)
+        if self.hour is None or hour > self.hour:
+            self.hour, self.hour_sum, self.hour_count = hour, 0.0, 0
+
+    def update(self, hour: datetime, value: float):
+        self.roll_hour(hour)
+        if hour < self.hour:
+            return  # late sample from an hour already folded into the baseline
+
+        self.value = value
+        self.z = self.samples.z(value) if self.samples.n >= WARMUP_SAMPLES else None
+        self.samples.update(value)
+
+        self.hour_sum += value
+        self.hour_count += 1
+        baseline = self.hourly[hour.hour]
+        if baseline.n >= SEASONAL_WARMUP_DAYS and self.hour_count >= SEASONAL_MIN_SAMPLES:
+            self.seasonal_z = baseline.z(self.hour_sum / self.hour_count)
+        else:
+            self.seasonal_z = None
+
+
+class AnomalyDetector:
+    """Per-metric EWMA and hour-of-day baselines, fed by EventProcessor.handle_metric."""
+
+    def __init__(
+        self,
+        alpha: float = settings.ANOMALY_ALPHA,
+        seasonal_alpha: float = settings.ANOMALY_SEASONAL_ALPHA,
+        threshold: float = settings.ANOMALY_Z_THRESHOLD,
+        season_days: int = settings.ANOMALY_SEASON_DAYS,
+    ):
+        self.alpha = alpha
+        self.seasonal_alpha = seasonal_alpha
+        self.threshold = threshold
+        self.season_days = season_days
+        self.ready = False
+        self.last_sample: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, MetricState] = {}
+
+    def hydrate(self, db: Session):
+        now = datetime.utcnow()
+        hours = _rollup_means(db, MetricRollup1h, floor_time(now, HOUR) - timedelta(days=self.season_days))
+        minutes = _rollup_means(db, MetricRollup1m, now - HOUR)
+
+        with self._lock:
+            self._metrics = {
+                metric: MetricState(self.alpha, self.seasonal_alpha)
+                for metric in (*METRICS, *RATIOS)
+            }
+
+            for bucket, samples, values in hours:
+                for metric, state in self._metrics.items():
+                    state.roll_hour(bucket)
+                    # The last (current) hour stays open; earlier ones fold into their slot
+                    state.hour_sum = values[metric] * samples
+                    state.hour_count = samples
+
+            if minutes:
+                total = sum(samples for _, samples, _ in minutes)
+                for metric, state in self._metrics.items():
+                    means = [(samples, values[metric]) for _, samples, values in minutes]
+                    mean = sum(n * m for n, m in means) / total
+                    spread = sum(n * (m - mean) ** 2 for n, m in means) / total
+                    state.samples.mean = mean
+                    # Minute means average ~total/len samples each, so their spread
+                    # understates the per-sample variance by that factor
+                    state.samples.var = spread * total / len(means)
+                    state.samples.n = total
+                self.last_sample = minutes[-1][0]
+
+            self.ready = True
+
+    def update(self, measure_time: datetime, sample: dict):
+        measure_time = utc_naive(measure_time)
+        hour = floor_time(measure_time, HOUR)
+        values = sample_values(sample)
+
+        with self._lock:
+            for metric, value in values.items():
+                state = self._metrics.get(metric)
+                if state is None:
+                    state = self._metrics[metric] = MetricState(self.alpha, self.seasonal_alpha)
+                state.update(hour, value)
+            if self.last_sample is None or measure_time > self.last_sample:
+                self.last_sample = measure_time
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                metric: {
+                    "value": state.value,
+                    "mean": round(state.samples.mean, 6),
+                    "std": round(math.sqrt(state.samples.var), 6),
+                    "z": None if state.z is None else round(state.z, 3),
+                    "seasonal_z": None if state.seasonal_z is None else round(state.seasonal_z, 3),
+                    "samples": state.samples.n,
+                }
+                for metric, state in self._metrics.items()
+            }
+
+    def anomalies(self) -> List[dict]:
+        """Metrics whose latest sample (z) or current-hour level (seasonal_z) is past the threshold."""
+        found = []
+        for metric, state in self.snapshot().items():
+            for kind in ("z", "seasonal_z"):
+                score = state[kind]
+                if score is not None and abs(score) >= self.threshold:
+                    found.append({
+                        "metric": metric,
+                        "kind": "seasonal" if kind == "seasonal_z" else "spike",
+                        "direction": "high" if score > 0 else "low",
+                        "z": score,
+                        "value": state["value"],
+                        "mean": state["mean"],
+                    })
+        return found
+
+
+anomaly_detector = AnomalyDetector()
@@ -0,0 +1,109 @@
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.services.frontend_state import FrontendState, frontend_state
+from app.services.websocket_manager import WebSocketManager, manager
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bound on collector events carried by one coalesced frame
+MAX_EVENTS_PER_FRAME = 100
+
+
+class BroadcastScheduler:
+    """Coalesces frontend broadcasts into at most one frame per tick.
+
+    Ingest only marks which views are dirty; every ``tick`` seconds the
+    scheduler rebuilds those views from the latest state and emits one
+    combined frame, so broadcast cost is bounded by the tick rate rather
+    than the inbound event rate. A tick of 0 emits on every publish.
+    """
+
+    def __init__(
+        self,
+        builders: Optional[Dict[str, Callable[[], Optional[dict]]]] = None,
+        tick: float = settings.BROADCAST_TICK_MS / 1000,
+        websocket_manager: WebSocketManager = manager,
+        state: FrontendState = frontend_state,
+    ):
+        self.builders = builders or {}
+        self.tick = tick
+        self.manager = websocket_manager
+        self.state = state
+
+        self.views: Dict[str, Optional[dict]] = {}
+        self.totals = {"published": 0, "emitted": 0, "coalesced": 0}
+
+        self._dirty = set()
+        self._events: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.tick > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def publish(self, event: dict, views: Iterable[str]):
+        """Record a committed collector message and the views it touched."""
+        self.totals["published"] += 1
+        self._dirty.update(views)
+        self._events.append(event)
+        if len(self._events) > MAX_EVENTS_PER_FRAME:
+            del self._events[0]
+
+        if self.tick <= 0:
+            await self.flush()
+
+    async def flush(self):
+        if not self._dirty and not self._events:
+            return
+
+        dirty, self._dirty = self._dirty, set()
+        events, self._events = self._events, []
+
+        # Views nobody touched since the last frame are reused as-is
+        for name, build in self.builders.items():
+            if name in dirty or name not in self.views:
+                self.views[name] = build()
+
+        event = events[-1] if events else None
+        ws_message = {"event": event, **self.views}
+        if len(events) > 1:
+            ws_message["events"] = events
+
+        await self.manager.broadcast(ws_message)
+
+        patch = self.state.update(self.views, event, compute_patch=self.manager.has_clients("delta"))
+        if patch:
+            if len(events) > 1:
+                patch["events"] = events
+            await self.manager.broadcast(patch, protocol="delta")
+
+        self.totals["emitted"] += 1
+        self.totals["coalesced"] = self.totals["published"] - self.totals["emitted"]
+
+    def get_stats(self) -> dict:
+        return {
+            "tick_ms": round(self.tick * 1000, 2),
+            "pending_views": sorted(self._dirty),
+            "pending_events": len(self._events),
+            "totals": dict(self.totals),
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Broadcast failed: %s", e)
+
+
+broadcaster = BroadcastScheduler()
@@ -0,0 +1,202 @@
+"""Per-day report summaries: computed from the base tables, or stored once a day is over.
+
+A past day's summary is written to daily_summaries by DailySummaryJob and
+read back with one primary-key lookup. Today (and any day without a
+stored row) is computed live. The set of devices seen today is kept in
+memory by ConnectedDevices, so today's summary doesn't rescan
+device_events either. A date range is computed with one grouped query
+per table for the days that have no stored row. Ingest expires a stored day when a late write
+lands on it, and the job computes it again.
+"""
+import json
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import Date, delete, func
+from sqlalchemy.orm import Session
+
+from app.models.daily_summary import DailySummary
+from app.models.device import Device
+from app.models.device_event import DeviceEvent
+from app.models.metric_rollup import MetricRollup1d
+
+# Tables a summary is computed from (as named in EventProcessor.touch)
+SUMMARY_INPUTS = ("device_events", "network_metrics", "device_first_seen")
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def day_bounds(day: date):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def day_range(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def compute_summaries(
+    db: Session,
+    start: date,
+    end: date,
+    known_device_ids: Optional[Dict[date, List[str]]] = None,
+    include_device_ids: bool = True,
+) -> Dict[date, dict]:
+    """Live summaries for every day in [start, end], one grouped query per table.
+
+    Days in ``known_device_ids`` (from ConnectedDevices) skip the
+    device_events scan. With ``include_device_ids`` off only the per-day
+    counts are read.
+    """
+    days = day_range(start, end)
+    known = known_device_ids or {}
+    range_start, range_end = day_bounds(start)[0], day_bounds(end)[1]
+
+    # Devices that had any event, per day
+    device_ids: Dict[date, list] = {day: list(known[day]) for day in days if day in known}
+    connected: Dict[date, int] = {day: len(ids) for day, ids in device_ids.items()}
+    scan = [day for day in days if day not in known]
+    if scan:
+        event_day = func.date(DeviceEvent.timestamp, type_=Date)
+        window = (
+            DeviceEvent.timestamp >= day_bounds(scan[0])[0],
+            DeviceEvent.timestamp < day_bounds(scan[-1])[1],
+        )
+        if include_device_ids:
+            for day, mac in db.query(event_day, DeviceEvent.device_id).filter(*window).distinct():
+                if day not in known:
+                    device_ids.setdefault(day, []).append(mac)
+            for day in scan:
+                connected[day] = len(device_ids.get(day, ()))
+        else:
+            rows = db.query(event_day, func.count(DeviceEvent.device_id.distinct())) \
+                .filter(*window) \
+                .group_by(event_day)
+            connected.update({day: count for day, count in rows if day not in known})
+
+    # Peak active devices and traffic: whole days, so the daily rollup rows as they are
+    metrics = {
+        row.bucket.date(): row for row in db.query(MetricRollup1d).filter(
+            MetricRollup1d.bucket >= range_start,
+            MetricRollup1d.bucket < range_end
+        )
+    }
+
+    # Inactive devices: seen before or on the day, but with no event on it
+    devices_ever = db.query(func.count(Device.id)).filter(Device.first_seen_day < start).scalar() or 0
+    first_seen = dict(
+        db.query(Device.first_seen_day, func.count(Device.id))
+        .filter(Device.first_seen_day >= start, Device.first_seen_day <= end)
+        .group_by(Device.first_seen_day)
+    )
+
+    summaries = {}
+    for day in days:
+        devices_ever += first_seen.get(day, 0)
+        rollup = metrics.get(day)
+        summaries[day] = {
+            "day": day,
+            "connected_devices": connected.get(day, 0),
+            "peak_active": rollup.max_active_devices if rollup else 0,
+            "inactive_devices": max(0, devices_ever - connected.get(day, 0)),
+            "data_sent": rollup.data_sent if rollup else 0,
+            "data_received": rollup.data_received if rollup else 0,
+            "total_packets": int(rollup.total_packets) if rollup else 0,
+            "device_ids": sorted(device_ids.get(day, ())) if include_device_ids else None,
+        }
+    return summaries
+
+
+def compute_summary(db: Session, day: date, device_ids: Optional[List[str]] = None) -> dict:
+    known = {day: device_ids} if device_ids is not None else None
+    return compute_summaries(db, day, day, known)[day]
+
+
+def stored_summary(row: DailySummary, include_device_ids: bool = True) -> dict:
+    return {
+        "day": row.day,
+        "connected_devices": row.connected_devices,
+        "peak_active": row.peak_active,
+        "inactive_devices": row.inactive_devices,
+        "data_sent": row.data_sent,
+        "data_received": row.data_received,
+        "total_packets": row.total_packets,
+        "device_ids": json.loads(row.device_ids) if include_device_ids else None,
+    }
+
+
+def summary_response(summary: dict) -> dict:
+    response = {
+        "date": summary["day"].isoformat(),
+        "summary": {
+            "connected_devices_count": summary["connected_devices"],
+            "peak_active_concurrently": summary["peak_active"],
+            "inactive_devices_count": summary["inactive_devices"],
+            "total_traffic": {
+                "sent_mb": round(summary["data_sent"] / (1024 * 1024), 2),
+                "received_mb": round(summary["data_received"] / (1024 * 1024), 2),
+                "total_packets": summary["total_packets"]
+            }
+        }
+    }
+    if summary["device_ids"] is not None:
+        response["device_ids"] = summary["device_ids"]
+    return response
+
+
+def expire_summaries(db: Session, table: str, day: date):
+    """Drop stored summaries a late write to ``table`` on ``day`` has made stale."""
+    if table == "device_first_seen":
+        # Counts as inactive on every later day too
+        db.execute(delete(DailySummary).where(DailySummary.day >= day))
+    else:
+        db.execute(delete(DailySummary).where(DailySummary.day == day))
+
+
+class ConnectedDevices:
+    """MACs with at least one device event, per UTC day, from the day of hydration on."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._days: Dict[date, Set[str]] = {}
+        self._since: Optional[date] = None
+
+    def hydrate(self, db: Session):
+        today = utc_today()
+        start, end = day_bounds(today)
+        rows = db.query(DeviceEvent.device_id).filter(
+            DeviceEvent.timestamp >= start,
+            DeviceEvent.timestamp < end
+        ).distinct()
+
+        with self._lock:
+            self._days = {today: {row[0] for row in rows if row[0]}}
+            self._since = today
+
+    def record(self, events: List[tuple]):
+        """Add committed (mac, day) events."""
+        with self._lock:
+            if self._since is None:
+                return
+            for mac, day in events:
+                if mac and day >= self._since:
+                    self._days.setdefault(day, set()).add(mac)
+
+            # Yesterday stays until the summary job has had a chance to run
+            oldest = utc_today() - timedelta(days=1)
+            for day in [d for d in self._days if d < oldest]:
+                del self._days[day]
+            self._since = max(self._since, oldest)
+
+    def device_ids(self, day: date) -> Optional[List[str]]:
+        """Devices seen on ``day``, or None when that day isn't fully tracked."""
+        with self._lock:
+            if self._since is None or day < self._since:
+                return None
+            return list(self._days.get(day, ()))
+
+
+connected_devices = ConnectedDevices()
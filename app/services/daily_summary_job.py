@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import Date, func, select
+
+from app.core.config import settings
+from app.models.daily_summary import DailySummary
+from app.models.device_event import DeviceEvent
+from app.models.metric_rollup import MetricRollup1d
+from app.models.network_metrics import NetworkMetric
+from app.services.daily_summaries import compute_summary, day_bounds, utc_today
+from app.services.ingest_writer import IngestWriter, ingest_writer
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# --- writer thread (called through IngestWriter.run) ---
+
+def missing_days(processor, backfill_days: int) -> List[date]:
+    """Days up to yesterday that have data but no stored summary, oldest first."""
+    db = processor.db
+    yesterday = utc_today() - timedelta(days=1)
+
+    firsts = [
+        db.execute(select(func.min(MetricRollup1d.bucket))).scalar(),
+        db.execute(select(func.min(DeviceEvent.timestamp))).scalar(),
+    ]
+    firsts = [value.date() for value in firsts if value is not None]
+    if not firsts:
+        return []
+
+    start = max(min(firsts), yesterday - timedelta(days=backfill_days - 1))
+    stored = set(db.execute(
+        select(DailySummary.day).where(DailySummary.day >= start, DailySummary.day <= yesterday)
+    ).scalars())
+
+    unrolled = days_without_rollups(db, start, yesterday)
+    if unrolled:
+        # Summaries read the 1d rollup; storing these now would freeze them at zero traffic
+        logger.warning(
+            "Skipping %d day(s) whose metric rollups are incomplete (%s .. %s); "
+            "run scripts.backfill_metric_rollups", len(unrolled), min(unrolled), max(unrolled)
+        )
+
+    days = []
+    day = start
+    while day <= yesterday:
+        if day not in stored and day not in unrolled:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def days_without_rollups(db, start: date, end: date) -> set:
+    """Days in [start, end] whose raw network_metrics rows aren't all counted in network_metrics_1d."""
+    range_start, range_end = day_bounds(start)[0], day_bounds(end)[1]
+    raw_day = func.date(NetworkMetric.measure_time, type_=Date)
+    raw = dict(db.execute(
+        select(raw_day, func.count(NetworkMetric.id))
+        .where(NetworkMetric.measure_time >= range_start, NetworkMetric.measure_time < range_end)
+        .group_by(raw_day)
+    ).all())
+    if not raw:
+        return set()
+    rolled = {
+        bucket.date(): samples for bucket, samples in db.execute(
+            select(MetricRollup1d.bucket, MetricRollup1d.samples)
+            .where(MetricRollup1d.bucket >= range_start, MetricRollup1d.bucket < range_end)
+        )
+    }
+    return {day for day, count in raw.items() if rolled.get(day, 0) < count}
+
+
+def finalize_day(processor, day: date):
+    summary = compute_summary(processor.db, day)
+    try:
+        processor.db.merge(DailySummary(
+            **{**summary, "device_ids": json.dumps(summary["device_ids"])},
+            finalized_at=datetime.now(timezone.utc)
+        ))
+        processor.commit()
+    except Exception:
+        processor.rollback()
+        raise
+
+
+class DailySummaryJob:
+    """Stores each finished day's report summary in daily_summaries.
+
+    Runs once at startup, backfilling up to ``backfill_days`` of missing
+    days, and then ``delay`` seconds after every UTC midnight, which
+    finalizes yesterday and recomputes any day a late write expired.
+    Every day is its own job on the ingest writer thread, like retention
+    chunks.
+    """
+
+    def __init__(
+        self,
+        writer: IngestWriter = ingest_writer,
+        delay: float = settings.DAILY_SUMMARY_DELAY_S,
+        backfill_days: int = settings.DAILY_SUMMARY_BACKFILL_DAYS,
+    ):
+        self.writer = writer
+        self.delay = delay
+        self.backfill_days = backfill_days
+
+        self.recent_runs: deque = deque(maxlen=20)
+        self.totals = {"runs": 0, "days_finalized": 0}
+
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.backfill_days > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def run_once(self) -> dict:
+        async with self._lock:
+            started = time.perf_counter()
+            days = await self.writer.run(missing_days, self.backfill_days)
+            for day in days:
+                await self.writer.run(finalize_day, day)
+
+            report = {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "days_finalized": [day.isoformat() for day in days],
+            }
+            self.totals["runs"] += 1
+            self.totals["days_finalized"] += len(days)
+            self.recent_runs.append(report)
+
+            if days:
+                logger.info("Finalized daily summaries for %d day(s): %s .. %s", len(days), days[0], days[-1])
+            return report
+
+    def get_stats(self) -> dict:
+        return {
+            "delay_s": self.delay,
+            "backfill_days": self.backfill_days,
+            "totals": dict(self.totals),
+            "recent_runs": list(self.recent_runs),
+        }
+
+    def seconds_until_next_run(self, now: datetime) -> float:
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+        next_run = midnight + timedelta(seconds=self.delay)
+        # Still before today's run time (e.g. started just after midnight)
+        if now < next_run - timedelta(days=1):
+            next_run -= timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.exception("Daily summary run failed: %s", e)
+            await asyncio.sleep(self.seconds_until_next_run(datetime.now(timezone.utc)))
+
+
+daily_summary_job = DailySummaryJob()
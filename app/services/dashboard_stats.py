@@ -0,0 +1,115 @@
+import threading
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.device import Device
+
+STATUSES = ("active", "idle", "left")
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Match what comes back from SQLite so DB- and payload-built rows agree
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class DashboardStats:
+    """In-memory aggregate behind EventProcessor.get_dashboard_stats.
+
+    Hydrated once from the devices table, then kept current by the ingest
+    handlers after each commit, so reading it never touches the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: Dict[str, dict] = {}
+        self._first_seen_day: Dict[str, Optional[date]] = {}
+        self._status_counts: Counter = Counter()
+        self._new_by_day: Counter = Counter()
+        self._device_list: Optional[List[dict]] = None
+
+    def hydrate(self, db: Session):
+        rows = db.query(
+            Device.device_id,
+            Device.hostname,
+            Device.ip_address,
+            Device.vendor,
+            Device.device_type,
+            Device.status,
+            Device.first_seen,
+            Device.last_seen,
+        ).order_by(Device.id).all()
+
+        with self._lock:
+            self._devices.clear()
+            self._first_seen_day.clear()
+            self._status_counts.clear()
+            self._new_by_day.clear()
+            self._device_list = None
+
+            for row in rows:
+                self._apply(row._asdict())
+
+    def apply(self, rows: List[dict]):
+        """Record the committed state of the given device rows."""
+        with self._lock:
+            for row in rows:
+                self._apply(row)
+            self._device_list = None
+
+    def first_seen_day(self, mac: str) -> Optional[date]:
+        """Committed first_seen day of a device (None for a device not seen yet)."""
+        return self._first_seen_day.get(mac)
+
+    def snapshot(self) -> dict:
+        today = datetime.now(timezone.utc).date()
+
+        with self._lock:
+            if self._device_list is None:
+                self._device_list = list(self._devices.values())
+
+            return {
+                "new_devices_today": self._new_by_day[today],
+                "active_devices": self._status_counts["active"],
+                "idle_devices": self._status_counts["idle"],
+                "left_devices": self._status_counts["left"],
+                "total_devices": len(self._devices),
+                "devices": self._device_list
+            }
+
+    def _apply(self, row: dict):
+        mac = row["device_id"]
+        previous = self._devices.get(mac)
+
+        if previous:
+            self._status_counts[previous["status"]] -= 1
+            self._new_by_day[self._first_seen_day[mac]] -= 1
+
+        first_seen = _utc_naive(row.get("first_seen"))
+        last_seen = _utc_naive(row.get("last_seen"))
+
+        # first_seen is never overwritten once set, by either write path
+        first_seen_day = self._first_seen_day.get(mac)
+        if first_seen_day is None and first_seen:
+            first_seen_day = first_seen.date()
+
+        self._devices[mac] = {
+            "id": mac,
+            "name": row.get("hostname"),
+            "ip": row.get("ip_address"),
+            "mac": mac,
+            "vendor": row.get("vendor"),
+            "type": row.get("device_type"),
+            "status": row.get("status"),
+            "lastSeen": last_seen.isoformat() if last_seen else None
+        }
+        self._first_seen_day[mac] = first_seen_day
+        self._status_counts[row.get("status")] += 1
+        self._new_by_day[first_seen_day] += 1
+
+
+dashboard_stats = DashboardStats()
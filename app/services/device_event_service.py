@@ -0,0 +1,110 @@
+import base64
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.device_event import DeviceEvent
+from app.services.metric_rollups import utc_naive
+from app.utils.payload_codec import decode_payload
+from app.utils.serializer import dumps_text
+
+# Fields a client can ask for; raw_json means decoding every payload, so it is opt-in
+EVENT_FIELDS = ("id", "device_id", "event_type", "timestamp", "hostname", "ip_address", "vendor", "device_type", "raw_json")
+DEFAULT_FIELDS = ("id", "device_id", "event_type", "timestamp")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp: datetime, event_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{event_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, event_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(event_id)
+    except ValueError as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(DEFAULT_FIELDS)
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in EVENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def event_columns(fields: List[str]) -> list:
+    columns = [getattr(DeviceEvent, f) for f in fields if f != "raw_json"]
+    # Keyset columns always come back so a cursor can be built
+    columns += [DeviceEvent.timestamp.label("_timestamp"), DeviceEvent.id.label("_id")]
+    if "raw_json" in fields:
+        columns += [DeviceEvent.raw_json.label("_raw_json"), DeviceEvent.payload.label("_payload")]
+    return columns
+
+
+def filter_events(query, device_id=None, event_type=None, start=None, end=None):
+    if device_id:
+        query = query.where(DeviceEvent.device_id == device_id)
+    if event_type:
+        query = query.where(DeviceEvent.event_type == event_type)
+    if start:
+        query = query.where(DeviceEvent.timestamp >= utc_naive(start))
+    if end:
+        query = query.where(DeviceEvent.timestamp < utc_naive(end))
+    return query
+
+
+def event_dict(row, fields: List[str]) -> dict:
+    event = {f: getattr(row, f) for f in fields if f != "raw_json"}
+    if "raw_json" in fields:
+        event["raw_json"] = row._raw_json if row._payload is None else dumps_text(decode_payload(row._payload))
+    return event
+
+
+class DeviceEventService:
+    """Keyset-paginated device event listing, newest first.
+
+    Pages are ordered by (timestamp, id) descending and the cursor is the
+    last row's (timestamp, id), so every page is an index range read,
+    however deep into the history it is.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_events(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        device_id: Optional[str] = None,
+        event_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        fields: Optional[List[str]] = None,
+    ) -> dict:
+        fields = fields or list(DEFAULT_FIELDS)
+
+        query = filter_events(select(*event_columns(fields)), device_id, event_type, start, end)
+        if cursor:
+            query = query.where(tuple_(DeviceEvent.timestamp, DeviceEvent.id) < decode_cursor(cursor))
+
+        query = query.order_by(DeviceEvent.timestamp.desc(), DeviceEvent.id.desc()).limit(limit + 1)
+        rows = (await self.db.execute(query)).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return {
+            "events": [event_dict(row, fields) for row in rows],
+            "next_cursor": encode_cursor(rows[-1]._timestamp, rows[-1]._id) if has_more else None,
+        }
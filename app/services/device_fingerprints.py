@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.device import Device
+
+# Columns the topology handler rewrites on every snapshot
+FINGERPRINT_FIELDS = (
+    "hostname",
+    "ip_address",
+    "device_type",
+    "os",
+    "vendor",
+    "last_seen",
+    "status",
+    "online",
+    "data_sent",
+    "data_received",
+    "packet_count",
+)
+
+# Columns the reports show from a device row
+INFO_FIELDS = ("hostname", "ip_address", "device_type", "os", "vendor")
+
+
+def _normalize(value):
+    # SQLite hands datetimes back naive (UTC); payloads parse to aware ones
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat()
+    return value
+
+
+def fingerprint(row: dict, fields=FINGERPRINT_FIELDS) -> int:
+    """Hash of the topology-written fields of a device row."""
+    return hash(tuple(_normalize(row.get(field)) for field in fields))
+
+
+class DeviceFingerprints:
+    """Last committed fingerprint per MAC, used to skip unchanged snapshot rows.
+
+    A second, committed-only hash of the INFO_FIELDS tells whether a
+    snapshot changed what the reports show about a device.
+    """
+
+    def __init__(self):
+        self._fingerprints: Dict[str, int] = {}
+        self._info: Dict[str, int] = {}
+        self.last_snapshot = {"changed": 0, "skipped": 0}
+        self.totals = {"snapshots": 0, "changed": 0, "skipped": 0}
+
+    def hydrate(self, db: Session):
+        columns = [getattr(Device, field) for field in FINGERPRINT_FIELDS]
+        rows = db.query(Device.device_id, *columns).all()
+
+        self._fingerprints = {
+            row[0]: hash(tuple(_normalize(value) for value in row[1:]))
+            for row in rows
+        }
+        self._info = {
+            row[0]: fingerprint(dict(zip(FINGERPRINT_FIELDS, row[1:])), INFO_FIELDS)
+            for row in rows
+        }
+
+    def changed_rows(self, rows: List[dict], pending: Dict[str, Optional[int]]) -> List[dict]:
+        """Rows that differ from the device's state in the open transaction; updates ``pending``.
+
+        ``pending`` holds fingerprints written earlier in the same
+        transaction (None = device row written outside the snapshot path),
+        falling back to the last committed one.
+        """
+        changed = []
+        for row in rows:
+            mac = row["device_id"]
+            current = fingerprint(row)
+            previous = pending[mac] if mac in pending else self._fingerprints.get(mac)
+            if previous != current:
+                changed.append(row)
+                pending[mac] = current
+        return changed
+
+    def info_changed(self, rows: List[dict]) -> bool:
+        """Whether any row's INFO_FIELDS differ from the device's committed ones."""
+        return any(self._info.get(row["device_id"]) != fingerprint(row, INFO_FIELDS) for row in rows)
+
+    def record_info(self, rows: List[dict]):
+        """Make committed rows' INFO_FIELDS the committed state."""
+        for row in rows:
+            self._info[row["device_id"]] = fingerprint(row, INFO_FIELDS)
+
+    def promote(self, pending: Dict[str, Optional[int]]):
+        """Make a committed transaction's fingerprints the committed state."""
+        for mac, value in pending.items():
+            if value is None:
+                self._fingerprints.pop(mac, None)
+            else:
+                self._fingerprints[mac] = value
+
+    def record_snapshot(self, changed: int, skipped: int):
+        self.last_snapshot = {"changed": changed, "skipped": skipped}
+        self.totals["snapshots"] += 1
+        self.totals["changed"] += changed
+        self.totals["skipped"] += skipped
+
+    def get_stats(self) -> dict:
+        return {
+            "tracked_devices": len(self._fingerprints),
+            "last_snapshot": dict(self.last_snapshot),
+            "totals": dict(self.totals),
+        }
+
+
+device_fingerprints = DeviceFingerprints()
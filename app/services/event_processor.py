@@ -2,37 +2,192 @@ import json
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
+from app.core.config import settings
 from app.models.device import Device
 from app.models.device_event import DeviceEvent
+from app.models.device_session import DeviceSession
+from app.models.device_traffic_daily import DeviceTrafficDaily
 from app.models.network_metrics import NetworkMetric
+from app.services.activity_counters import ActivityCounters, activity_counters
+from app.services.anomaly_detector import AnomalyDetector, anomaly_detector
+from app.services.daily_summaries import SUMMARY_INPUTS, ConnectedDevices, connected_devices, expire_summaries, utc_today
+from app.services.dashboard_stats import DashboardStats, dashboard_stats
+from app.services.device_fingerprints import DeviceFingerprints, device_fingerprints
+from app.services.device_sessions import track
+from app.services.response_cache import ResponseCache, response_cache
+from app.services.metric_rollups import MAX_COLUMNS, ROLLUPS, SUM_COLUMNS, floor_time, utc_naive
+from app.services.traffic_counters import COUNTER_FIELDS, TrafficCounters, traffic_counters
+from app.utils.logger import get_logger
+from app.utils.payload_codec import encode_payload
+
+logger = get_logger(__name__)
+
+
+# Numeric PERIODIC_METRIC_STATE fields stored on network_metrics
+METRIC_COLUMNS = (
+    "total_devices",
+    "active_devices",
+    "data_sent",
+    "data_received",
+    "arp_requests",
+    "tcp_packets",
+    "udp_packets",
+    "icmp_packets",
+    "total_packets",
+)
+
+
+def metric_value(metrics: dict, column: str) -> int:
+    """A metric field as an int; missing/null is 0, anything non-numeric rejects the message."""
+    value = metrics.get(column)
+    if value is None:
+        return 0
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Non-numeric {column}: {value!r}")
 
 
 class EventProcessor:
 
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        topology_write_mode: str = settings.TOPOLOGY_WRITE_MODE,
+        fingerprints: DeviceFingerprints = device_fingerprints,
+        stats: DashboardStats = dashboard_stats,
+        counters: TrafficCounters = traffic_counters,
+        activity: ActivityCounters = activity_counters,
+        cache: ResponseCache = response_cache,
+        detector: AnomalyDetector = anomaly_detector,
+        connected: ConnectedDevices = connected_devices,
+    ):
         self.db = db
+        # "orm" (SELECT + mutate per device) or "upsert" (one executemany upsert)
+        self.topology_write_mode = topology_write_mode
+        self.fingerprints = fingerprints
+        self.stats = stats
+        self.counters = counters
+        self.activity = activity
+        self.cache = cache
+        self.detector = detector
+        self.connected = connected
+        # In-memory state updates that only apply once the transaction commits
+        self._after_commit = []
+        # Snapshot counters written in the open transaction, by MAC
+        self._pending_counters = {}
+        # Device fingerprints written in the open transaction, by MAC (None = unknown)
+        self._pending_fingerprints = {}
+        # (table, day) pairs written in the open transaction, for response cache invalidation
+        self._writes = set()
 
-    def process_event(self, message: dict):
+    def hydrate_state(self):
+        """Seed the in-memory ingest state from the database (run once at startup)."""
+        self.fingerprints.hydrate(self.db)
+        self.stats.hydrate(self.db)
+        self.counters.hydrate(self.db)
+        if settings.ACTIVITY_COUNT_MODE == "memory":
+            self.activity.hydrate(self.db)
+        self.detector.hydrate(self.db)
+        self.connected.hydrate(self.db)
+
+    def after_commit(self, fn):
+        self._after_commit.append(fn)
+
+    def touch(self, table: str, day=None):
+        if (table, day) in self._writes:
+            return
+        self._writes.add((table, day))
+        if day is not None and table in SUMMARY_INPUTS and day < utc_today():
+            # Late write to a finished day: drop its stored summary, DailySummaryJob recomputes it
+            expire_summaries(self.db, table, day)
+
+    def commit(self):
+        self.db.commit()
+        self.committed()
+
+    def committed(self):
+        """Apply the in-memory side of a transaction that has just committed.
+
+        Never raises: the rows are already durable, so a failing hook must
+        not send the batch down the rollback/replay path.
+        """
+        hooks, self._after_commit = self._after_commit, []
+        writes, self._writes = self._writes, set()
+        fingerprints, self._pending_fingerprints = self._pending_fingerprints, {}
+        self._pending_counters = {}
+        self.fingerprints.promote(fingerprints)
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                logger.exception("After-commit hook failed: %s", e)
         try:
-            subtype = message.get("subtype")
-            payload = message.get("payload")
-
-            if subtype == "DEVICE_JOINED":
-                self.handle_device_joined(payload)
-            elif subtype == "DEVICE_IDLE":
-                self.handle_device_idle(payload)
-            elif subtype == "DEVICE_LEFT":
-                self.handle_device_left(payload)
-            elif subtype == "PERIODIC_METRIC_STATE":
-                self.handle_metric(payload)
-            elif subtype == "PERIODIC_TOPOLOGY_STATE":
-                self.handle_topology_snapshot(payload['topology']['devices'])
+            self.cache.invalidate(writes)
+        except Exception as e:
+            logger.exception("Response cache invalidation failed: %s", e)
 
+    def rollback(self):
+        self.db.rollback()
+        self._after_commit = []
+        self._pending_counters = {}
+        self._pending_fingerprints = {}
+        self._writes = set()
+
+    def process_event(self, message: dict):
+        try:
+            self.apply_event(message)
             self.db.commit()
         except Exception as e:
-            self.db.rollback()
+            self.rollback()
             raise e
+        self.committed()
+
+    def process_batch(self, messages: list) -> int:
+        """Apply messages in a single transaction and return how many failed.
+
+        If the batch cannot be committed as a whole, it is rolled back and
+        replayed one message per transaction so a single bad message only
+        loses itself.
+        """
+        try:
+            for message in messages:
+                self.apply_event(message)
+                # Later messages in the batch must see rows added by earlier ones
+                self.db.flush()
+            self.db.commit()
+        except Exception:
+            self.rollback()
+        else:
+            self.committed()
+            return 0
+
+        failed = 0
+        for message in messages:
+            try:
+                self.process_event(message)
+            except Exception as e:
+                failed += 1
+                logger.warning("Dropped %s message: %s", message.get("subtype"), e)
+        return failed
+
+    def apply_event(self, message: dict):
+        subtype = message.get("subtype")
+        payload = message.get("payload")
+
+        if subtype == "DEVICE_JOINED":
+            self.handle_device_joined(payload)
+        elif subtype == "DEVICE_IDLE":
+            self.handle_device_idle(payload)
+        elif subtype == "DEVICE_LEFT":
+            self.handle_device_left(payload)
+        elif subtype == "PERIODIC_METRIC_STATE":
+            self.handle_metric(payload)
+        elif subtype == "PERIODIC_TOPOLOGY_STATE":
+            self.handle_topology_snapshot(payload['topology']['devices'])
 
     def handle_device_joined(self, payload):
         device_data = payload["device"]
@@ -49,6 +204,7 @@ class EventProcessor:
                 os=device_data.get("os"),
                 vendor=device_data.get("vendor"),
                 first_seen=timestamp,
+                first_seen_day=timestamp.date(),
                 last_seen=timestamp,
                 status="active",
                 online=True,
@@ -57,18 +213,18 @@ class EventProcessor:
                 packet_count=0,
             )
             self.db.add(device)
+            self.touch("device_first_seen", device.first_seen_day)
+            self.touch("device_info")
         else:
             device.last_seen = timestamp
             device.status = "active"
             device.online = True
 
-        event = DeviceEvent(
-            device_id=mac,
-            event_type="DEVICE_JOINED",
-            timestamp=timestamp,
-            raw_json=json.dumps(payload)
-        )
-        self.db.add(event)
+        # Written outside the snapshot path: the next snapshot row for it counts as changed
+        self._pending_fingerprints[mac] = None
+        self.stage_device(device)
+
+        self.db.add(self.device_event(mac, "DEVICE_JOINED", timestamp, payload))
         
     def handle_device_left(self, payload):
         device_data = payload["device"]
@@ -81,13 +237,10 @@ class EventProcessor:
             device.online = False
             device.last_seen = timestamp
 
-        event = DeviceEvent(
-            device_id=mac,
-            event_type="DEVICE_LEFT",
-            timestamp=timestamp,
-            raw_json=json.dumps(payload)
-        )
-        self.db.add(event)
+        self._pending_fingerprints[mac] = None
+        self.stage_device(device)
+
+        self.db.add(self.device_event(mac, "DEVICE_LEFT", timestamp, payload))
 
     def handle_device_idle(self, payload):
         device_data = payload["device"]
@@ -100,74 +253,226 @@ class EventProcessor:
             device.online = True
             device.last_seen = timestamp
 
+        self._pending_fingerprints[mac] = None
+        self.stage_device(device)
+
+        self.db.add(self.device_event(mac, "DEVICE_IDLE", timestamp, payload))
+
+    def device_event(self, mac, event_type, timestamp, payload) -> DeviceEvent:
+        device_data = payload.get("device", {})
+
         event = DeviceEvent(
             device_id=mac,
-            event_type="DEVICE_IDLE",
+            event_type=event_type,
             timestamp=timestamp,
-            raw_json=json.dumps(payload)
+            hostname=device_data.get("hostname"),
+            ip_address=device_data.get("ip_address"),
+            vendor=device_data.get("vendor"),
+            device_type=device_data.get("device_type"),
         )
-        self.db.add(event)
+        if settings.EVENT_PAYLOAD_STORAGE == "compressed":
+            event.payload = encode_payload(payload, settings.EVENT_PAYLOAD_CODEC)
+        else:
+            event.raw_json = json.dumps(payload)
+
+        if self.activity.ready:
+            self.after_commit(lambda: self.activity.record([(mac, timestamp)]))
+        day = utc_naive(timestamp).date()
+        self.after_commit(lambda: self.connected.record([(mac, day)]))
+        self.touch("device_events", day)
+        self.track_session(mac, event_type, timestamp)
+        return event
+
+    def track_session(self, mac, event_type, timestamp):
+        open_session = self.db.query(DeviceSession).filter(
+            DeviceSession.device_id == mac,
+            DeviceSession.ended_at.is_(None)
+        ).first()
+        _, created = track(open_session, mac, event_type, utc_naive(timestamp))
+        if created is not None:
+            self.db.add(created)
+        # Online time changes from the event's day on, whichever session edge moved
+        self.touch("device_sessions", utc_naive(timestamp).date())
 
     def handle_metric(self, payload):
         metrics = payload["metrics"]
+        measure_time = utc_naive(datetime.fromisoformat(metrics["measure_time"].replace("Z", "+00:00")))
         metric_row = NetworkMetric(
-            measure_time=datetime.fromisoformat(metrics["measure_time"].replace("Z", "+00:00")),
-            total_devices=metrics.get("total_devices", 0),
-            active_devices=metrics.get("active_devices", 0),
-            data_sent=metrics.get("data_sent", 0),
-            data_received=metrics.get("data_received", 0),
-            arp_requests=metrics.get("arp_requests", 0),
-            tcp_packets=metrics.get("tcp_packets", 0),
-            udp_packets=metrics.get("udp_packets", 0),
-            icmp_packets=metrics.get("icmp_packets", 0),
-            total_packets=metrics.get("total_packets", 0)
+            measure_time=measure_time,
+            **{column: metric_value(metrics, column) for column in METRIC_COLUMNS}
         )
         self.db.add(metric_row)
+        self.increment_metric_rollups(metric_row)
+        self.touch("network_metrics", measure_time.date())
+
+        sample = {column: getattr(metric_row, column) for column in SUM_COLUMNS}
+        self.after_commit(lambda: self.detector.update(measure_time, sample))
+
+    def increment_metric_rollups(self, metric_row: NetworkMetric):
+        """Fold one sample into its minute/hour/day buckets (upsert-increment, same transaction)."""
+        greatest = func.greatest if self.db.get_bind().dialect.name == "postgresql" else func.max
+
+        values = {column: getattr(metric_row, column) or 0 for column in SUM_COLUMNS}
+        values.update({rollup: getattr(metric_row, column) or 0 for rollup, column in MAX_COLUMNS.items()})
+
+        for step, model, _ in ROLLUPS:
+            stmt = self._dialect_insert(model).values(
+                bucket=floor_time(metric_row.measure_time, step),
+                samples=1,
+                **values
+            )
+            excluded = stmt.excluded
+            set_ = {"samples": model.samples + 1}
+            set_.update({column: getattr(model, column) + excluded[column] for column in SUM_COLUMNS})
+            set_.update({column: greatest(getattr(model, column), excluded[column]) for column in MAX_COLUMNS})
+            self.db.execute(stmt.on_conflict_do_update(index_elements=[model.bucket], set_=set_))
 
     def handle_topology_snapshot(self, devices_payload):
-        for device_data in devices_payload:
-            mac = device_data["mac"]
+        rows = [self.topology_row(device_data) for device_data in devices_payload]
+        # A MAC listed twice would hit one row twice in a single upsert, which Postgres rejects; last entry wins
+        rows = list({row["device_id"]: row for row in rows}.values())
+
+        # Only rows that differ from the device's current state (this transaction included) are written
+        changed = self.fingerprints.changed_rows(rows, self._pending_fingerprints)
+        skipped = len(rows) - len(changed)
+
+        pending = self._pending_counters
+        if changed:
+            if self.topology_write_mode == "upsert":
+                self.upsert_topology_snapshot(changed)
+            else:
+                self.merge_topology_snapshot(changed)
+
+            ledger = self.counters.ledger_rows(changed, pending)
+            if ledger:
+                self.record_traffic(ledger)
 
-            device = self.db.query(Device).filter_by(device_id=mac).first()
+            self.touch("devices")
+            if self.fingerprints.info_changed(changed):
+                self.touch("device_info")
+            for row in changed:
+                if self.stats.first_seen_day(row["device_id"]) is None:
+                    self.touch("device_first_seen", row["first_seen_day"])
+            for entry in ledger:
+                self.touch("device_traffic_daily", entry["day"])
 
-            first_seen_dt = datetime.fromisoformat(device_data.get("first_seen").replace("Z", "+00:00")) \
-                if device_data.get("first_seen") else datetime.now(timezone.utc)
-            last_seen_dt = datetime.fromisoformat(device_data.get("last_seen").replace("Z", "+00:00")) \
-                if device_data.get("last_seen") else datetime.now(timezone.utc)
+        def apply():
+            self.fingerprints.record_snapshot(len(changed), skipped)
+            self.fingerprints.record_info(changed)
+            self.stats.apply(changed)
+            self.counters.update(pending)
 
-            status = device_data.get("status", "active")
+        self.after_commit(apply)
+
+    def stage_device(self, device):
+        """Push the device's new state to the dashboard aggregate once committed."""
+        if device is None:
+            return
+
+        self.touch("devices")
+        row = {
+            "device_id": device.device_id,
+            "hostname": device.hostname,
+            "ip_address": device.ip_address,
+            "vendor": device.vendor,
+            "device_type": device.device_type,
+            "status": device.status,
+            "first_seen": device.first_seen,
+            "last_seen": device.last_seen,
+        }
+        self.after_commit(lambda: self.stats.apply([row]))
+
+    def merge_topology_snapshot(self, rows):
+        """ORM path: one SELECT per device, then mutate the loaded rows."""
+        for row in rows:
+            row = dict(row)
+
+            device = self.db.query(Device).filter_by(device_id=row["device_id"]).first()
 
             if not device:
-                device = Device(
-                    device_id=mac,
-                    hostname=device_data.get("hostname"),
-                    ip_address=device_data.get("ip_address"),
-                    device_type=device_data.get("device_type"),
-                    os=device_data.get("os"),
-                    vendor=device_data.get("vendor"),
-                    first_seen=first_seen_dt,
-                    last_seen=last_seen_dt,
-                    status=status,
-                    online=(status != "left"),
-                    data_sent=device_data.get("data_sent", 0),
-                    data_received=device_data.get("data_received", 0),
-                    packet_count=device_data.get("packet_count", 0),
-                )
+                device = Device(**row)
                 self.db.add(device)
             else:
-                device.hostname = device_data.get("hostname")
-                device.ip_address = device_data.get("ip_address")
-                device.device_type = device_data.get("device_type")
-                device.os = device_data.get("os")
-                device.vendor = device_data.get("vendor")
-                device.last_seen = last_seen_dt
-                device.status = status
-                device.online = (status != "left")
-                device.data_sent = device_data.get("data_sent", 0)
-                device.data_received = device_data.get("data_received", 0)
-                device.packet_count = device_data.get("packet_count", 0)
+                first_seen_dt = row.pop("first_seen")
+                first_seen_day = row.pop("first_seen_day")
+                for key, value in row.items():
+                    setattr(device, key, value)
                 if not device.first_seen:
                     device.first_seen = first_seen_dt
+                    device.first_seen_day = first_seen_day
+
+    def upsert_topology_snapshot(self, rows):
+        """Set-based path: one INSERT ... ON CONFLICT(device_id) DO UPDATE for the whole snapshot."""
+        stmt = self._dialect_insert(Device)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Device.device_id],
+            set_={
+                "hostname": excluded.hostname,
+                "ip_address": excluded.ip_address,
+                "device_type": excluded.device_type,
+                "os": excluded.os,
+                "vendor": excluded.vendor,
+                "first_seen": func.coalesce(Device.first_seen, excluded.first_seen),
+                "first_seen_day": func.coalesce(Device.first_seen_day, excluded.first_seen_day),
+                "last_seen": excluded.last_seen,
+                "status": excluded.status,
+                "online": excluded.online,
+                "data_sent": excluded.data_sent,
+                "data_received": excluded.data_received,
+                "packet_count": excluded.packet_count,
+                "updated_at": func.now(),
+            },
+        )
+        self.db.execute(stmt, rows)
+
+        # Devices already loaded into this session are now stale
+        for obj in list(self.db.identity_map.values()):
+            if isinstance(obj, Device):
+                self.db.expire(obj)
+
+    def record_traffic(self, ledger):
+        """Add snapshot deltas to device_traffic_daily (upsert-increment per device and day)."""
+        stmt = self._dialect_insert(DeviceTrafficDaily)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DeviceTrafficDaily.device_id, DeviceTrafficDaily.day],
+            set_={
+                column: getattr(DeviceTrafficDaily, column) + excluded[column]
+                for column in COUNTER_FIELDS.values()
+            },
+        )
+        self.db.execute(stmt, ledger)
+
+    def topology_row(self, device_data) -> dict:
+        first_seen_dt = datetime.fromisoformat(device_data.get("first_seen").replace("Z", "+00:00")) \
+            if device_data.get("first_seen") else datetime.now(timezone.utc)
+        last_seen_dt = datetime.fromisoformat(device_data.get("last_seen").replace("Z", "+00:00")) \
+            if device_data.get("last_seen") else datetime.now(timezone.utc)
+
+        status = device_data.get("status", "active")
+
+        return {
+            "device_id": device_data["mac"],
+            "hostname": device_data.get("hostname"),
+            "ip_address": device_data.get("ip_address"),
+            "device_type": device_data.get("device_type"),
+            "os": device_data.get("os"),
+            "vendor": device_data.get("vendor"),
+            "first_seen": first_seen_dt,
+            "first_seen_day": first_seen_dt.date(),
+            "last_seen": last_seen_dt,
+            "status": status,
+            "online": (status != "left"),
+            "data_sent": device_data.get("data_sent", 0),
+            "data_received": device_data.get("data_received", 0),
+            "packet_count": device_data.get("packet_count", 0),
+        }
+
+    def _dialect_insert(self, model):
+        if self.db.get_bind().dialect.name == "postgresql":
+            return postgresql_insert(model)
+        return sqlite_insert(model)
 
     # Function to print all table data for debugging
     def print_all_data(self):
@@ -184,37 +489,4 @@ class EventProcessor:
             print(vars(e))
 
     def get_dashboard_stats(self):
-        today = datetime.now(timezone.utc).date()
-
-        new_devices_today = self.db.query(Device).filter(
-            func.date(Device.first_seen) == today
-        ).count()
-
-        active_devices = self.db.query(Device).filter(Device.status == "active").count()
-        idle_devices = self.db.query(Device).filter(Device.status == "idle").count()
-        left_devices = self.db.query(Device).filter(Device.status == "left").count()
-        total_devices = self.db.query(Device).count()
-
-        devices = self.db.query(Device).all()
-        device_list = [
-            {
-                "id": d.device_id,
-                "name": d.hostname,
-                "ip": d.ip_address,
-                "mac": d.device_id,
-                "vendor": d.vendor,
-                "type": d.device_type,
-                "status": d.status,
-                "lastSeen": d.last_seen.isoformat() if d.last_seen else None
-            }
-            for d in devices
-        ]
-
-        return {
-            "new_devices_today": new_devices_today,
-            "active_devices": active_devices,
-            "idle_devices": idle_devices,
-            "left_devices": left_devices,
-            "total_devices": total_devices,
-            "devices": device_list
-        }
\ No newline at end of file
+        return self.stats.snapshot()
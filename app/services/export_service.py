@@ -0,0 +1,107 @@
+"""Streaming NDJSON/CSV exports of device_events and network_metrics.
+
+Rows are read with ``AsyncSession.stream`` and ``yield_per``, so only
+one batch is in memory at a time, and each batch is encoded (and
+optionally gzipped) and handed to the response as soon as it is read.
+The session is opened inside the generator because the request's
+dependencies are torn down before a streaming body is sent.
+
+On SQLite a long export holds one read snapshot open for its whole
+duration, which keeps the WAL from being checkpointed past it until the
+export finishes.
+"""
+import csv
+import io
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, Callable, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncReadSessionLocal
+from app.models.device_event import DeviceEvent
+from app.models.network_metrics import NetworkMetric
+from app.services.device_event_service import event_columns, event_dict, filter_events
+from app.services.metric_rollups import utc_naive
+from app.utils.serializer import dumps
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+METRIC_FIELDS = [column.name for column in NetworkMetric.__table__.columns]
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_batch(rows: List[dict], fmt: str, fields: List[str]) -> bytes:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([_csv_value(row[f]) for f in fields] for row in rows)
+        return buffer.getvalue().encode("utf-8")
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+async def stream_export(
+    query,
+    to_dict: Callable,
+    fields: List[str],
+    fmt: str,
+    compress: bool = False,
+    batch_size: int = settings.EXPORT_BATCH_SIZE,
+    session_factory=AsyncReadSessionLocal,
+) -> AsyncIterator[bytes]:
+    # wbits=31: gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    if fmt == "csv":
+        yield emit(",".join(fields).encode("utf-8") + b"\r\n")
+
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            chunk = emit(encode_batch([to_dict(row) for row in partition], fmt, fields))
+            if chunk:
+                yield chunk
+
+    if compressor:
+        yield compressor.flush()
+
+
+def export_device_events(
+    fmt: str,
+    fields: List[str],
+    compress: bool = False,
+    device_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    query = filter_events(select(*event_columns(fields)), device_id, event_type, start, end) \
+        .order_by(DeviceEvent.timestamp, DeviceEvent.id)
+    return stream_export(query, lambda row: event_dict(row, fields), fields, fmt, compress)
+
+
+def export_network_metrics(
+    fmt: str,
+    compress: bool = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    query = select(NetworkMetric.__table__)
+    if start:
+        query = query.where(NetworkMetric.measure_time >= utc_naive(start))
+    if end:
+        query = query.where(NetworkMetric.measure_time < utc_naive(end))
+    query = query.order_by(NetworkMetric.measure_time, NetworkMetric.id)
+    return stream_export(query, lambda row: row._asdict(), METRIC_FIELDS, fmt, compress)
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional
+
+# List fields diffed row-by-row, keyed by the given field
+KEYED_LISTS = {"devices": "id"}
+
+
+def diff_rows(old: List[dict], new: List[dict], key: str) -> dict:
+    old_by_key = {row.get(key): row for row in old}
+    new_keys = set()
+    upsert = []
+
+    for row in new:
+        row_key = row.get(key)
+        new_keys.add(row_key)
+        previous = old_by_key.get(row_key)
+        if previous is not row and previous != row:
+            upsert.append(row)
+
+    remove = [row_key for row_key in old_by_key if row_key not in new_keys]
+
+    changes = {}
+    if upsert:
+        changes["upsert"] = upsert
+    if remove:
+        changes["remove"] = remove
+    return changes
+
+
+def diff_view(old: Optional[dict], new: Optional[dict]) -> dict:
+    """Field-level changes that turn ``old`` into ``new``.
+
+    Keyed lists (see KEYED_LISTS) become ``{"upsert": [...], "remove": [...]}``,
+    any other changed field is sent whole under ``set``.
+    """
+    if old is new:
+        return {}
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return {"replace": new} if old != new else {}
+
+    changes = {}
+    for field, value in new.items():
+        previous = old.get(field)
+        if previous is value:
+            continue
+
+        if field in KEYED_LISTS and isinstance(previous, list) and isinstance(value, list):
+            row_changes = diff_rows(previous, value, KEYED_LISTS[field])
+            if row_changes:
+                changes[field] = row_changes
+        elif previous != value or field not in old:
+            changes.setdefault("set", {})[field] = value
+
+    removed = [field for field in old if field not in new]
+    if removed:
+        changes["unset"] = removed
+
+    return changes
+
+
+class FrontendState:
+    """Latest frontend views plus a sequence number for the delta protocol.
+
+    Delta clients get a ``snapshot`` frame on connect (and on resync), then
+    ``patch`` frames that carry only what changed. Every patch names the
+    sequence number it applies on top of (``prev_seq``) so clients can
+    detect a gap and ask for a resync.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.views: Dict[str, Optional[dict]] = {}
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "snapshot",
+            "seq": self.seq,
+            "state": dict(self.views),
+        }
+
+    def update(self, views: Dict[str, Optional[dict]], event: Optional[dict] = None,
+               compute_patch: bool = True) -> Optional[dict]:
+        """Store the new views and return the patch frame, or None if nothing changed."""
+        previous, self.views = self.views, dict(views)
+
+        if not compute_patch:
+            # Nobody is listening for patches; new clients start from a snapshot
+            self.seq += 1
+            return None
+
+        changes = {}
+        for name, view in views.items():
+            view_changes = diff_view(previous.get(name), view)
+            if view_changes:
+                changes[name] = view_changes
+
+        if not changes and event is None:
+            return None
+
+        self.seq += 1
+        patch = {
+            "type": "patch",
+            "seq": self.seq,
+            "prev_seq": self.seq - 1,
+            "changes": changes,
+        }
+        if event is not None:
+            patch["event"] = event
+        return patch
+
+
+frontend_state = FrontendState()
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.event_processor import EventProcessor
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class IngestWriter:
+    """Group-commit writer for collector messages.
+
+    Socket handlers put messages on a bounded asyncio queue. A drain task
+    groups them into batches (up to ``max_batch_size`` messages or
+    ``max_delay`` seconds after the first one) and hands each batch to a
+    single dedicated writer thread, which applies it in one transaction.
+    The event loop never waits on SQLite.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = settings.INGEST_QUEUE_SIZE,
+        max_batch_size: int = settings.INGEST_MAX_BATCH_SIZE,
+        max_delay: float = settings.INGEST_MAX_DELAY_MS / 1000,
+        session_factory=SessionLocal,
+    ):
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.session_factory = session_factory
+
+        # Called on the event loop with the messages of each committed batch
+        self.on_commit: Optional[Callable[[List[dict]], Awaitable[None]]] = None
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.recent_batches: deque = deque(maxlen=100)
+        self.totals = {"batches": 0, "messages": 0, "failed": 0, "commit_seconds": 0.0}
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+        self._processor: Optional[EventProcessor] = None
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+        await self._in_writer(self._open_session)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._task:
+            return
+
+        # Flush whatever is still queued, then shut the writer thread down
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+
+        await self._in_writer(self._close_session)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    async def submit(self, message: dict):
+        """Queue a collector message; waits only while the queue is full."""
+        await self.queue.put(message)
+
+    async def run(self, fn: Callable, *args):
+        """Run ``fn(processor, *args)`` on the writer thread and return its result."""
+        return await self._in_writer(fn, self._processor, *args)
+
+    def get_stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "max_batch_size": self.max_batch_size,
+            "max_delay_ms": round(self.max_delay * 1000, 2),
+            "totals": dict(self.totals),
+            "recent_batches": list(self.recent_batches),
+        }
+
+    async def _run(self):
+        stopping = False
+
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if not batch:
+                continue
+
+            queue_depth = self.queue.qsize()
+            started = time.perf_counter()
+            try:
+                failed, commit_seconds = await self._in_writer(self._write_batch, batch)
+            except Exception as e:
+                # Keep draining: submit() would otherwise block forever once the queue fills
+                logger.exception("Ingest batch of %d message(s) failed: %s", len(batch), e)
+                await self._in_writer(self._discard_batch)
+                self._record_batch(len(batch), len(batch), time.perf_counter() - started, queue_depth)
+                continue
+            self._record_batch(len(batch), failed, commit_seconds, queue_depth)
+
+            if self.on_commit:
+                try:
+                    await self.on_commit(batch)
+                except Exception as e:
+                    logger.exception("Post-commit hook failed: %s", e)
+
+    async def _next_batch(self):
+        first = await self.queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+
+        while len(batch) < self.max_batch_size:
+            # Take everything already queued without waiting
+            if not self.queue.empty():
+                message = self.queue.get_nowait()
+            else:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            if message is None:
+                return batch, True
+            batch.append(message)
+
+        return batch, False
+
+    def _record_batch(self, size: int, failed: int, commit_seconds: float, queue_depth: int):
+        self.totals["batches"] += 1
+        self.totals["messages"] += size
+        self.totals["failed"] += failed
+        self.totals["commit_seconds"] = round(self.totals["commit_seconds"] + commit_seconds, 6)
+
+        self.recent_batches.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "size": size,
+            "failed": failed,
+            "commit_ms": round(commit_seconds * 1000, 3),
+            "queue_depth": queue_depth,
+        })
+
+    async def _in_writer(self, fn: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    # --- writer thread ---
+
+    def _open_session(self):
+        self._db = self.session_factory()
+        self._processor = EventProcessor(self._db)
+        self._processor.hydrate_state()
+
+    def _close_session(self):
+        if self._db:
+            self._db.close()
+        self._db = None
+        self._processor = None
+
+    def _write_batch(self, batch: List[dict]):
+        started = time.perf_counter()
+        failed = self._processor.process_batch(batch)
+        return failed, time.perf_counter() - started
+
+    def _discard_batch(self):
+        # Nothing of a batch that raised is kept, in the database or in memory
+        try:
+            self._processor.rollback()
+        except Exception as e:
+            logger.exception("Rollback after failed ingest batch failed: %s", e)
+
+
+ingest_writer = IngestWriter()
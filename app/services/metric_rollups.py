@@ -0,0 +1,165 @@
+"""Range aggregates over network_metrics, served from the rollup tables.
+
+EventProcessor.handle_metric keeps network_metrics_1m/1h/1d up to date on
+ingest. A query window [start, end) is split into the coarsest aligned
+pieces: whole days from the daily table, whole hours either side of them
+from the hourly table, whole minutes from the minute table, and only the
+sub-minute edges from raw network_metrics. Any window therefore costs a
+handful of index range reads no matter how much history is kept.
+
+Retention keeps the finer tables for less time (raw rows for days, minutes
+for weeks), so the parts of a window older than that are planned with the
+finest table that still holds them.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.metric_rollup import MetricRollup1d, MetricRollup1h, MetricRollup1m
+from app.models.network_metrics import NetworkMetric
+
+# Coarsest first; the unit names match date_trunc / the backfill script
+ROLLUPS = [
+    (timedelta(days=1), MetricRollup1d, "day"),
+    (timedelta(hours=1), MetricRollup1h, "hour"),
+    (timedelta(minutes=1), MetricRollup1m, "minute"),
+]
+
+SUM_COLUMNS = (
+    "data_sent",
+    "data_received",
+    "total_packets",
+    "tcp_packets",
+    "udp_packets",
+    "icmp_packets",
+    "arp_requests",
+)
+
+# Rollup column -> network_metrics column it is the maximum of
+MAX_COLUMNS = {
+    "max_active_devices": "active_devices",
+    "max_total_devices": "total_devices",
+}
+
+# Finest first: table (None = raw network_metrics), its bucket size, days retention keeps it (0 = forever)
+RETAINED_TABLES = [
+    (None, None, settings.RETENTION_METRICS_DAYS),
+    (MetricRollup1m, timedelta(minutes=1), settings.RETENTION_METRICS_1M_DAYS),
+    (MetricRollup1h, timedelta(hours=1), settings.RETENTION_METRICS_1H_DAYS),
+    (MetricRollup1d, timedelta(days=1), settings.RETENTION_METRICS_1D_DAYS),
+]
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def utc_naive(ts: datetime) -> datetime:
+    """Timestamps are stored as naive UTC."""
+    if ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def floor_time(ts: datetime, step: timedelta) -> datetime:
+    return ts - (ts - EPOCH) % step
+
+
+def ceil_time(ts: datetime, step: timedelta) -> datetime:
+    floored = floor_time(ts, step)
+    return floored if floored == ts else floored + step
+
+
+def plan_segments(start: datetime, end: datetime, levels=ROLLUPS) -> list:
+    """Split [start, end) into (model, start, end) pieces; model None means raw rows."""
+    if start >= end:
+        return []
+    if not levels:
+        return [(None, start, end)]
+
+    step, model, _ = levels[0]
+    inner_start, inner_end = ceil_time(start, step), floor_time(end, step)
+    if inner_start >= inner_end:
+        return plan_segments(start, end, levels[1:])
+
+    return (
+        plan_segments(start, inner_start, levels[1:])
+        + [(model, inner_start, inner_end)]
+        + plan_segments(inner_end, end, levels[1:])
+    )
+
+
+def retained_from(now: datetime, tables=RETAINED_TABLES) -> dict:
+    """Oldest time each table still holds (RetentionService cuts at whole UTC days); kept-forever tables are absent."""
+    today = datetime.combine(now.date(), datetime.min.time())
+    return {model: today - timedelta(days=days) for model, _, days in tables if days > 0}
+
+
+def plan_retained_segments(start: datetime, end: datetime, retained: dict, tables=RETAINED_TABLES) -> list:
+    """plan_segments, with each part of [start, end) read from the finest table that still holds it.
+
+    A part older than the raw rows is widened to whole buckets of the table
+    it falls back to (the minute, hour or day its edge is in) rather than
+    read from a table retention has already emptied. Parts older than every
+    table are left out.
+    """
+    segments = []
+    upper = end
+    for model, step, _ in tables:
+        lower = min(max(start, retained[model]), upper) if model in retained else start
+        if lower < upper:
+            part_start, part_end = (lower, upper) if step is None else (floor_time(lower, step), ceil_time(upper, step))
+            segments = plan_segments(part_start, part_end) + segments
+        upper = lower
+        if upper <= start:
+            break
+    return segments
+
+
+class MetricRollupService:
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def aggregate(self, start: datetime, end: Optional[datetime] = None) -> dict:
+        """Sums and maxima of network_metrics over [start, end).
+
+        With no end the window is open, so samples stamped slightly ahead of
+        the server clock are still counted.
+        """
+        start = utc_naive(start)
+        now = datetime.utcnow()
+        retained = retained_from(now)
+
+        if end is None:
+            planned_end = max(start, floor_time(now, ROLLUPS[-1][0]))
+            segments = plan_retained_segments(start, planned_end, retained) + [(None, planned_end, None)]
+        else:
+            segments = plan_retained_segments(start, utc_naive(end), retained)
+
+        totals = {"samples": 0, **{c: 0 for c in SUM_COLUMNS}, **{c: 0 for c in MAX_COLUMNS}}
+        for model, seg_start, seg_end in segments:
+            row = self._query_segment(model, seg_start, seg_end)
+            totals["samples"] += row[0] or 0
+            for i, column in enumerate(SUM_COLUMNS, start=1):
+                totals[column] += row[i] or 0
+            for i, column in enumerate(MAX_COLUMNS, start=1 + len(SUM_COLUMNS)):
+                totals[column] = max(totals[column], row[i] or 0)
+
+        return totals
+
+    def _query_segment(self, model, start: datetime, end: Optional[datetime]):
+        if model is None:
+            columns = [func.count(NetworkMetric.id)] \
+                + [func.sum(getattr(NetworkMetric, c)) for c in SUM_COLUMNS] \
+                + [func.max(getattr(NetworkMetric, c)) for c in MAX_COLUMNS.values()]
+            query = self.db.query(*columns).filter(NetworkMetric.measure_time >= start)
+            if end is not None:
+                query = query.filter(NetworkMetric.measure_time < end)
+            return query.one()
+
+        columns = [func.sum(model.samples)] \
+            + [func.sum(getattr(model, c)) for c in SUM_COLUMNS] \
+            + [func.max(getattr(model, c)) for c in MAX_COLUMNS]
+        return self.db.query(*columns).filter(model.bucket >= start, model.bucket < end).one()
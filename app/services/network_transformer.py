@@ -93,7 +93,8 @@ def build_ip_alerts(topology: Dict):
         if not d.get("online"):
 
             alerts.append({
-                "id": str(uuid.uuid4()),
+                # Stable per device and timestamp so repeated frames carry the same alert id
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{d.get('mac')}/{d.get('last_seen')}")),
 
                 "timestamp": d.get("last_seen"),
 
@@ -1,157 +1,346 @@
-from sqlalchemy.orm import Session
+import zlib
+from collections import defaultdict
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date, timedelta
-from sqlalchemy import func, and_
-import json
+from typing import AsyncIterator, List, Optional, Union
+from sqlalchemy import func
 
+from app.core.database import AsyncReadSessionLocal
+from app.models.daily_summary import DailySummary
 from app.models.device import Device
-from app.models.device_event import DeviceEvent
-from app.models.network_metrics import NetworkMetric
+from app.models.device_event import DeviceEvent, event_details
+from app.models.device_traffic_daily import DeviceTrafficDaily
+from app.services.daily_summaries import (
+    compute_summaries, compute_summary, connected_devices, day_bounds, day_range, stored_summary, summary_response,
+    utc_today
+)
+from app.services.device_sessions import online_at, online_seconds, overlapping
+from app.utils.serializer import dumps
+
+# Devices per set of grouped queries in a batch device report
+DEVICE_REPORT_CHUNK_SIZE = 500
 
 class ReportService:
     def __init__(self, db: Session):
         self.db = db
 
     def get_summary_by_date(self, target_date: date):
-        start_datetime = datetime.combine(target_date, datetime.min.time())
-        end_datetime = datetime.combine(target_date, datetime.max.time())
-
-        # Devices that had any event on this date
-        active_ids_today = self.db.query(DeviceEvent.device_id).filter(
-            and_(
-                DeviceEvent.timestamp >= start_datetime,
-                DeviceEvent.timestamp <= end_datetime
-            )
-        ).distinct().all()
-        active_ids_today = [d[0] for d in active_ids_today]
+        # A finished day is read from its stored summary once DailySummaryJob has written it
+        if target_date < utc_today():
+            stored = self.db.get(DailySummary, target_date)
+            if stored is not None:
+                return summary_response(stored_summary(stored))
 
-        # Connected devices (Unique devices seen in events)
-        total_connected = len(active_ids_today)
+        return summary_response(compute_summary(self.db, target_date, connected_devices.device_ids(target_date)))
 
-        # Peak active devices from metrics
-        peak_active = self.db.query(func.max(NetworkMetric.active_devices)).filter(
-            and_(
-                NetworkMetric.measure_time >= start_datetime,
-                NetworkMetric.measure_time <= end_datetime
-            )
-        ).scalar() or 0
-
-        # Inactive devices: Devices that were seen before this date but NOT on this date
-        total_devices_ever = self.db.query(Device).filter(
-            Device.first_seen <= end_datetime
-        ).count()
-        inactive_count = total_devices_ever - total_connected
-
-        # Traffic
-        traffic = self.db.query(
-            func.sum(NetworkMetric.data_sent).label("sent"),
-            func.sum(NetworkMetric.data_received).label("received"),
-            func.sum(NetworkMetric.total_packets).label("packets")
-        ).filter(
-            and_(
-                NetworkMetric.measure_time >= start_datetime,
-                NetworkMetric.measure_time <= end_datetime
-            )
-        ).first()
+    def get_summary_range(self, start_date: date, end_date: date, include_device_ids: bool = True):
+        """get_summary_by_date for every day in [start_date, end_date], as one series."""
+        stored_query = self.db.query(DailySummary).filter(
+            DailySummary.day >= start_date,
+            DailySummary.day <= min(end_date, utc_today() - timedelta(days=1))
+        )
+        if not include_device_ids:
+            stored_query = stored_query.options(defer(DailySummary.device_ids))
+        summaries = {row.day: stored_summary(row, include_device_ids) for row in stored_query}
 
-        # Handle None results from sum()
-        sent_mb = round((traffic.sent or 0) / (1024 * 1024), 2) if traffic else 0
-        received_mb = round((traffic.received or 0) / (1024 * 1024), 2) if traffic else 0
-        total_packets = int(traffic.packets or 0) if traffic else 0
+        # Days without a stored row, computed live one contiguous run at a time
+        missing = [day for day in day_range(start_date, end_date) if day not in summaries]
+        runs = []
+        for day in missing:
+            if runs and day == runs[-1][1] + timedelta(days=1):
+                runs[-1][1] = day
+            else:
+                runs.append([day, day])
+        for first, last in runs:
+            known = {}
+            for day in day_range(first, last):
+                device_ids = connected_devices.device_ids(day)
+                if device_ids is not None:
+                    known[day] = device_ids
+            summaries.update(compute_summaries(self.db, first, last, known, include_device_ids))
 
         return {
-            "date": target_date.isoformat(),
-            "summary": {
-                "connected_devices_count": total_connected,
-                "peak_active_concurrently": peak_active,
-                "inactive_devices_count": max(0, inactive_count),
-                "total_traffic": {
-                    "sent_mb": sent_mb,
-                    "received_mb": received_mb,
-                    "total_packets": total_packets
-                }
-            },
-            "device_ids": active_ids_today
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "days": [summary_response(summaries[day]) for day in day_range(start_date, end_date)]
         }
 
-    def get_device_detail_report(self, device_id: str, target_date: date):
-        start_datetime = datetime.combine(target_date, datetime.min.time())
-        end_datetime = datetime.combine(target_date, datetime.max.time())
-
-        device = self.db.query(Device).filter(Device.device_id == device_id).first()
-        if not device:
+    def get_device_detail_report(self, device_id: str, target_date: date, include_details: bool = True):
+        report = self.get_device_reports([device_id], target_date, target_date, include_details)[0]
+        if "error" in report:
             return None
 
-        # Connection frequency (How many times did they join?)
-        connection_events = self.db.query(DeviceEvent).filter(
-            and_(
-                DeviceEvent.device_id == device_id,
-                DeviceEvent.event_type == "DEVICE_JOINED",
-                DeviceEvent.timestamp >= start_datetime,
-                DeviceEvent.timestamp <= end_datetime
-            )
-        ).count()
-
-        # Activities (What did they access?)
-        # Based on models, access_logs and access_services are in Device model,
-        # but for history we might need to check events.
-        # Assuming events raw_json might contain more info.
-        events = self.db.query(DeviceEvent).filter(
-            and_(
-                DeviceEvent.device_id == device_id,
-                DeviceEvent.timestamp >= start_datetime,
-                DeviceEvent.timestamp <= end_datetime
-            )
-        ).order_by(DeviceEvent.timestamp.asc()).all()
+        return {
+            "device_info": report["device_info"],
+            "report_date": target_date.isoformat(),
+            "metrics": report["metrics"],
+            "activities": report["activities"]
+        }
+
+    def get_device_reports(self, device_ids: List[str], start_date: date, end_date: date, include_details: bool = True):
+        """Device reports over [start_date, end_date] for many devices: one grouped query per table.
+
+        Returns one report per device ID, in order; unknown IDs get an
+        ``error`` entry instead.
+        """
+        start, end = day_bounds(start_date)[0], day_bounds(end_date)[1]
+
+        devices = {
+            d.device_id: d for d in
+            self.db.query(Device).filter(Device.device_id.in_(device_ids)).all()
+        }
+        found = [device_id for device_id in device_ids if device_id in devices]
 
-        activities = []
+        # Connections and activities, from every event in the range
+        columns = [DeviceEvent.device_id, DeviceEvent.event_type, DeviceEvent.timestamp]
+        if include_details:
+            # Payloads are only loaded and decoded when details are requested
+            columns += [DeviceEvent.payload, DeviceEvent.raw_json]
+        events = self.db.query(*columns).filter(
+            DeviceEvent.device_id.in_(found),
+            DeviceEvent.timestamp >= start,
+            DeviceEvent.timestamp < end
+        ).order_by(DeviceEvent.device_id, DeviceEvent.timestamp)
+
+        connections = defaultdict(int)
+        activities = defaultdict(list)
         for event in events:
-            try:
-                data = json.loads(event.raw_json) if event.raw_json else {}
-            except:
-                data = {}
-            
-            activities.append({
+            activity = {
                 "timestamp": event.timestamp.isoformat(),
-                "event_type": event.event_type,
-                "details": data
+                "event_type": event.event_type
+            }
+            if include_details:
+                try:
+                    activity["details"] = event_details(event.payload, event.raw_json)
+                except Exception:
+                    activity["details"] = {}
+            activities[event.device_id].append(activity)
+            if event.event_type == "DEVICE_JOINED":
+                connections[event.device_id] += 1
+
+        # Time online in the range, from the sessions ingest maintains (a session
+        # still open counts up to now, or to the end of the range)
+        sessions = defaultdict(list)
+        for session in overlapping(self.db, start, end, found):
+            sessions[session.device_id].append(session)
+        now = datetime.utcnow()
+
+        # Traffic from the snapshot-delta ledger
+        traffic = {
+            row.device_id: row for row in self.db.query(
+                DeviceTrafficDaily.device_id,
+                func.sum(DeviceTrafficDaily.bytes_sent).label("bytes_sent"),
+                func.sum(DeviceTrafficDaily.bytes_received).label("bytes_received"),
+                func.sum(DeviceTrafficDaily.packets).label("packets")
+            ).filter(
+                DeviceTrafficDaily.device_id.in_(found),
+                DeviceTrafficDaily.day >= start_date,
+                DeviceTrafficDaily.day <= end_date
+            ).group_by(DeviceTrafficDaily.device_id)
+        }
+
+        reports = []
+        for device_id in device_ids:
+            device = devices.get(device_id)
+            if device is None:
+                reports.append({"device_id": device_id, "error": "Device not found"})
+                continue
+
+            duration_seconds = online_seconds(sessions[device_id], start, end, now)
+            device_traffic = traffic.get(device_id)
+            reports.append({
+                "device_info": {
+                    "device_id": device.device_id,
+                    "hostname": device.hostname,
+                    "ip_address": device.ip_address,
+                    "vendor": device.vendor,
+                    "device_type": device.device_type,
+                    "os": device.os
+                },
+                "period": {"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+                "metrics": {
+                    "connection_count": connections[device_id],
+                    "total_duration_minutes": round(duration_seconds / 60, 2),
+                    "data_sent_bytes": device_traffic.bytes_sent if device_traffic else 0,
+                    "data_received_bytes": device_traffic.bytes_received if device_traffic else 0,
+                    "packet_count": device_traffic.packets if device_traffic else 0
+                },
+                "activities": activities[device_id]
             })
+        return reports
 
-        # Calculate connection duration
-        # Simplified: Time between JOINED and LEFT events
-        duration_seconds = 0
-        last_join_time = None
-        
-        for event in events:
-            if event.event_type == "DEVICE_JOINED":
-                last_join_time = event.timestamp
-            elif event.event_type == "DEVICE_LEFT" and last_join_time:
-                duration_seconds += (event.timestamp - last_join_time).total_seconds()
-                last_join_time = None
-        
-        # If still connected at the end of the day or currently
-        if last_join_time:
-            # If the date is today, use current time, else end of that day
-            if target_date == datetime.utcnow().date():
-                end_calc = datetime.utcnow()
-            else:
-                end_calc = end_datetime
-            duration_seconds += (end_calc - last_join_time).total_seconds()
+    def device_id_page(self, after: Optional[str], limit: int) -> List[str]:
+        """Known device IDs in order, ``limit`` at a time, after ``after``."""
+        query = self.db.query(Device.device_id).filter(Device.device_id.is_not(None))
+        if after is not None:
+            query = query.filter(Device.device_id > after)
+        return [row[0] for row in query.order_by(Device.device_id).limit(limit)]
+
+    def get_online_time(self, device_id: str, start: datetime, end: datetime):
+        now = datetime.utcnow()
+        sessions = overlapping(self.db, start, end, [device_id])
 
         return {
-            "device_info": {
-                "device_id": device.device_id,
-                "hostname": device.hostname,
-                "ip_address": device.ip_address,
-                "vendor": device.vendor,
-                "device_type": device.device_type,
-                "os": device.os
-            },
-            "report_date": target_date.isoformat(),
-            "metrics": {
-                "connection_count": connection_events,
-                "total_duration_minutes": round(duration_seconds / 60, 2),
-                "data_sent_bytes": device.data_sent if target_date == datetime.utcnow().date() else 0, # Note: this model stores totals, historical per-day would need another table or diffs
-                "data_received_bytes": device.data_received if target_date == datetime.utcnow().date() else 0
-            },
-            "activities": activities
+            "device_id": device_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "online_seconds": round(online_seconds(sessions, start, end, now), 3),
+            "sessions": [
+                {
+                    "started_at": session.started_at.isoformat(),
+                    "ended_at": session.ended_at.isoformat() if session.ended_at else None,
+                    "online_seconds": round(online_seconds([session], start, end, now), 3)
+                }
+                for session in sessions
+            ]
         }
+
+    def get_presence(self, at: datetime):
+        sessions = online_at(self.db, at)
+
+        devices = {
+            d.device_id: d for d in
+            self.db.query(Device).filter(Device.device_id.in_([s.device_id for s in sessions])).all()
+        }
+
+        return {
+            "at": at.isoformat(),
+            "online_count": len(sessions),
+            "devices": [
+                {
+                    "device_id": session.device_id,
+                    "hostname": devices[session.device_id].hostname if session.device_id in devices else None,
+                    "ip_address": devices[session.device_id].ip_address if session.device_id in devices else None,
+                    "online_since": session.started_at.isoformat()
+                }
+                for session in sessions
+            ]
+        }
+
+    def get_top_talkers(self, start_date: date, end_date: date, limit: int = 10):
+        total_bytes = func.sum(DeviceTrafficDaily.bytes_sent + DeviceTrafficDaily.bytes_received)
+
+        rows = self.db.query(
+            DeviceTrafficDaily.device_id,
+            func.sum(DeviceTrafficDaily.bytes_sent).label("bytes_sent"),
+            func.sum(DeviceTrafficDaily.bytes_received).label("bytes_received"),
+            func.sum(DeviceTrafficDaily.packets).label("packets"),
+            total_bytes.label("total_bytes")
+        ).filter(
+            DeviceTrafficDaily.day >= start_date,
+            DeviceTrafficDaily.day <= end_date
+        ).group_by(
+            DeviceTrafficDaily.device_id
+        ).order_by(total_bytes.desc()).limit(limit).all()
+
+        devices = {
+            d.device_id: d for d in
+            self.db.query(Device).filter(Device.device_id.in_([r.device_id for r in rows])).all()
+        }
+
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "top_talkers": [
+                {
+                    "device_id": r.device_id,
+                    "hostname": devices[r.device_id].hostname if r.device_id in devices else None,
+                    "ip_address": devices[r.device_id].ip_address if r.device_id in devices else None,
+                    "data_sent_bytes": r.bytes_sent,
+                    "data_received_bytes": r.bytes_received,
+                    "packet_count": r.packets,
+                    "total_bytes": r.total_bytes
+                }
+                for r in rows
+            ]
+        }
+
+class AsyncReportService:
+    """ReportService on an AsyncSession (see AsyncAnalyticsService)."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_summary_by_date(self, target_date: date):
+        return await self.db.run_sync(
+            lambda session: ReportService(session).get_summary_by_date(target_date)
+        )
+
+    async def get_summary_range(self, start_date: date, end_date: date, include_device_ids: bool = True):
+        return await self.db.run_sync(
+            lambda session: ReportService(session).get_summary_range(start_date, end_date, include_device_ids)
+        )
+
+    async def get_device_detail_report(self, device_id: str, target_date: date, include_details: bool = True):
+        return await self.db.run_sync(
+            lambda session: ReportService(session).get_device_detail_report(device_id, target_date, include_details)
+        )
+
+    async def get_online_time(self, device_id: str, start: datetime, end: datetime):
+        return await self.db.run_sync(
+            lambda session: ReportService(session).get_online_time(device_id, start, end)
+        )
+
+    async def get_presence(self, at: datetime):
+        return await self.db.run_sync(
+            lambda session: ReportService(session).get_presence(at)
+        )
+
+    async def get_top_talkers(self, start_date: date, end_date: date, limit: int = 10):
+        return await self.db.run_sync(
+            lambda session: ReportService(session).get_top_talkers(start_date, end_date, limit)
+        )
+
+
+async def stream_device_reports(
+    device_ids: Union[List[str], str],
+    start_date: date,
+    end_date: date,
+    include_details: bool = False,
+    compress: bool = False,
+    chunk_size: int = DEVICE_REPORT_CHUNK_SIZE,
+    session_factory=AsyncReadSessionLocal,
+) -> AsyncIterator[bytes]:
+    """NDJSON, one ReportService.get_device_reports entry per line, built ``chunk_size`` devices at a time.
+
+    ``device_ids`` is a list or "all" (every known device, by device ID).
+    All chunks are read in one session, so they see the same snapshot.
+    """
+    # wbits=31: gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    async with session_factory() as db:
+        def chunk_reports(chunk):
+            return db.run_sync(
+                lambda session: ReportService(session).get_device_reports(chunk, start_date, end_date, include_details)
+            )
+
+        if device_ids == "all":
+            chunks = _device_id_pages(db, chunk_size)
+        else:
+            chunks = _device_id_chunks(list(dict.fromkeys(device_ids)), chunk_size)
+
+        async for chunk in chunks:
+            data = b"".join(dumps(report) + b"\n" for report in await chunk_reports(chunk))
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+
+    if compressor:
+        yield compressor.flush()
+
+
+async def _device_id_chunks(device_ids: List[str], chunk_size: int):
+    for i in range(0, len(device_ids), chunk_size):
+        yield device_ids[i:i + chunk_size]
+
+
+async def _device_id_pages(db: AsyncSession, chunk_size: int):
+    after = None
+    while True:
+        page = await db.run_sync(lambda session: ReportService(session).device_id_page(after, chunk_size))
+        if not page:
+            return
+        yield page
+        after = page[-1]
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncReadSessionLocal
+from app.utils.serializer import dumps
+
+# (table, first_day, last_day): the entry reads that table on those days (None = open-ended)
+Dependency = Tuple[str, Optional[date], Optional[date]]
+# (table, day): a committed write to that table on that day (None = unknown/any day)
+Write = Tuple[str, Optional[date]]
+
+
+def _affected(dependencies: Iterable[Dependency], writes: Iterable[Write]) -> bool:
+    for table, first, last in dependencies:
+        for written, day in writes:
+            if written != table:
+                continue
+            if day is None or ((first is None or day >= first) and (last is None or day <= last)):
+                return True
+    return False
+
+
+class _Entry:
+    __slots__ = ("body", "headers", "expires", "dependencies")
+
+    def __init__(self, body: Optional[bytes], headers: dict, expires: float, dependencies: tuple):
+        self.body = body
+        self.headers = headers
+        self.expires = expires
+        self.dependencies = dependencies
+
+
+class _Flight:
+    __slots__ = ("task", "dependencies", "stale")
+
+    def __init__(self, dependencies: tuple):
+        self.task: Optional[asyncio.Task] = None
+        self.dependencies = dependencies
+        self.stale = False
+
+
+class ResponseCache:
+    """Encoded JSON bodies of the analytics/report endpoints.
+
+    Entries expire after their endpoint's TTL and are dropped as soon as
+    EventProcessor commits a write that one of their dependencies covers,
+    so a cached response is never older than the data it was built from.
+    An entry with no dependencies is only bounded by its TTL.
+    Concurrent misses on the same key share one computation, which runs
+    in its own task on its own session so a disconnecting client does
+    not cancel it for the others. Bounded by ``max_entries`` (LRU).
+
+    ``invalidate`` is called from the ingest writer thread; everything
+    else runs on the event loop.
+    """
+
+    def __init__(self, max_entries: int = settings.RESPONSE_CACHE_MAX_ENTRIES, session_factory=AsyncReadSessionLocal):
+        self.max_entries = max_entries
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._flights = {}
+        self.counters = {name: Counter() for name in ("hits", "misses", "collapsed", "invalidated", "evicted")}
+
+    async def get(
+        self,
+        endpoint: str,
+        params: tuple,
+        ttl: float,
+        dependencies: Iterable[Dependency],
+        compute: Callable[[AsyncSession], Awaitable],
+        headers: Optional[Callable[[Any], Dict[str, str]]] = None,
+    ) -> Tuple[Optional[bytes], Dict[str, str]]:
+        """Encoded body for (endpoint, params) and its response headers.
+
+        ``headers`` builds extra headers from the computed result; they are
+        cached with the body. X-Cache says how it was served: HIT, MISS or
+        COLLAPSED.
+        """
+        key = (endpoint, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.counters["hits"][endpoint] += 1
+                return entry.body, {**entry.headers, "X-Cache": "HIT"}
+
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(tuple(dependencies))
+                flight.task = asyncio.create_task(self._compute(key, ttl, flight, compute, headers))
+                self.counters["misses"][endpoint] += 1
+                status = "MISS"
+            else:
+                self.counters["collapsed"][endpoint] += 1
+                status = "COLLAPSED"
+
+        entry = await asyncio.shield(flight.task)
+        return entry.body, {**entry.headers, "X-Cache": status}
+
+    def invalidate(self, writes: Iterable[Write]):
+        writes = list(writes)
+        if not writes:
+            return
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if _affected(entry.dependencies, writes)]
+            for key in stale:
+                del self._entries[key]
+                self.counters["invalidated"][key[0]] += 1
+            for flight in self._flights.values():
+                if not flight.stale and _affected(flight.dependencies, writes):
+                    # Already reading; its result may predate the write, so don't keep it
+                    flight.stale = True
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            endpoints = set().union(*self.counters.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "in_flight": len(self._flights),
+                "totals": {name: sum(counter.values()) for name, counter in self.counters.items()},
+                "endpoints": {
+                    endpoint: {name: counter[endpoint] for name, counter in self.counters.items()}
+                    for endpoint in sorted(endpoints)
+                },
+            }
+
+    async def _compute(self, key, ttl: float, flight: _Flight, compute, headers) -> _Entry:
+        try:
+            async with self.session_factory() as db:
+                result = await compute(db)
+            entry = _Entry(
+                None if result is None else dumps(result),
+                headers(result) if headers and result is not None else {},
+                time.monotonic() + ttl,
+                flight.dependencies
+            )
+        except BaseException:
+            with self._lock:
+                self._flights.pop(key, None)
+            raise
+
+        with self._lock:
+            # Same lock hold as the store, so an invalidation can't land in between
+            self._flights.pop(key, None)
+            if ttl > 0 and not flight.stale:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self.counters["evicted"][evicted[0]] += 1
+        return entry
+
+
+def cached_response(body: bytes, headers: Dict[str, str]) -> Response:
+    return Response(body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache()
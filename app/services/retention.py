@@ -0,0 +1,209 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select, text
+
+from app.core.config import settings
+from app.models.device_event import DeviceEvent
+from app.models.metric_rollup import MetricRollup1d, MetricRollup1h, MetricRollup1m
+from app.models.network_metrics import NetworkMetric
+from app.services.daily_summary_job import days_without_rollups
+from app.services.ingest_writer import IngestWriter, ingest_writer
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RetentionRule:
+    def __init__(self, model, time_column, days: int, needs_rollup: bool = False):
+        self.table = model.__table__
+        self.key = model.__table__.primary_key.columns.values()[0]
+        self.time_column = time_column
+        self.days = days
+        # Raw rows are only deleted once their day is counted in network_metrics_1d
+        self.needs_rollup = needs_rollup
+
+    def cutoff(self, now: datetime) -> datetime:
+        # Whole UTC days, so a retained day is always complete (the rollup backfill relies on it)
+        return datetime.combine(now.date() - timedelta(days=self.days), datetime.min.time())
+
+
+def default_rules() -> List[RetentionRule]:
+    return [
+        RetentionRule(DeviceEvent, DeviceEvent.timestamp, settings.RETENTION_EVENTS_DAYS),
+        RetentionRule(NetworkMetric, NetworkMetric.measure_time, settings.RETENTION_METRICS_DAYS, needs_rollup=True),
+        RetentionRule(MetricRollup1m, MetricRollup1m.bucket, settings.RETENTION_METRICS_1M_DAYS),
+        RetentionRule(MetricRollup1h, MetricRollup1h.bucket, settings.RETENTION_METRICS_1H_DAYS),
+        RetentionRule(MetricRollup1d, MetricRollup1d.bucket, settings.RETENTION_METRICS_1D_DAYS),
+    ]
+
+
+# --- writer thread (called through IngestWriter.run) ---
+
+def rolled_up_cutoff(processor, rule: RetentionRule, cutoff: datetime) -> datetime:
+    """Pull cutoff back to the oldest expired day that isn't fully rolled up yet."""
+    oldest = processor.db.execute(select(func.min(rule.time_column))).scalar()
+    if oldest is None or oldest >= cutoff:
+        return cutoff
+
+    missing = days_without_rollups(processor.db, oldest.date(), cutoff.date() - timedelta(days=1))
+    if not missing:
+        return cutoff
+    held = datetime.combine(min(missing), datetime.min.time())
+    logger.warning(
+        "Keeping %s rows from %s on: %d expired day(s) are not in network_metrics_1d yet "
+        "(python -m scripts.backfill_metric_rollups)", rule.table.name, held.date(), len(missing)
+    )
+    return held
+
+
+def delete_chunk(processor, rule: RetentionRule, cutoff: datetime, chunk_size: int) -> int:
+    keys = select(rule.key).where(rule.time_column < cutoff).limit(chunk_size).scalar_subquery()
+    try:
+        result = processor.db.execute(delete(rule.table).where(rule.key.in_(keys)))
+        if result.rowcount:
+            processor.touch(rule.table.name)
+        processor.commit()
+    except Exception:
+        processor.rollback()
+        raise
+    return result.rowcount
+
+
+def page_stats(processor) -> Optional[dict]:
+    db = processor.db
+    if db.get_bind().dialect.name != "sqlite":
+        return None
+
+    return {
+        "page_size": db.execute(text("PRAGMA page_size")).scalar(),
+        "page_count": db.execute(text("PRAGMA page_count")).scalar(),
+        "freelist_count": db.execute(text("PRAGMA freelist_count")).scalar(),
+        "auto_vacuum": db.execute(text("PRAGMA auto_vacuum")).scalar(),
+    }
+
+
+def incremental_vacuum(processor, pages: int):
+    processor.db.execute(text(f"PRAGMA incremental_vacuum({pages})"))
+    processor.commit()
+
+
+class RetentionService:
+    """Deletes expired rows in small transactions on the ingest writer thread.
+
+    Every chunk is its own job on the writer, so ingest batches interleave
+    with the deletes and the write lock is never held for more than one
+    chunk. When the database uses ``auto_vacuum=INCREMENTAL`` the freed
+    pages are then returned to the filesystem a few at a time as well.
+    """
+
+    def __init__(
+        self,
+        writer: IngestWriter = ingest_writer,
+        rules: Optional[List[RetentionRule]] = None,
+        interval: float = settings.RETENTION_INTERVAL_S,
+        chunk_size: int = settings.RETENTION_CHUNK_SIZE,
+        vacuum_pages: int = settings.RETENTION_VACUUM_PAGES,
+    ):
+        self.writer = writer
+        self.rules = rules if rules is not None else default_rules()
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.vacuum_pages = vacuum_pages
+
+        self.recent_runs: deque = deque(maxlen=20)
+        self.totals = {"runs": 0, "rows_deleted": 0, "bytes_reclaimed": 0}
+
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def run_once(self) -> dict:
+        async with self._lock:
+            return await self._run_pass()
+
+    def get_stats(self) -> dict:
+        return {
+            "interval_s": self.interval,
+            "chunk_size": self.chunk_size,
+            "policy_days": {rule.table.name: rule.days for rule in self.rules},
+            "totals": dict(self.totals),
+            "recent_runs": list(self.recent_runs),
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.exception("Retention pass failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def _run_pass(self) -> dict:
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        before = await self.writer.run(page_stats)
+
+        deleted = {}
+        for rule in self.rules:
+            if rule.days <= 0:
+                continue
+            cutoff = rule.cutoff(now)
+            if rule.needs_rollup:
+                cutoff = await self.writer.run(rolled_up_cutoff, rule, cutoff)
+            count = 0
+            while True:
+                rows = await self.writer.run(delete_chunk, rule, cutoff, self.chunk_size)
+                count += rows
+                if rows < self.chunk_size:
+                    break
+            deleted[rule.table.name] = count
+
+        vacuumed = False
+        if before and before["auto_vacuum"] == 2:
+            previous = None
+            while True:
+                free = (await self.writer.run(page_stats))["freelist_count"]
+                if not free or free == previous:
+                    break
+                previous = free
+                await self.writer.run(incremental_vacuum, self.vacuum_pages)
+            vacuumed = True
+
+        after = await self.writer.run(page_stats)
+
+        report = {
+            "timestamp": now.isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "rows_deleted": deleted,
+            "incremental_vacuum": vacuumed,
+        }
+        if before and after:
+            report["bytes_before"] = before["page_count"] * before["page_size"]
+            report["bytes_after"] = after["page_count"] * after["page_size"]
+            report["bytes_reclaimed"] = report["bytes_before"] - report["bytes_after"]
+            # Freed but not returned to the filesystem (reused by later inserts)
+            report["free_bytes"] = after["freelist_count"] * after["page_size"]
+
+        self.totals["runs"] += 1
+        self.totals["rows_deleted"] += sum(deleted.values())
+        self.totals["bytes_reclaimed"] += report.get("bytes_reclaimed", 0)
+        self.recent_runs.append(report)
+
+        if any(deleted.values()):
+            logger.info("Retention removed %s, reclaimed %s bytes", deleted, report.get("bytes_reclaimed"))
+        return report
+
+
+retention = RetentionService()
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.device import Device
+
+# Cumulative snapshot counter -> device_traffic_daily column it feeds
+COUNTER_FIELDS = {
+    "data_sent": "bytes_sent",
+    "data_received": "bytes_received",
+    "packet_count": "packets",
+}
+
+
+def counter_delta(previous: Optional[int], current: int) -> int:
+    """Traffic between two readings of a cumulative counter.
+
+    The first reading of a device is only a baseline: the traffic behind
+    it happened at unknown times, so none of it is booked. A counter that
+    went down was reset (collector restart, device reconnect), so
+    everything it has counted since then is new traffic.
+    """
+    if previous is None:
+        return 0
+    if current < previous:
+        return current
+    return current - previous
+
+
+class TrafficCounters:
+    """Last committed cumulative counters per MAC, for the per-day traffic ledger.
+
+    Seeded from the devices table (which holds the last snapshot's values)
+    and updated after each commit. Rows written earlier in the same,
+    still uncommitted batch are passed in as ``pending`` so a batch with
+    several snapshots never counts the same traffic twice.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Tuple[int, ...]] = {}
+
+    def hydrate(self, db: Session):
+        columns = [getattr(Device, field) for field in COUNTER_FIELDS]
+        rows = db.query(Device.device_id, *columns).all()
+        # All-zero rows were never read from a snapshot (DEVICE_JOINED creates them that way)
+        self._counters = {
+            row[0]: tuple(value or 0 for value in row[1:])
+            for row in rows if any(row[1:])
+        }
+
+    def ledger_rows(self, rows: List[dict], pending: Dict[str, Tuple[int, ...]]) -> List[dict]:
+        """device_traffic_daily increments for the given snapshot rows; updates ``pending``."""
+        ledger = []
+        for row in rows:
+            mac = row["device_id"]
+            current = tuple(row.get(field) or 0 for field in COUNTER_FIELDS)
+            previous = pending.get(mac, self._counters.get(mac))
+            pending[mac] = current
+
+            deltas = [
+                counter_delta(previous[i] if previous else None, value)
+                for i, value in enumerate(current)
+            ]
+            if not any(deltas):
+                continue
+
+            seen = row.get("last_seen") or datetime.now(timezone.utc)
+            if seen.tzinfo is not None:
+                seen = seen.astimezone(timezone.utc)
+            ledger.append({
+                "device_id": mac,
+                "day": seen.date(),
+                **dict(zip(COUNTER_FIELDS.values(), deltas)),
+            })
+        return ledger
+
+    def update(self, counters: Dict[str, Tuple[int, ...]]):
+        self._counters.update(counters)
+
+
+traffic_counters = TrafficCounters()
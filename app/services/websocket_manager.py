@@ -1,32 +1,172 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
 from fastapi import WebSocket
-from typing import List
+
+from app.core.config import settings
+from app.utils.logger import get_logger
+from app.utils.serializer import available_encodings, encode_frame
+
+logger = get_logger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "latest_only", "disconnect")
+
+
+def negotiate_encoding(websocket: WebSocket) -> Tuple[str, Optional[str]]:
+    """Pick the frame encoding for a new socket.
+
+    The client's offered subprotocols win (first supported one is echoed
+    back on accept), then ``?encoding=``, then plain JSON text.
+    Transport-level permessage-deflate is negotiated by the ASGI server
+    independently of this.
+    """
+    supported = available_encodings()
+
+    for subprotocol in websocket.scope.get("subprotocols", []):
+        if subprotocol in supported:
+            return subprotocol, subprotocol
+
+    encoding = websocket.query_params.get("encoding", "json")
+    return (encoding if encoding in supported else "json"), None
+
+
+class ClientConnection:
+    """One connected socket with its own bounded outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, protocol: str = "full", encoding: str = "json"):
+        self.websocket = websocket
+        # "full": complete state per frame, "delta": snapshot + patch frames
+        self.protocol = protocol
+        # "json" (text frames), "json-deflate" or "msgpack" (binary frames)
+        self.encoding = encoding
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+
+    def close(self):
+        if self.task and self.task is not asyncio.current_task():
+            self.task.cancel()
+
 
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(
+        self,
+        queue_size: int = settings.WS_SEND_QUEUE_SIZE,
+        overflow_policy: str = settings.WS_OVERFLOW_POLICY,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        # Close handshakes of disconnected slow clients, kept until they finish
+        self._closing = set()
+
+    async def connect(self, websocket: WebSocket, protocol: str = "full"):
+        encoding, subprotocol = negotiate_encoding(websocket)
+        await websocket.accept(subprotocol=subprotocol)
         print("New device added tot the list")
-        self.active_connections.append(websocket)
+
+        client = ClientConnection(websocket, self.queue_size, protocol, encoding)
+        client.task = asyncio.create_task(self._writer(client))
+        self.active_connections[websocket] = client
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            client.close()
 
-    async def broadcast(self, message: dict):
+    async def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for one client."""
+        client = self.active_connections.get(websocket)
+        if client:
+            self._enqueue(client, encode_frame(message, client.encoding))
+
+    async def broadcast(self, message: dict, protocol: str = "full"):
         # print("Broadcasting message to frontend clients:", message)
 
-        disconnected_connections = []
-
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print("WebSocket error:", e)
-                disconnected_connections.append(connection)
-         # Remove broken connections
-        for connection in disconnected_connections:
-            self.disconnect(connection)
+        clients = [
+            client for client in self.active_connections.values()
+            if client.protocol == protocol
+        ]
+        if not clients:
+            return
+
+        # Encode once per wire encoding, then hand the same frame to every
+        # client's queue; slow clients only ever hold up their own writer task
+        frames = {}
+
+        for client in clients:
+            frame = frames.get(client.encoding)
+            if frame is None:
+                frame = frames[client.encoding] = encode_frame(message, client.encoding)
+            self._enqueue(client, frame)
+
+    def has_clients(self, protocol: str = "full") -> bool:
+        return any(client.protocol == protocol for client in self.active_connections.values())
+
+    def get_stats(self) -> dict:
+        return {
+            "overflow_policy": self.overflow_policy,
+            "queue_size": self.queue_size,
+            "clients": [
+                {
+                    "protocol": client.protocol,
+                    "encoding": client.encoding,
+                    "queued": client.queue.qsize(),
+                    "sent": client.sent,
+                    "dropped": client.dropped,
+                }
+                for client in self.active_connections.values()
+            ],
+        }
+
+    def _enqueue(self, client: ClientConnection, frame):
+        if not client.queue.full():
+            client.queue.put_nowait(frame)
+            return
+
+        if self.overflow_policy == "disconnect":
+            logger.warning("Disconnecting slow WebSocket client (%d frames queued)", client.queue.qsize())
+            self.disconnect(client.websocket)
+            task = asyncio.create_task(self._close(client.websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+            return
+
+        if self.overflow_policy == "latest_only":
+            while not client.queue.empty():
+                client.queue.get_nowait()
+                client.dropped += 1
+        else:
+            client.queue.get_nowait()
+            client.dropped += 1
+
+        client.queue.put_nowait(frame)
+
+    async def _writer(self, client: ClientConnection):
+        try:
+            while True:
+                frame = await client.queue.get()
+                if isinstance(frame, bytes):
+                    await client.websocket.send_bytes(frame)
+                else:
+                    await client.websocket.send_text(frame)
+                client.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning("WebSocket send failed, dropping client: %s", e)
+            # Remove broken connection
+            self.disconnect(client.websocket)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=1008)
+        except Exception:
+            pass
 
 
 manager = WebSocketManager()
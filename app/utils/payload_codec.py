@@ -0,0 +1,89 @@
+"""Compact storage encoding for DeviceEvent payloads.
+
+Encoded blobs start with a two-byte format tag so rows written with
+different codecs (or a future dictionary version) can live side by side:
+
+* ``Z1`` - raw deflate with the v1 preset dictionary
+* ``S1`` - zstd with the v1 preset dictionary (needs ``zstandard``)
+
+Event payloads are a few hundred bytes with the same keys every time, so
+a preset dictionary is what makes per-row compression worthwhile.
+"""
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+ZLIB_V1 = b"Z1"
+ZSTD_V1 = b"S1"
+
+# Shape of a typical JOINED/IDLE/LEFT payload; never change in place, add a v2
+DICTIONARY_V1 = json.dumps({
+    "timestamp": "2026-01-01T00:00:00.000000Z",
+    "device": {
+        "device_id": "00:00:00:00:00:00",
+        "hostname": None,
+        "ip_address": "192.168.0.100",
+        "device_type": "LAPTOP",
+        "os": "Windows",
+        "vendor": "Unknown",
+        "status": "active",
+        "online": True,
+        "first_seen": "2026-01-01T00:00:00Z",
+        "last_seen": "2026-01-01T00:00:00Z",
+        "data_sent": 0,
+        "data_received": 0,
+        "packet_count": 0,
+    },
+}, separators=(",", ":")).encode("utf-8") + b'"MOBILE""PRINTER""IOT""NETWORK""idle""left"false'
+
+_zstd_compressor = None
+_zstd_decompressor = None
+
+
+def _zstd():
+    global _zstd_compressor, _zstd_decompressor
+    if _zstd_compressor is None:
+        dictionary = zstandard.ZstdCompressionDict(DICTIONARY_V1)
+        _zstd_compressor = zstandard.ZstdCompressor(level=3, dict_data=dictionary)
+        _zstd_decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return _zstd_compressor, _zstd_decompressor
+
+
+def resolve_codec(codec: str = "auto") -> str:
+    if codec == "auto":
+        return "zstd" if zstandard else "zlib"
+    if codec == "zstd" and not zstandard:
+        raise RuntimeError("EVENT_PAYLOAD_CODEC=zstd requires the zstandard package")
+    return codec
+
+
+def encode_payload(payload: dict, codec: str = "auto") -> bytes:
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    if resolve_codec(codec) == "zstd":
+        compressor, _ = _zstd()
+        return ZSTD_V1 + compressor.compress(data)
+
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=DICTIONARY_V1)
+    return ZLIB_V1 + compressor.compress(data) + compressor.flush()
+
+
+def decode_payload(blob: bytes) -> dict:
+    tag, body = bytes(blob[:2]), blob[2:]
+
+    if tag == ZLIB_V1:
+        decompressor = zlib.decompressobj(-15, zdict=DICTIONARY_V1)
+        data = decompressor.decompress(body) + decompressor.flush()
+    elif tag == ZSTD_V1:
+        if not zstandard:
+            raise RuntimeError("Event payload is zstd-encoded but zstandard is not installed")
+        _, decompressor = _zstd()
+        data = decompressor.decompress(body)
+    else:
+        raise ValueError(f"Unknown event payload format: {tag!r}")
+
+    return json.loads(data)
@@ -0,0 +1,79 @@
+"""Payload encoding for REST responses and WebSocket frames.
+
+Uses orjson for JSON when it is installed and falls back to the stdlib
+``json`` module otherwise. WebSocket clients can additionally negotiate
+MessagePack (when ``msgpack`` is installed) or zlib-compressed JSON.
+"""
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Union
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+DEFLATE_LEVEL = 6
+
+JSON_BACKEND = "orjson" if orjson else "json"
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON."""
+    if orjson:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def dumps_text(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# --- WebSocket frame encodings ---
+
+def available_encodings() -> tuple:
+    encodings = ("json", "json-deflate")
+    if msgpack:
+        encodings += ("msgpack",)
+    return encodings
+
+
+def encode_frame(message: Any, encoding: str = "json") -> Union[str, bytes]:
+    """Encode a message for the wire: text for ``json``, bytes otherwise."""
+    if encoding == "msgpack":
+        return msgpack.packb(message, default=_default, use_bin_type=True)
+    if encoding == "json-deflate":
+        return zlib.compress(dumps(message), DEFLATE_LEVEL)
+    return dumps_text(message)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fastest available JSON backend."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,119 @@
+"""Rows/sec and peak memory of the streaming exports.
+
+Seeds a scratch SQLite database with --rows device events (compressed
+payloads) and as many metric samples, then drains the export streams
+for each format. It runs once untraced for throughput and once under
+tracemalloc for peak memory. The tracemalloc pass runs at a quarter of
+--rows and at --rows, so you can check that the peak does not grow with
+the range.
+
+    python -m benchmarks.bench_export --rows 200000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Base, async_url, sqlite_pragmas
+from app.models.device import Device  # registers the devices table for the FK
+from app.models.device_event import DeviceEvent
+from app.models.network_metrics import NetworkMetric
+from app.services.device_event_service import EVENT_FIELDS, event_columns, event_dict
+from app.services.export_service import METRIC_FIELDS, stream_export
+from app.utils.payload_codec import encode_payload
+
+
+def seed(url: str, rows: int):
+    engine = create_engine(url)
+    event.listen(engine, "connect", sqlite_pragmas())
+    Base.metadata.create_all(bind=engine)
+
+    base = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        for start in range(0, rows, 10000):
+            events, metrics = [], []
+            for i in range(start, min(rows, start + 10000)):
+                mac = f"02:00:00:00:{i >> 8 & 0xff:02x}:{i & 0xff:02x}"
+                timestamp = base + timedelta(seconds=i)
+                events.append({
+                    "device_id": mac,
+                    "event_type": "DEVICE_JOINED",
+                    "timestamp": timestamp,
+                    "hostname": f"host-{i & 0xff}",
+                    "ip_address": f"10.0.{i >> 8 & 0xff}.{i & 0xff}",
+                    "payload": encode_payload({"timestamp": timestamp.isoformat() + "Z", "device": {
+                        "device_id": mac, "hostname": f"host-{i & 0xff}", "status": "active",
+                        "data_sent": i * 10, "data_received": i * 20, "packet_count": i,
+                    }}, "zlib"),
+                })
+                metrics.append({
+                    "measure_time": timestamp,
+                    "total_devices": 50, "active_devices": 40,
+                    "data_sent": i * 10, "data_received": i * 20,
+                    "total_packets": 1000, "tcp_packets": 600, "udp_packets": 300,
+                })
+            conn.execute(insert(DeviceEvent), events)
+            conn.execute(insert(NetworkMetric), metrics)
+    engine.dispose()
+
+
+async def drain(session_factory, name: str, fmt: str, compress: bool, limit: int):
+    if name == "device_events":
+        fields = list(EVENT_FIELDS)
+        query = select(*event_columns(fields)).order_by(DeviceEvent.timestamp, DeviceEvent.id).limit(limit)
+        to_dict = lambda row: event_dict(row, fields)
+    else:
+        fields = METRIC_FIELDS
+        query = select(NetworkMetric.__table__).order_by(NetworkMetric.measure_time, NetworkMetric.id).limit(limit)
+        to_dict = lambda row: row._asdict()
+
+    size = 0
+    async for chunk in stream_export(query, to_dict, fields, fmt, compress, session_factory=session_factory):
+        size += len(chunk)
+    return size
+
+
+async def run(url: str, rows: int):
+    engine = create_async_engine(async_url(url))
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    for name in ("device_events", "network_metrics"):
+        for fmt, compress in (("ndjson", False), ("csv", False), ("ndjson", True)):
+            label = f"{name} {fmt}{'+gzip' if compress else ''}"
+
+            started = time.perf_counter()
+            size = await drain(session_factory, name, fmt, compress, rows)
+            elapsed = time.perf_counter() - started
+
+            peaks = []
+            for limit in (rows // 4, rows):
+                tracemalloc.start()
+                await drain(session_factory, name, fmt, compress, limit)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+                tracemalloc.stop()
+
+            print(f"{label:30} {rows / elapsed:10,.0f} rows/s   {size / 1024 / 1024:7.1f} MB   "
+                  f"peak {peaks[0]:5.1f} MB @ {rows // 4:,} rows, {peaks[1]:5.1f} MB @ {rows:,} rows")
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(url, args.rows)
+        asyncio.run(run(url, args.rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""One /api/reports/summary/range call vs N single-day /summary calls.
+
+Seeds a scratch SQLite database with --days of device events from
+--devices devices, daily metric rollups and the devices table. It then
+times (and counts the SQL statements of) a whole-range report built day
+by day, and built as a single range, with and without device_ids. Each
+case runs twice: once with every day computed live, and once with the
+past days stored in daily_summaries as DailySummaryJob leaves them.
+
+    python -m benchmarks.bench_report_range --days 30 --devices 500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, sqlite_pragmas
+from app.core.migrations import run_migrations
+from app.models.daily_summary import DailySummary
+from app.models.device import Device
+from app.models.device_event import DeviceEvent
+from app.models.metric_rollup import MetricRollup1d
+from app.models.network_metrics import NetworkMetric  # registers the table the migrations index
+from app.services.daily_summaries import compute_summaries, day_bounds, utc_today
+from app.services.report_service import ReportService
+from app.utils.serializer import dumps
+
+
+def seed(engine, days: int, devices: int, events_per_device: int):
+    today = utc_today()
+    first_day = today - timedelta(days=days - 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Device), [{
+            "device_id": f"02:00:00:00:{i >> 8 & 0xff:02x}:{i & 0xff:02x}",
+            "hostname": f"host-{i}",
+            "first_seen_day": first_day + timedelta(days=i % days),
+        } for i in range(devices)])
+
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            start = day_bounds(day)[0]
+            conn.execute(insert(DeviceEvent), [{
+                "device_id": f"02:00:00:00:{i >> 8 & 0xff:02x}:{i & 0xff:02x}",
+                "event_type": "DEVICE_JOINED" if n % 2 == 0 else "DEVICE_LEFT",
+                "timestamp": start + timedelta(seconds=(i * 97 + n * 3607) % 86400),
+            } for i in range(devices) if i % days <= offset for n in range(events_per_device)])
+            conn.execute(insert(MetricRollup1d), [{
+                "bucket": start, "samples": 1440,
+                "data_sent": 10 ** 9 + offset, "data_received": 2 * 10 ** 9 + offset,
+                "total_packets": 10 ** 7, "tcp_packets": 6 * 10 ** 6, "udp_packets": 3 * 10 ** 6,
+                "max_active_devices": devices // 2, "max_total_devices": devices,
+            }])
+    return first_day, today
+
+
+def store_past_days(Session, first_day, today):
+    with Session() as db:
+        for summary in compute_summaries(db, first_day, today - timedelta(days=1)).values():
+            db.add(DailySummary(
+                **{**summary, "device_ids": json.dumps(summary["device_ids"])},
+                finalized_at=datetime.now(timezone.utc)
+            ))
+        db.commit()
+
+
+def measure(engine, Session, fn, repeat: int):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            with Session() as db:
+                size = len(fn(ReportService(db)))
+        elapsed = (time.perf_counter() - started) / repeat
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return elapsed, len(statements) // repeat, size
+
+
+def run(engine, Session, first_day, today, days: int, repeat: int):
+    cases = [
+        (f"{days} x /summary", lambda service: b"".join(
+            dumps(service.get_summary_by_date(first_day + timedelta(days=i))) for i in range(days)
+        )),
+        ("1 x /summary/range", lambda service: dumps(service.get_summary_range(first_day, today))),
+        ("1 x /summary/range (no ids)", lambda service: dumps(service.get_summary_range(first_day, today, False))),
+    ]
+    for label, fn in cases:
+        elapsed, statements, size = measure(engine, Session, fn, repeat)
+        print(f"  {label:30} {elapsed * 1000:9.1f} ms   {statements:4d} statements   {size / 1024:8.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--events-per-device", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        event.listen(engine, "connect", sqlite_pragmas())
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        Session = sessionmaker(bind=engine)
+
+        first_day, today = seed(engine, args.days, args.devices, args.events_per_device)
+
+        print(f"{args.days} days, {args.devices} devices, every day computed live:")
+        run(engine, Session, first_day, today, args.days, args.repeat)
+
+        store_past_days(Session, first_day, today)
+        print(f"\npast days stored in daily_summaries:")
+        run(engine, Session, first_day, today, args.days, args.repeat)
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
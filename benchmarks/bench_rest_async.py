@@ -0,0 +1,209 @@
+"""Throughput of the sync (threadpool) and async (AsyncSession) REST paths.
+
+Seeds a scratch SQLite database, then serves the dashboard and daily
+summary through two routes each: a sync ``def`` route on a Session (run
+in FastAPI's threadpool, as the endpoints used to be) and an ``async def``
+route on an AsyncSession (as they are now). The dashboard also runs
+with its sections in parallel, each on its own session
+(ANALYTICS_SECTION_MODE=parallel). The ASGI app is driven
+directly with httpx, with --concurrency requests in flight at a time.
+
+While each load runs, a probe calls a trivial sync route every 20 ms and
+records how long it waits: that is what every other threadpool route
+(sync endpoints, file responses, sync dependencies) sees under load.
+
+    python -m benchmarks.bench_rest_async --devices 50 --concurrency 64 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+from app.core.database import Base, async_url, read_only_url, sqlite_pragmas
+from app.core.migrations import run_migrations
+from app.services.analytics_service import AnalyticsService, AsyncAnalyticsService
+from app.services.dashboard_stats import DashboardStats
+from app.services.device_fingerprints import DeviceFingerprints
+from app.services.event_processor import EventProcessor
+from app.services.traffic_counters import TrafficCounters
+from app.services.report_service import AsyncReportService, ReportService
+from app.utils.serializer import FastJSONResponse
+
+
+def seed(url: str, device_count: int):
+    engine = create_engine(url)
+    event.listen(engine, "connect", sqlite_pragmas())
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    now = datetime.now(timezone.utc)
+    macs = [f"02:00:00:00:{i >> 8 & 0xff:02x}:{i & 0xff:02x}" for i in range(device_count)]
+    messages = [{"subtype": "PERIODIC_TOPOLOGY_STATE", "payload": {"topology": {"devices": [
+        {"mac": mac, "hostname": f"host-{i}", "status": "active",
+         "first_seen": now.isoformat(), "last_seen": now.isoformat()}
+        for i, mac in enumerate(macs)
+    ]}}}]
+    for i in range(device_count * 10):
+        messages.append({"subtype": "DEVICE_JOINED", "payload": {
+            "timestamp": (now - timedelta(seconds=i * 7)).isoformat(),
+            "device": {"device_id": macs[i % device_count]},
+        }})
+    for i in range(720):
+        messages.append({"subtype": "PERIODIC_METRIC_STATE", "payload": {"metrics": {
+            "measure_time": (now - timedelta(seconds=i * 5)).isoformat(),
+            "total_packets": 1000, "tcp_packets": 600, "udp_packets": 300, "active_devices": device_count,
+        }}})
+
+    with sessionmaker(bind=engine)() as db:
+        processor = EventProcessor(
+            db,
+            fingerprints=DeviceFingerprints(),
+            stats=DashboardStats(),
+            counters=TrafficCounters()
+        )
+        for start in range(0, len(messages), 500):
+            processor.process_batch(messages[start:start + 500])
+    engine.dispose()
+
+
+def build_app(url: str) -> FastAPI:
+    read_engine = create_engine(
+        read_only_url(url),
+        connect_args={"check_same_thread": False},
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW
+    )
+    event.listen(read_engine, "connect", sqlite_pragmas(read_only=True))
+    ReadSession = sessionmaker(bind=read_engine, autoflush=False)
+
+    async_engine = create_async_engine(
+        async_url(read_only_url(url)),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW
+    )
+    event.listen(async_engine.sync_engine, "connect", sqlite_pragmas(read_only=True))
+    AsyncReadSession = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_db():
+        db = ReadSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncReadSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.state.engines = (read_engine, async_engine)
+    today = datetime.utcnow().date()
+
+    @app.get("/probe")
+    def probe():
+        return {}
+
+    @app.get("/sync/dashboard")
+    def sync_dashboard(db: Session = Depends(get_db)):
+        return FastJSONResponse(AnalyticsService(db).get_complete_analytics())
+
+    @app.get("/async/dashboard")
+    async def async_dashboard(db: AsyncSession = Depends(get_async_db)):
+        service = AsyncAnalyticsService(db, section_mode="serial")
+        return FastJSONResponse(await service.get_complete_analytics())
+
+    @app.get("/parallel/dashboard")
+    async def parallel_dashboard(db: AsyncSession = Depends(get_async_db)):
+        service = AsyncAnalyticsService(db, section_mode="parallel", session_factory=AsyncReadSession)
+        return FastJSONResponse(await service.get_complete_analytics())
+
+    @app.get("/sync/summary")
+    def sync_summary(db: Session = Depends(get_db)):
+        return FastJSONResponse(ReportService(db).get_summary_by_date(today))
+
+    @app.get("/async/summary")
+    async def async_summary(db: AsyncSession = Depends(get_async_db)):
+        return FastJSONResponse(await AsyncReportService(db).get_summary_by_date(today))
+
+    return app
+
+
+async def probe(client: httpx.AsyncClient, latencies: list):
+    while True:
+        started = time.perf_counter()
+        await client.get("/probe")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.02)
+
+
+async def drive(client: httpx.AsyncClient, path: str, concurrency: int, total: int):
+    latencies = []
+    probe_latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    prober = asyncio.create_task(probe(client, probe_latencies))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    prober.cancel()
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "probe_p50_ms": statistics.median(probe_latencies or [0]) * 1000,
+    }
+
+
+async def run(app: FastAPI, concurrency: int, total: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint, modes in (("dashboard", ("sync", "async", "parallel")), ("summary", ("sync", "async"))):
+            for mode in modes:
+                path = f"/{mode}/{endpoint}"
+                await drive(client, path, concurrency, min(total, 50))  # warm-up
+                result = await drive(client, path, concurrency, total)
+                print(f"{path:18} {result['rps']:8.1f} req/s   "
+                      f"p50 {result['p50_ms']:7.1f} ms   p95 {result['p95_ms']:7.1f} ms   "
+                      f"threadpool probe p50 {result['probe_p50_ms']:7.1f} ms")
+
+    read_engine, async_engine = app.state.engines
+    read_engine.dispose()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(url, args.devices)
+        asyncio.run(run(build_app(url), args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Compare the ORM and upsert write paths for PERIODIC_TOPOLOGY_STATE.
+
+Runs the same sequence of snapshots through both paths against two scratch
+SQLite databases, prints timings and checks that the resulting ``devices``
+rows are identical.
+
+    python -m benchmarks.bench_topology_write --devices 2000 --snapshots 20
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.device import Device
+from app.services.device_fingerprints import DeviceFingerprints
+from app.services.event_processor import EventProcessor
+from app.services.traffic_counters import TrafficCounters
+
+COMPARED_COLUMNS = [
+    column.name for column in Device.__table__.columns
+    if column.name not in ("id", "created_at", "updated_at")
+]
+
+
+def build_snapshots(device_count: int, snapshot_count: int):
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    snapshots = []
+
+    for n in range(snapshot_count):
+        now = base + timedelta(seconds=5 * n)
+        devices = []
+        for i in range(device_count):
+            # Every tenth device changes between snapshots, the rest stay put
+            changes = n if i % 10 == 0 else 0
+            devices.append({
+                "mac": f"02:00:00:{i >> 16 & 0xff:02x}:{i >> 8 & 0xff:02x}:{i & 0xff:02x}",
+                "hostname": f"host-{i}",
+                "ip_address": f"10.{i >> 16 & 0xff}.{i >> 8 & 0xff}.{i & 0xff}",
+                "device_type": "LAPTOP",
+                "os": "Linux",
+                "vendor": "Acme",
+                "first_seen": base.isoformat(),
+                "last_seen": (base + timedelta(seconds=5 * changes)).isoformat(),
+                "status": "idle" if changes % 3 == 2 else "active",
+                "data_sent": 1000 * changes + i,
+                "data_received": 2000 * changes + i,
+                "packet_count": 10 * changes + i,
+            })
+        snapshots.append(devices)
+
+    return snapshots
+
+
+def run(mode: str, snapshots, path: str) -> float:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    fingerprints = DeviceFingerprints()
+    processor = EventProcessor(
+        db,
+        topology_write_mode=mode,
+        fingerprints=fingerprints,
+        counters=TrafficCounters()
+    )
+
+    started = time.perf_counter()
+    for devices in snapshots:
+        processor.process_event({
+            "type": "TOPOLOGY",
+            "subtype": "PERIODIC_TOPOLOGY_STATE",
+            "payload": {"topology": {"devices": devices}},
+        })
+    elapsed = time.perf_counter() - started
+    totals = fingerprints.totals
+    print(f"{mode:>6}: {totals['changed']} rows written, {totals['skipped']} unchanged rows skipped")
+
+    db.close()
+    engine.dispose()
+    return elapsed
+
+
+def load_rows(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        columns = [Device.__table__.c[name] for name in COMPARED_COLUMNS]
+        rows = conn.execute(select(*columns).order_by(Device.device_id)).all()
+    engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--snapshots", type=int, default=20)
+    args = parser.parse_args()
+
+    snapshots = build_snapshots(args.devices, args.snapshots)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for mode in ("orm", "upsert"):
+            path = os.path.join(tmp, f"{mode}.db")
+            elapsed = run(mode, snapshots, path)
+            results[mode] = load_rows(path)
+            print(
+                f"{mode:>6}: {elapsed:.3f}s total, "
+                f"{elapsed / args.snapshots * 1000:.1f} ms/snapshot "
+                f"({args.devices} devices), "
+                f"{args.devices * args.snapshots / elapsed:,.0f} snapshot rows/s ingested"
+            )
+
+        identical = results["orm"] == results["upsert"]
+        print("devices rows identical:", identical)
+        if not identical:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Rebuild the network_metrics_1m/1h/1d rollups from raw network_metrics.
+
+Works one UTC day per transaction. Each day's minute buckets are rebuilt
+from raw rows, its hours from those minutes, and the day from its hours.
+On SQLite every transaction holds the write lock, so a day is never
+rebuilt halfway through an ingest batch. Only days that still have raw
+rows are touched, so the script is safe to re-run at any time. The
+stored daily summary of each rebuilt day is dropped in the same
+transaction, and DailySummaryJob recomputes it from the new rollups.
+
+    python -m scripts.backfill_metric_rollups [--since 2026-01-01]
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from app.core.database import Base, engine
+from app.core.migrations import run_migrations
+from app.models.network_metrics import NetworkMetric
+from app.services.daily_summaries import expire_summaries
+from app.services.metric_rollups import MAX_COLUMNS, ROLLUPS, SUM_COLUMNS
+
+SQLITE_BUCKET_FORMATS = {
+    # Same text layout SQLAlchemy uses for SQLite DateTime, so ingest upserts hit these rows
+    "minute": "%Y-%m-%d %H:%M:00.000000",
+    "hour": "%Y-%m-%d %H:00:00.000000",
+    "day": "%Y-%m-%d 00:00:00.000000",
+}
+
+
+def bucket_expression(dialect: str, column, unit: str):
+    if dialect == "postgresql":
+        return func.date_trunc(unit, column)
+    return func.strftime(SQLITE_BUCKET_FORMATS[unit], column)
+
+
+def rebuild_day(conn, day_start: datetime):
+    day_end = day_start + timedelta(days=1)
+    dialect = conn.dialect.name
+
+    # Finest first; each level is built from the one below it
+    source = None
+    for _, model, unit in reversed(ROLLUPS):
+        table = model.__table__
+        conn.execute(delete(table).where(table.c.bucket >= day_start, table.c.bucket < day_end))
+
+        if source is None:
+            raw = NetworkMetric.__table__
+            bucket = bucket_expression(dialect, raw.c.measure_time, unit)
+            columns = [bucket, func.count(raw.c.id)] \
+                + [func.coalesce(func.sum(raw.c[c]), 0) for c in SUM_COLUMNS] \
+                + [func.coalesce(func.max(raw.c[c]), 0) for c in MAX_COLUMNS.values()]
+            where = (raw.c.measure_time >= day_start, raw.c.measure_time < day_end)
+        else:
+            bucket = bucket_expression(dialect, source.c.bucket, unit)
+            columns = [bucket, func.sum(source.c.samples)] \
+                + [func.sum(source.c[c]) for c in SUM_COLUMNS] \
+                + [func.max(source.c[c]) for c in MAX_COLUMNS]
+            where = (source.c.bucket >= day_start, source.c.bucket < day_end)
+
+        conn.execute(insert(table).from_select(
+            ["bucket", "samples", *SUM_COLUMNS, *MAX_COLUMNS],
+            select(*columns).where(*where).group_by(bucket)
+        ))
+        source = table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", type=date.fromisoformat, help="first UTC day to rebuild (default: oldest raw row)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        first, last = conn.execute(
+            select(func.min(NetworkMetric.measure_time), func.max(NetworkMetric.measure_time))
+        ).one()
+    if first is None:
+        print("network_metrics is empty, nothing to do")
+        return
+
+    day = datetime.combine(max(first.date(), args.since or first.date()), datetime.min.time())
+    started = time.perf_counter()
+    days = 0
+
+    while day.date() <= last.date():
+        with engine.begin() as conn:
+            rebuild_day(conn, day)
+            expire_summaries(conn, "network_metrics", day.date())
+        days += 1
+        print(f"rebuilt {day.date()}")
+        day += timedelta(days=1)
+
+    print(f"done: {days} days in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
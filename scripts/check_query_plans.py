@@ -0,0 +1,174 @@
+"""EXPLAIN QUERY PLAN regression check for the service queries.
+
+Builds a scratch SQLite database with the current schema and migrations,
+seeds it through EventProcessor, then runs every service method below
+while capturing the SQL it issues. Each filtered SELECT is re-run under
+EXPLAIN QUERY PLAN and the check fails if any of them falls back to a
+full scan of a table.
+
+    python -m scripts.check_query_plans [-v]
+
+No ANALYZE is run on purpose: without statistics SQLite plans as if the
+tables were large, which is the case we care about.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.core.migrations import run_migrations
+from app.services.activity_counters import ActivityCounters
+from app.services.analytics_service import AnalyticsService
+from app.services.anomaly_detector import AnomalyDetector
+from app.services.daily_summaries import ConnectedDevices
+from app.services.dashboard_stats import DashboardStats
+from app.services.device_fingerprints import DeviceFingerprints
+from app.services.event_processor import EventProcessor
+from app.services.response_cache import ResponseCache
+from app.services.traffic_counters import TrafficCounters
+from app.services.report_service import ReportService
+
+DEVICE_COUNT = 50
+SAMPLE_MAC = "02:00:00:00:00:01"
+
+# A bare "SCAN <table>" (no index) is a full table scan
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+FILTERED_SELECT = re.compile(r"\s*SELECT\b.*\bWHERE\b", re.IGNORECASE | re.DOTALL)
+
+
+def service_calls():
+    today = datetime.now(timezone.utc).date()
+    now = datetime.utcnow()
+
+    return [
+        ("AnalyticsService.get_complete_analytics",
+         lambda db: AnalyticsService(db).get_complete_analytics()),
+        ("ReportService.get_summary_by_date",
+         lambda db: ReportService(db).get_summary_by_date(today)),
+        ("ReportService.get_summary_range",
+         lambda db: ReportService(db).get_summary_range(today - timedelta(days=30), today)),
+        ("ReportService.get_summary_range (no device ids)",
+         lambda db: ReportService(db).get_summary_range(today - timedelta(days=30), today, False)),
+        ("ReportService.get_device_detail_report",
+         lambda db: ReportService(db).get_device_detail_report(SAMPLE_MAC, today)),
+        ("ReportService.get_device_reports",
+         lambda db: ReportService(db).get_device_reports(
+             ReportService(db).device_id_page(None, DEVICE_COUNT), today - timedelta(days=7), today, True)),
+        ("ReportService.get_online_time",
+         lambda db: ReportService(db).get_online_time(SAMPLE_MAC, now - timedelta(days=7), now)),
+        ("ReportService.get_presence",
+         lambda db: ReportService(db).get_presence(now - timedelta(hours=1))),
+        ("ReportService.get_top_talkers",
+         lambda db: ReportService(db).get_top_talkers(today - timedelta(days=7), today)),
+    ]
+
+
+def seed(db):
+    # Scratch state throughout, so seeding leaves the app's singletons alone
+    processor = EventProcessor(
+        db,
+        fingerprints=DeviceFingerprints(),
+        stats=DashboardStats(),
+        counters=TrafficCounters(),
+        activity=ActivityCounters(),
+        cache=ResponseCache(),
+        detector=AnomalyDetector(),
+        connected=ConnectedDevices(),
+    )
+    now = datetime.now(timezone.utc)
+
+    messages = [{
+        "type": "TOPOLOGY",
+        "subtype": "PERIODIC_TOPOLOGY_STATE",
+        "payload": {"topology": {"devices": [
+            {"mac": f"02:00:00:00:00:{i:02x}", "hostname": f"host-{i}", "status": "active",
+             "first_seen": now.isoformat(), "last_seen": now.isoformat(),
+             "data_sent": i, "data_received": i, "packet_count": i}
+            for i in range(DEVICE_COUNT)
+        ]}},
+    }]
+    for i in range(DEVICE_COUNT):
+        for subtype in ("DEVICE_JOINED", "DEVICE_IDLE", "DEVICE_LEFT"):
+            messages.append({"type": "EVENT", "subtype": subtype, "payload": {
+                "timestamp": (now - timedelta(minutes=i)).isoformat(),
+                "device": {"device_id": f"02:00:00:00:00:{i:02x}"},
+            }})
+    for i in range(30):
+        messages.append({"type": "METRIC", "subtype": "PERIODIC_METRIC_STATE", "payload": {"metrics": {
+            "measure_time": (now - timedelta(minutes=i)).isoformat(),
+            "total_packets": 100, "tcp_packets": 60, "udp_packets": 30,
+        }}})
+
+    for message in messages:
+        processor.process_event(message)
+
+
+def full_scans(conn, statement, parameters):
+    plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    tables = set(Base.metadata.tables)
+    return [row[-1] for row in plan if (m := FULL_SCAN.match(row[-1])) and m.group(1) in tables]
+
+
+def check(engine, verbose: bool = False):
+    """Seed the database behind engine and EXPLAIN every service query; returns (checked, failures)."""
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as db:
+        seed(db)
+
+    failures = []
+    checked = 0
+
+    for name, call in service_calls():
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if FILTERED_SELECT.match(statement):
+                captured.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", capture)
+        with Session() as db:
+            call(db)
+        event.remove(engine, "before_cursor_execute", capture)
+
+        # The same statement shape is only worth checking once
+        unique = {statement: parameters for statement, parameters in captured}
+
+        with engine.connect() as conn:
+            for statement, parameters in unique.items():
+                checked += 1
+                scans = full_scans(conn, statement, parameters)
+                one_line = " ".join(statement.split())
+                if scans:
+                    failures.append(f"FAIL {name}: {', '.join(scans)}\n     {one_line}")
+                    print(failures[-1])
+                elif verbose:
+                    print(f"ok   {name}: {one_line}")
+
+    return checked, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every checked statement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        checked, failures = check(engine, args.verbose)
+        engine.dispose()
+
+    print(f"{checked} statements checked, {len(failures)} full table scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Convert legacy device_events.raw_json rows to compressed payloads in place.
+
+Works through the table in id order, one chunk per transaction, so it can
+run next to a live server and be interrupted and resumed at any time.
+
+    python -m scripts.migrate_event_payloads --chunk-size 5000 [--vacuum]
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import bindparam, select, text, update
+
+from app.core.config import settings
+from app.core.database import Base, engine
+from app.core.migrations import run_migrations
+from app.models.device import Device  # registers the devices table for the FK
+from app.models.device_event import DeviceEvent
+from app.utils.payload_codec import encode_payload
+
+
+def migrate_chunk(conn, after_id: int, chunk_size: int, codec: str):
+    rows = conn.execute(
+        select(DeviceEvent.id, DeviceEvent.raw_json)
+        .where(DeviceEvent.id > after_id, DeviceEvent.raw_json.is_not(None))
+        .order_by(DeviceEvent.id)
+        .limit(chunk_size)
+    ).all()
+
+    updates = []
+    for row_id, raw_json in rows:
+        try:
+            payload = json.loads(raw_json)
+        except ValueError:
+            # Leave unparseable rows untouched rather than losing them
+            continue
+
+        device_data = payload.get("device", {}) if isinstance(payload, dict) else {}
+        updates.append({
+            "b_id": row_id,
+            "b_payload": encode_payload(payload, codec),
+            "b_hostname": device_data.get("hostname"),
+            "b_ip_address": device_data.get("ip_address"),
+            "b_vendor": device_data.get("vendor"),
+            "b_device_type": device_data.get("device_type"),
+        })
+
+    if updates:
+        table = DeviceEvent.__table__
+        conn.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                raw_json=None,
+                payload=bindparam("b_payload"),
+                hostname=bindparam("b_hostname"),
+                ip_address=bindparam("b_ip_address"),
+                vendor=bindparam("b_vendor"),
+                device_type=bindparam("b_device_type"),
+            ),
+            updates,
+        )
+
+    return (rows[-1][0] if rows else None), len(updates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--codec", default=settings.EVENT_PAYLOAD_CODEC, choices=["auto", "zlib", "zstd"])
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the file")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    after_id = 0
+    converted = 0
+    started = time.perf_counter()
+
+    while True:
+        with engine.begin() as conn:
+            last_id, count = migrate_chunk(conn, after_id, args.chunk_size, args.codec)
+        if last_id is None:
+            break
+
+        after_id = last_id
+        converted += count
+        print(f"converted {converted} rows (up to id {after_id})")
+
+    print(f"done: {converted} rows in {time.perf_counter() - started:.1f}s")
+
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
+        print("vacuumed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Run one retention pass outside the server and print its report.
+
+Uses the same chunked deletes as the background task. --vacuum finishes
+with a full VACUUM, which is also how an existing database file picks
+up DB_AUTO_VACUUM=INCREMENTAL. Stop the server first: VACUUM rewrites
+the whole file and blocks everything else while it runs.
+
+    python -m scripts.run_retention [--vacuum]
+"""
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import text
+
+from app.core.database import Base, engine
+from app.core.migrations import run_migrations
+from app.services.ingest_writer import IngestWriter
+from app.services.retention import RetentionService
+
+
+async def run_pass() -> dict:
+    writer = IngestWriter()
+    await writer.start()
+    try:
+        return await RetentionService(writer=writer).run_once()
+    finally:
+        await writer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vacuum", action="store_true", help="full VACUUM afterwards")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    print(json.dumps(asyncio.run(run_pass()), indent=2))
+
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            # auto_vacuum is set on connect, but an existing file only adopts it here
+            conn.execute(text("VACUUM"))
+        print("vacuumed")
+
+
+if __name__ == "__main__":
+    main()
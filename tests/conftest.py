@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, sqlite_pragmas
+from app.core.migrations import run_migrations
+from app.services.activity_counters import ActivityCounters
+from app.services.anomaly_detector import AnomalyDetector
+from app.services.daily_summaries import ConnectedDevices
+from app.services.dashboard_stats import DashboardStats
+from app.services.device_fingerprints import DeviceFingerprints
+from app.services.event_processor import EventProcessor
+from app.services.response_cache import ResponseCache
+from app.services.traffic_counters import TrafficCounters
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "test.db"
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = create_engine(f"sqlite:///{db_path}")
+    event.listen(engine, "connect", sqlite_pragmas())
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def async_session_factory(engine, db_path):
+    """Read sessions on the same database, for code that takes an AsyncSession factory."""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    yield async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    async_engine.sync_engine.dispose()
+
+
+@pytest.fixture
+def cache(async_session_factory):
+    return ResponseCache(session_factory=async_session_factory)
+
+
+@pytest.fixture
+def processor(db, cache):
+    """EventProcessor with its own in-memory state instead of the module singletons."""
+    processor = EventProcessor(
+        db,
+        fingerprints=DeviceFingerprints(),
+        stats=DashboardStats(),
+        counters=TrafficCounters(),
+        activity=ActivityCounters(),
+        cache=cache,
+        detector=AnomalyDetector(),
+        connected=ConnectedDevices(),
+    )
+    processor.hydrate_state()
+    return processor
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.device import Device
+from app.models.device_event import DeviceEvent
+from app.models.device_traffic_daily import DeviceTrafficDaily
+from app.models.network_metrics import NetworkMetric
+
+MAC = "aa:00:00:00:00:01"
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def snapshot(*devices) -> dict:
+    return {"type": "TOPOLOGY", "subtype": "PERIODIC_TOPOLOGY_STATE", "payload": {"topology": {"devices": list(devices)}}}
+
+
+def device(mac: str = MAC, hostname: str = "laptop", sent: int = 0, status: str = "active") -> dict:
+    return {
+        "mac": mac, "hostname": hostname, "status": status, "data_sent": sent,
+        "first_seen": NOW.isoformat() + "Z", "last_seen": NOW.isoformat() + "Z",
+    }
+
+
+def joined(mac: str = MAC, at: datetime = NOW) -> dict:
+    return {"type": "EVENT", "subtype": "DEVICE_JOINED", "payload": {"timestamp": at.isoformat() + "Z", "device": {"device_id": mac}}}
+
+
+def metric(total_packets, at: datetime = NOW) -> dict:
+    return {
+        "type": "METRIC",
+        "subtype": "PERIODIC_METRIC_STATE",
+        "payload": {"metrics": {"measure_time": at.isoformat() + "Z", "total_packets": total_packets}},
+    }
+
+
+def rows(db, *columns):
+    db.expire_all()
+    return db.execute(select(*columns).order_by(*columns)).all()
+
+
+def count(db, model) -> int:
+    db.expire_all()
+    return db.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_bad_message_only_loses_itself(db, processor):
+    bad = {"type": "EVENT", "subtype": "DEVICE_JOINED", "payload": {"device": {"device_id": MAC}}}
+    failed = processor.process_batch([
+        joined(), metric(5), bad, snapshot(device(sent=100)), metric(7, NOW + timedelta(seconds=30)),
+    ])
+
+    assert failed == 1
+    assert count(db, DeviceEvent) == 1
+    assert rows(db, NetworkMetric.total_packets) == [(5,), (7,)]
+    assert rows(db, Device.device_id, Device.data_sent) == [(MAC, 100)]
+    assert processor.stats.snapshot()["total_devices"] == 1
+
+
+def test_replay_does_not_count_snapshot_traffic_twice(db, processor):
+    assert processor.process_batch([snapshot(device(sent=100))]) == 0
+    failed = processor.process_batch([snapshot(device(sent=150)), metric("n/a"), snapshot(device(sent=400))])
+
+    assert failed == 1
+    # First sight is a baseline, then 150 - 100 and 400 - 150, each recorded once despite the rollback and replay
+    assert rows(db, DeviceTrafficDaily.bytes_sent) == [(300,)]
+
+
+def test_failing_after_commit_hook_does_not_replay_the_batch(db, processor):
+    def broken():
+        raise RuntimeError("hook failed")
+
+    processor.after_commit(broken)
+    assert processor.process_batch([metric(1), joined()]) == 0
+
+    assert count(db, NetworkMetric) == 1
+    assert count(db, DeviceEvent) == 1
+
+
+def test_non_numeric_metric_is_dropped(db, processor):
+    assert processor.process_batch([metric(5), metric("n/a"), metric(None)]) == 1
+    assert rows(db, NetworkMetric.total_packets) == [(0,), (5,)]
+
+
+def test_snapshot_reverted_within_a_batch_is_written(db, processor):
+    assert processor.process_batch([snapshot(device(hostname="X"))]) == 0
+    assert processor.process_batch([snapshot(device(hostname="Y")), snapshot(device(hostname="X"))]) == 0
+
+    assert rows(db, Device.hostname) == [("X",)]
+    assert [d["name"] for d in processor.stats.snapshot()["devices"]] == ["X"]
+
+    assert processor.process_batch([snapshot(device(hostname="X"))]) == 0
+    assert processor.fingerprints.last_snapshot == {"changed": 0, "skipped": 1}
+
+
+def test_snapshot_after_an_event_rewrites_the_device(db, processor):
+    assert processor.process_batch([snapshot(device(status="active"))]) == 0
+    left = {"type": "EVENT", "subtype": "DEVICE_LEFT", "payload": {"timestamp": NOW.isoformat() + "Z", "device": {"device_id": MAC}}}
+    assert processor.process_batch([left, snapshot(device(status="active"))]) == 0
+
+    assert rows(db, Device.status) == [("active",)]
+
+
+def test_rolled_back_fingerprints_are_forgotten(db, processor):
+    assert processor.process_batch([snapshot(device(hostname="X"))]) == 0
+    processor.apply_event(snapshot(device(hostname="Y")))
+    processor.rollback()
+
+    assert processor.process_batch([snapshot(device(hostname="Y"))]) == 0
+    assert rows(db, Device.hostname) == [("Y",)]
+
+
+def test_duplicate_macs_in_a_snapshot_keep_the_last_entry(db, processor):
+    other = "aa:00:00:00:00:02"
+    assert processor.process_batch([snapshot(device(hostname="A"), device(other), device(hostname="B"))]) == 0
+
+    assert rows(db, Device.device_id, Device.hostname) == [(MAC, "B"), (other, "laptop")]
+    assert processor.fingerprints.last_snapshot == {"changed": 2, "skipped": 0}
+
+
+@pytest.mark.parametrize("mode", ["orm", "upsert"])
+def test_write_modes_store_the_same_rows(db, processor, mode):
+    processor.topology_write_mode = mode
+    assert processor.process_batch([snapshot(device(sent=10), device("aa:00:00:00:00:02", sent=20))]) == 0
+    assert processor.process_batch([snapshot(device(sent=15, status="idle"))]) == 0
+
+    assert rows(db, Device.device_id, Device.status, Device.data_sent) == [
+        (MAC, "idle", 15), ("aa:00:00:00:00:02", "active", 20),
+    ]
+
+
+def test_first_sighting_is_only_a_baseline(db, processor):
+    assert processor.process_batch([joined()]) == 0
+    # A restart between the join and the first snapshot: the joined row's zeros are no reading
+    processor.counters.hydrate(db)
+    assert processor.process_batch([snapshot(device(sent=10 ** 9))]) == 0
+    assert count(db, DeviceTrafficDaily) == 0
+
+    processor.counters.hydrate(db)
+    assert processor.process_batch([snapshot(device(sent=10 ** 9 + 5))]) == 0
+    assert rows(db, DeviceTrafficDaily.bytes_sent) == [(5,)]
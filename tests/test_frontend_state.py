@@ -0,0 +1,131 @@
+import copy
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from app.api import frontend_ws as frontend_ws_module
+from app.services.frontend_state import KEYED_LISTS, FrontendState
+
+
+def apply_changes(view, changes: dict):
+    """What a delta client does with one view's changes."""
+    if "replace" in changes:
+        return copy.deepcopy(changes["replace"])
+
+    view = copy.deepcopy(view) if view is not None else {}
+    for field, value in changes.get("set", {}).items():
+        view[field] = copy.deepcopy(value)
+    for field in changes.get("unset", []):
+        view.pop(field, None)
+    for field, key in KEYED_LISTS.items():
+        if field not in changes:
+            continue
+        rows = {row[key]: row for row in view.get(field, [])}
+        for row_key in changes[field].get("remove", []):
+            rows.pop(row_key, None)
+        for row in changes[field].get("upsert", []):
+            rows[row[key]] = copy.deepcopy(row)
+        view[field] = list(rows.values())
+    return view
+
+
+class DeltaClient:
+    def __init__(self, snapshot: dict):
+        assert snapshot["type"] == "snapshot"
+        self.seq = snapshot["seq"]
+        self.state = copy.deepcopy(snapshot["state"])
+
+    def apply(self, patch: dict) -> bool:
+        """Apply a patch; False means a sequence gap (the client must resync)."""
+        if patch["prev_seq"] != self.seq:
+            return False
+        for name, changes in patch["changes"].items():
+            self.state[name] = apply_changes(self.state.get(name), changes)
+        self.seq = patch["seq"]
+        return True
+
+
+def device(i: int, status: str = "active") -> dict:
+    return {"id": f"aa:00:00:00:00:{i:02x}", "status": status}
+
+
+def topology(*devices) -> dict:
+    return {"devices": list(devices), "total": len(devices)}
+
+
+def test_patches_rebuild_the_state():
+    state = FrontendState()
+    client = DeltaClient(state.snapshot())
+
+    steps = [
+        {"topology": topology(device(1), device(2)), "stats": {"online": 2}},
+        {"topology": topology(device(1), device(2, "idle"), device(3)), "stats": {"online": 3}},
+        {"topology": topology(device(2, "idle"), device(3)), "stats": {"online": 2, "alerts": 1}},
+        {"topology": topology(device(2, "idle"), device(3)), "stats": {"online": 2}},
+    ]
+    for views in steps:
+        patch = state.update(views)
+        assert patch["seq"] == patch["prev_seq"] + 1
+        assert client.apply(patch)
+        assert client.state == views
+
+
+def test_unchanged_views_send_no_patch():
+    state = FrontendState()
+    views = {"stats": {"online": 1}}
+    state.update(views)
+    seq = state.seq
+
+    assert state.update(copy.deepcopy(views)) is None
+    assert state.seq == seq
+
+    patch = state.update(copy.deepcopy(views), event={"type": "DEVICE_JOINED"})
+    assert patch["changes"] == {} and patch["event"] == {"type": "DEVICE_JOINED"}
+    assert patch["seq"] == seq + 1
+
+
+def test_missed_update_is_detected_as_a_gap():
+    state = FrontendState()
+    client = DeltaClient(state.snapshot())
+    assert client.apply(state.update({"stats": {"online": 1}}))
+
+    # Computed while nobody listened for patches: the seq moves on regardless
+    assert state.update({"stats": {"online": 2}}, compute_patch=False) is None
+    patch = state.update({"stats": {"online": 3}})
+
+    assert not client.apply(patch)
+    client = DeltaClient(state.snapshot())
+    assert client.state == {"stats": {"online": 3}}
+    assert client.seq == patch["seq"]
+
+
+@pytest.fixture
+def delta_app(monkeypatch):
+    state = FrontendState()
+    monkeypatch.setattr(frontend_ws_module, "frontend_state", state)
+    app = FastAPI()
+
+    @app.websocket("/ws/frontend")
+    async def ws_frontend(websocket: WebSocket):
+        await frontend_ws_module.frontend_ws(websocket)
+
+    return app, state
+
+
+def test_resync_sends_a_fresh_snapshot(delta_app):
+    app, state = delta_app
+    state.update({"stats": {"online": 1}})
+
+    with TestClient(app) as http, http.websocket_connect("/ws/frontend?protocol=delta") as ws:
+        first = ws.receive_json()
+        assert first == {"type": "snapshot", "seq": 1, "state": {"stats": {"online": 1}}}
+
+        state.update({"stats": {"online": 4}})
+        state.update({"stats": {"online": 5}, "topology": topology(device(1))})
+        ws.send_json({"action": "resync"})
+
+        resynced = ws.receive_json()
+        assert resynced["type"] == "snapshot"
+        assert resynced["seq"] == 3
+        assert resynced["state"] == {"stats": {"online": 5}, "topology": topology(device(1))}
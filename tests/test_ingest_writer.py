@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.network_metrics import NetworkMetric
+from app.services.event_processor import EventProcessor
+from app.services.ingest_writer import IngestWriter
+
+
+def metric(total_packets: int) -> dict:
+    return {
+        "type": "METRIC",
+        "subtype": "PERIODIC_METRIC_STATE",
+        "payload": {"metrics": {"measure_time": datetime.utcnow().isoformat() + "Z", "total_packets": total_packets}},
+    }
+
+
+def test_batch_that_raises_does_not_stop_the_writer(engine, monkeypatch):
+    real = EventProcessor.process_batch
+    batches = []
+
+    def first_batch_raises(self, messages):
+        batches.append(messages)
+        if len(batches) == 1:
+            raise RuntimeError("database is gone")
+        return real(self, messages)
+
+    monkeypatch.setattr(EventProcessor, "process_batch", first_batch_raises)
+    writer = IngestWriter(max_queue_size=2, max_batch_size=2, max_delay=0.01, session_factory=sessionmaker(bind=engine))
+    published = []
+
+    async def on_commit(messages):
+        published.extend(messages)
+
+    async def scenario():
+        writer.on_commit = on_commit
+        await writer.start()
+        for i in range(10):
+            # A dead drain task would leave this blocked on the full queue
+            await asyncio.wait_for(writer.submit(metric(i)), 5)
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+    lost = batches[0]
+    assert writer.totals["failed"] == len(lost)
+    assert writer.totals["messages"] == 10
+    assert all(message not in published for message in lost)
+    assert len(published) == 10 - len(lost)
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count(NetworkMetric.id))).scalar() == 10 - len(lost)
@@ -0,0 +1,159 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.models.metric_rollup import MetricRollup1d, MetricRollup1h, MetricRollup1m
+from app.models.network_metrics import NetworkMetric
+from app.services.metric_rollups import (
+    MAX_COLUMNS,
+    SUM_COLUMNS,
+    MetricRollupService,
+    floor_time,
+    plan_retained_segments,
+    plan_segments,
+)
+from scripts.backfill_metric_rollups import rebuild_day
+
+MINUTE = timedelta(minutes=1)
+
+
+def metric_message(measure_time: datetime, rng: random.Random) -> dict:
+    return {
+        "type": "METRIC",
+        "subtype": "PERIODIC_METRIC_STATE",
+        "payload": {"metrics": {
+            "measure_time": measure_time.isoformat() + "Z",
+            "total_devices": rng.randint(1, 50),
+            "active_devices": rng.randint(0, 50),
+            "data_sent": rng.randint(0, 10 ** 6),
+            "data_received": rng.randint(0, 10 ** 6),
+            "arp_requests": rng.randint(0, 100),
+            "tcp_packets": rng.randint(0, 1000),
+            "udp_packets": rng.randint(0, 1000),
+            "icmp_packets": rng.randint(0, 100),
+            "total_packets": rng.randint(0, 3000),
+        }},
+    }
+
+
+def raw_totals(db, start: datetime, end: datetime) -> dict:
+    columns = [func.count(NetworkMetric.id)] \
+        + [func.coalesce(func.sum(getattr(NetworkMetric, c)), 0) for c in SUM_COLUMNS] \
+        + [func.coalesce(func.max(getattr(NetworkMetric, c)), 0) for c in MAX_COLUMNS.values()]
+    row = db.execute(select(*columns).where(NetworkMetric.measure_time >= start, NetworkMetric.measure_time < end)).one()
+    return dict(zip(["samples", *SUM_COLUMNS, *MAX_COLUMNS], row))
+
+
+@pytest.fixture
+def metrics(processor):
+    """Samples every 127 s over 28 hours spanning a whole UTC day, ingested through EventProcessor."""
+    rng = random.Random(7)
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    start, end = today - timedelta(days=3, hours=2, seconds=7), today - timedelta(hours=22)
+    times = []
+    ts = start
+    while ts < end:
+        times.append(ts)
+        ts += timedelta(seconds=127)
+    for i in range(0, len(times), 500):
+        assert processor.process_batch([metric_message(t, rng) for t in times[i:i + 500]]) == 0
+    return start, end
+
+
+def test_plan_segments_tile_the_window():
+    start, end = datetime(2026, 3, 1, 22, 58, 41), datetime(2026, 3, 4, 1, 2, 3)
+    segments = plan_segments(start, end)
+
+    assert segments[0][1] == start and segments[-1][2] == end
+    for previous, current in zip(segments, segments[1:]):
+        assert previous[2] == current[1]
+    assert [model for model, _, _ in segments] == [
+        None, MetricRollup1m, MetricRollup1h, MetricRollup1d, MetricRollup1h, MetricRollup1m, None
+    ]
+
+
+def test_aggregate_matches_raw_rows(db, metrics):
+    first, last = metrics
+    rng = random.Random(11)
+    service = MetricRollupService(db)
+
+    windows = [(first, last), (first - timedelta(hours=1), last + timedelta(hours=1))]
+    for _ in range(40):
+        a = first + timedelta(seconds=rng.randint(0, int((last - first).total_seconds())))
+        b = first + timedelta(seconds=rng.randint(0, int((last - first).total_seconds())))
+        windows.append((min(a, b), max(a, b) + timedelta(seconds=1)))
+
+    for start, end in windows:
+        assert service.aggregate(start, end) == raw_totals(db, start, end), (start, end)
+
+
+def test_open_ended_aggregate_counts_samples_ahead_of_the_clock(db, processor, metrics):
+    first, _ = metrics
+    ahead = floor_time(datetime.utcnow(), MINUTE) + timedelta(minutes=5)
+    assert processor.process_batch([metric_message(ahead, random.Random(3))]) == 0
+
+    expected = raw_totals(db, first, ahead + MINUTE)
+    assert MetricRollupService(db).aggregate(first) == expected
+
+
+def test_backfill_rebuilds_the_rollups_ingest_wrote(db, engine, metrics):
+    tables = (MetricRollup1m, MetricRollup1h, MetricRollup1d)
+
+    def rollup_rows():
+        db.expire_all()
+        return {
+            model.__tablename__: [
+                tuple(getattr(row, c.name) for c in model.__table__.columns)
+                for row in db.query(model).order_by(model.bucket)
+            ]
+            for model in tables
+        }
+
+    ingested = rollup_rows()
+    first, last = metrics
+    day = datetime.combine(first.date(), datetime.min.time())
+    with engine.begin() as conn:
+        for model in tables:
+            conn.execute(delete(model.__table__))
+        while day <= last:
+            rebuild_day(conn, day)
+            day += timedelta(days=1)
+
+    assert rollup_rows() == ingested
+
+
+def test_parts_past_raw_retention_fall_back_to_minutes(db, metrics):
+    first, last = metrics
+    start, end = first + timedelta(hours=1, seconds=25), first + timedelta(hours=3, seconds=50)
+    retained = {None: floor_time(start, timedelta(hours=1)) + timedelta(hours=2)}
+    widened = raw_totals(db, floor_time(start, MINUTE), retained[None])
+    exact = raw_totals(db, retained[None], end)
+
+    segments = plan_retained_segments(start, end, retained)
+    assert all(model is not None for model, seg_start, _ in segments if seg_start < retained[None])
+
+    totals = {"samples": 0, **{c: 0 for c in SUM_COLUMNS}, **{c: 0 for c in MAX_COLUMNS}}
+    service = MetricRollupService(db)
+    for model, seg_start, seg_end in segments:
+        row = service._query_segment(model, seg_start, seg_end)
+        for i, column in enumerate(["samples", *SUM_COLUMNS]):
+            totals[column] += row[i] or 0
+        for i, column in enumerate(MAX_COLUMNS, start=1 + len(SUM_COLUMNS)):
+            totals[column] = max(totals[column], row[i] or 0)
+
+    assert totals["samples"] == widened["samples"] + exact["samples"]
+    assert totals["total_packets"] == widened["total_packets"] + exact["total_packets"]
+
+
+def test_parts_older_than_every_table_are_left_out():
+    start, end = datetime(2026, 1, 1, 10, 30), datetime(2026, 1, 5, 10, 30)
+    retained = {
+        None: datetime(2026, 1, 4), MetricRollup1m: datetime(2026, 1, 4),
+        MetricRollup1h: datetime(2026, 1, 3), MetricRollup1d: datetime(2026, 1, 2),
+    }
+    segments = plan_retained_segments(start, end, retained)
+
+    assert segments[0] == (MetricRollup1d, datetime(2026, 1, 2), datetime(2026, 1, 3))
+    assert segments[-1][2] == end
@@ -0,0 +1,8 @@
+from scripts.check_query_plans import check
+
+
+def test_service_queries_use_indexes(engine):
+    checked, failures = check(engine)
+
+    assert checked > 0
+    assert failures == []
@@ -0,0 +1,164 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.models.device_event import DeviceEvent
+from app.services.response_cache import ResponseCache
+
+DAY = date(2026, 3, 10)
+
+
+def constant(value):
+    async def compute(db):
+        return value
+    return compute
+
+
+def test_second_request_is_a_hit(cache):
+    async def scenario():
+        first = await cache.get("report", (DAY,), 60, (("device_events", DAY, DAY),), constant({"n": 1}))
+        second = await cache.get("report", (DAY,), 60, (("device_events", DAY, DAY),), constant({"n": 2}))
+        return first, second
+
+    (body, headers), (cached, cached_headers) = asyncio.run(scenario())
+    assert headers["X-Cache"] == "MISS" and cached_headers["X-Cache"] == "HIT"
+    assert cached == body == b'{"n":1}'
+
+
+def test_invalidation_is_scoped_by_table_and_day(cache):
+    dependencies = {
+        "day": (("device_events", DAY, DAY),),
+        "range": (("network_metrics", DAY - timedelta(days=6), DAY),),
+        "open": (("device_first_seen", None, DAY),),
+        "any": (("devices", None, None),),
+    }
+
+    async def fill():
+        for name, deps in dependencies.items():
+            await cache.get(name, (), 60, deps, constant(name))
+
+    def cached():
+        return {key[0] for key in cache._entries}
+
+    asyncio.run(fill())
+    cache.invalidate([("device_events", DAY + timedelta(days=1)), ("network_metrics", DAY - timedelta(days=7))])
+    assert cached() == set(dependencies)
+
+    cache.invalidate([("device_first_seen", DAY + timedelta(days=1)), ("device_traffic_daily", None)])
+    assert cached() == set(dependencies)
+
+    cache.invalidate([("network_metrics", DAY - timedelta(days=3))])
+    assert cached() == {"day", "open", "any"}
+
+    cache.invalidate([("device_first_seen", date(2020, 1, 1)), ("device_events", None)])
+    assert cached() == {"any"}
+
+    cache.invalidate([("devices", DAY)])
+    assert cached() == set()
+    assert cache.get_stats()["totals"]["invalidated"] == 4
+
+
+def test_write_during_computation_is_not_cached(cache):
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow(db):
+        started.set()
+        await release.wait()
+        return "before the write"
+
+    async def scenario():
+        request = asyncio.create_task(cache.get("report", (), 60, (("device_events", DAY, DAY),), slow))
+        await started.wait()
+        cache.invalidate([("device_events", DAY)])
+        release.set()
+        served = await request
+        again = await cache.get("report", (), 60, (("device_events", DAY, DAY),), constant("after the write"))
+        return served, again
+
+    (body, headers), (again, again_headers) = asyncio.run(scenario())
+    assert body == b'"before the write"' and headers["X-Cache"] == "MISS"
+    assert again == b'"after the write"' and again_headers["X-Cache"] == "MISS"
+
+
+def test_concurrent_misses_share_one_computation(cache):
+    calls = []
+
+    async def compute(db):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("report", (), 60, (), compute) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert calls == [1]
+    assert {body for body, _ in results} == {b"1"}
+    assert sorted(headers["X-Cache"] for _, headers in results) == ["COLLAPSED"] * 4 + ["MISS"]
+
+
+def test_zero_ttl_is_computed_but_not_stored(cache):
+    async def scenario():
+        await cache.get("presence", (), 0, (), constant(1))
+        return await cache.get("presence", (), 0, (), constant(2))
+
+    body, headers = asyncio.run(scenario())
+    assert body == b"2" and headers["X-Cache"] == "MISS"
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(async_session_factory):
+    cache = ResponseCache(max_entries=2, session_factory=async_session_factory)
+
+    async def scenario():
+        await cache.get("a", (), 60, (), constant("a"))
+        await cache.get("b", (), 60, (), constant("b"))
+        await cache.get("a", (), 60, (), constant("a"))
+        await cache.get("c", (), 60, (), constant("c"))
+
+    asyncio.run(scenario())
+    assert [key[0] for key in cache._entries] == ["a", "c"]
+
+
+def test_committed_event_invalidates_reports_of_its_day(cache, processor):
+    today = datetime.utcnow().replace(microsecond=0)
+    yesterday = today - timedelta(days=1)
+
+    async def count_events(db):
+        return (await db.execute(select(func.count(DeviceEvent.id)))).scalar()
+
+    def report(day):
+        return cache.get("events", (day,), 60, (("device_events", day, day),), count_events)
+
+    async def fill():
+        return await report(today.date()), await report(yesterday.date())
+
+    asyncio.run(fill())
+    assert processor.process_batch([{
+        "type": "EVENT",
+        "subtype": "DEVICE_JOINED",
+        "payload": {"timestamp": today.isoformat() + "Z", "device": {"device_id": "aa:00:00:00:00:01"}},
+    }]) == 0
+
+    (today_body, today_headers), (_, yesterday_headers) = asyncio.run(fill())
+    assert today_headers["X-Cache"] == "MISS" and today_body == b"1"
+    assert yesterday_headers["X-Cache"] == "HIT"
+
+
+def test_snapshot_counters_leave_device_info_entries_alone(cache, processor):
+    def snapshot(hostname, sent):
+        device = {"mac": "aa:00:00:00:00:01", "hostname": hostname, "status": "active", "data_sent": sent}
+        return {"type": "TOPOLOGY", "subtype": "PERIODIC_TOPOLOGY_STATE", "payload": {"topology": {"devices": [device]}}}
+
+    def fill():
+        return asyncio.run(cache.get("top-talkers", (), 60, (("device_info", None, None),), constant(1)))[1]["X-Cache"]
+
+    assert processor.process_batch([snapshot("laptop", 10)]) == 0
+    assert fill() == "MISS"
+
+    assert processor.process_batch([snapshot("laptop", 20)]) == 0
+    assert fill() == "HIT"
+
+    assert processor.process_batch([snapshot("desktop", 20)]) == 0
+    assert fill() == "MISS"
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.network_metrics import NetworkMetric
+from app.services.ingest_writer import IngestWriter
+from app.services.retention import RetentionRule, RetentionService
+from scripts.backfill_metric_rollups import rebuild_day
+
+DAYS = 7
+
+
+def seed_history(db, days_ago: int):
+    """Raw samples written before rollups existed: nothing in network_metrics_1d for them."""
+    day = datetime.combine(datetime.utcnow().date() - timedelta(days=days_ago), datetime.min.time())
+    db.add_all(NetworkMetric(measure_time=day + timedelta(hours=h), total_packets=h) for h in range(24))
+    db.commit()
+    return day
+
+
+def run_pass(engine):
+    writer = IngestWriter(session_factory=sessionmaker(bind=engine))
+    service = RetentionService(
+        writer=writer, rules=[RetentionRule(NetworkMetric, NetworkMetric.measure_time, DAYS, needs_rollup=True)],
+    )
+
+    async def scenario():
+        await writer.start()
+        report = await service.run_once()
+        await writer.stop()
+        return report
+
+    return asyncio.run(scenario())
+
+
+def raw_count(db) -> int:
+    db.expire_all()
+    return db.execute(select(func.count(NetworkMetric.id))).scalar()
+
+
+def test_expired_rows_without_rollups_survive(db, engine):
+    seed_history(db, DAYS + 3)
+    seed_history(db, DAYS + 1)
+
+    report = run_pass(engine)
+
+    assert report["rows_deleted"] == {"network_metrics": 0}
+    assert raw_count(db) == 48
+
+
+def test_only_rolled_up_days_are_deleted(db, engine):
+    older = seed_history(db, DAYS + 3)
+    seed_history(db, DAYS + 1)
+    with engine.begin() as conn:
+        rebuild_day(conn, older)
+
+    report = run_pass(engine)
+
+    assert report["rows_deleted"] == {"network_metrics": 24}
+    assert raw_count(db) == 24